@@ -0,0 +1,172 @@
+"""
+Access distributions for picking mutation targets out of a LiveKeyIndex.
+
+A pattern maps (number of live rows, k) to k distinct slots. Slots are
+drawn in bulk with NumPy (one vectorised draw per batch rather than one
+Python call per key); without NumPy the same distributions fall back to
+the random module.
+
+Patterns are configured with the same `name:key=value,...` strings as
+load profiles, e.g. MUTATION_TARGET=zipf:s=1.2 or
+MUTATION_TARGET=hotspot:keys=0.01,share=0.9.
+"""
+import math
+import random
+from typing import Callable, Dict, List
+
+import vector_generators as vg
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Oversampling rounds before settling for fewer than k distinct slots
+_MAX_ROUNDS = 8
+
+
+class AccessPattern:
+    name = "uniform"
+
+    def sample(self, n: int, k: int) -> List[int]:
+        """k distinct slots in [0, n); skewed patterns may return fewer."""
+        k = min(k, n)
+        if k <= 0:
+            return []
+        if np is not None:
+            return self._distinct(k, lambda size: self._draw_numpy(n, size))
+        return self._distinct(k, lambda size: [self._draw_python(n) for _ in range(size)])
+
+    def _draw_numpy(self, n: int, size: int):
+        return vg.rng().integers(0, n, size=size)
+
+    def _draw_python(self, n: int) -> int:
+        return random.randrange(n)
+
+    @staticmethod
+    def _distinct(k: int, draw: Callable[[int], object]) -> List[int]:
+        chosen: Dict[int, None] = {}
+        for _ in range(_MAX_ROUNDS):
+            # Ask for more than is missing, since skewed draws repeat hot slots
+            for slot in draw(2 * (k - len(chosen))):
+                chosen[int(slot)] = None
+                if len(chosen) == k:
+                    return list(chosen)
+        return list(chosen)
+
+    def describe(self) -> str:
+        return self.name
+
+
+class UniformPattern(AccessPattern):
+    def sample(self, n: int, k: int) -> List[int]:
+        # Sampling without replacement needs no retry loop
+        k = min(k, n)
+        if k <= 0:
+            return []
+        if np is not None:
+            return vg.rng().choice(n, size=k, replace=False).tolist()
+        return random.sample(range(n), k)
+
+
+class ZipfPattern(AccessPattern):
+    """Slot rank r is picked with weight 1 / r**s; low slots (the oldest surviving rows) stay hot."""
+
+    name = "zipf"
+
+    def __init__(self, s: float = 1.1):
+        self.s = s
+
+    def _ranks(self, n: int, u):
+        # Inverse CDF of the continuous power law on [1, n + 1)
+        if abs(self.s - 1.0) < 1e-9:
+            return (n + 1) ** u
+        return ((math.pow(n + 1, 1 - self.s) - 1) * u + 1) ** (1 / (1 - self.s))
+
+    def _draw_numpy(self, n: int, size: int):
+        ranks = self._ranks(n, vg.rng().random(size)).astype(np.int64) - 1
+        return np.minimum(ranks, n - 1)
+
+    def _draw_python(self, n: int) -> int:
+        return min(int(self._ranks(n, random.random())) - 1, n - 1)
+
+    def describe(self) -> str:
+        return f"zipf(s={self.s})"
+
+
+class HotspotPattern(AccessPattern):
+    """`share` of accesses land on the first `keys` fraction of slots, the rest anywhere else."""
+
+    name = "hotspot"
+
+    def __init__(self, keys: float = 0.01, share: float = 0.9):
+        self.keys = keys
+        self.share = share
+
+    def _hot_size(self, n: int) -> int:
+        return min(n, max(1, int(n * self.keys)))
+
+    def _draw_numpy(self, n: int, size: int):
+        rng = vg.rng()
+        hot = self._hot_size(n)
+        is_hot = rng.random(size) < self.share
+        slots = rng.integers(hot, n, size=size) if hot < n else np.zeros(size, dtype=np.int64)
+        slots[is_hot] = rng.integers(0, hot, size=int(is_hot.sum()))
+        return slots
+
+    def _draw_python(self, n: int) -> int:
+        hot = self._hot_size(n)
+        if hot == n or random.random() < self.share:
+            return random.randrange(hot)
+        return random.randrange(hot, n)
+
+    def describe(self) -> str:
+        return f"hotspot(keys={self.keys:.2%}, share={self.share:.0%})"
+
+
+class LatestPattern(AccessPattern):
+    """Exponentially biased towards the newest rows, with a mean distance of `window` rows from the tail."""
+
+    name = "latest"
+
+    def __init__(self, window: float = 100_000):
+        self.window = window
+
+    def _draw_numpy(self, n: int, size: int):
+        offsets = vg.rng().exponential(self.window, size=size).astype(np.int64)
+        return n - 1 - np.minimum(offsets, n - 1)
+
+    def _draw_python(self, n: int) -> int:
+        return n - 1 - min(n - 1, int(random.expovariate(1 / self.window)))
+
+    def describe(self) -> str:
+        return f"latest(window={int(self.window)})"
+
+
+PATTERNS = {
+    "uniform": UniformPattern,
+    "zipf": ZipfPattern,
+    "hotspot": HotspotPattern,
+    "latest": LatestPattern,
+}
+
+
+def parse_pattern(spec: str) -> AccessPattern:
+    """
+    Build a pattern from a spec string, e.g.
+
+        uniform
+        zipf:s=1.2
+        hotspot:keys=0.01,share=0.9
+        latest:window=50000
+    """
+    kind, _, raw_args = spec.partition(":")
+    kind = kind.strip().lower()
+    if kind not in PATTERNS:
+        raise ValueError(f"Unknown access pattern '{kind}', expected one of {sorted(PATTERNS)}")
+
+    args = {}
+    for part in filter(None, raw_args.split(",")):
+        key, _, value = part.partition("=")
+        args[key.strip()] = float(value)
+    return PATTERNS[kind](**args)
@@ -0,0 +1,316 @@
+"""
+asyncio engine built on asyncpg with a connection pool.
+
+AsyncSchemaManager and AsyncMutationEngine keep the SchemaManager /
+MutationEngine surface (same state, counters and method names), but their
+database methods are coroutines that run against a shared pool. Inserts go
+through asyncpg's native copy_records_to_table and updates/deletes through
+statements that asyncpg prepares once per connection and caches.
+"""
+import asyncio
+import random
+from typing import Dict, List, Optional
+
+try:
+    import asyncpg
+except ImportError:  # asyncpg is optional; only needed for ENGINE=async
+    asyncpg = None
+
+from batch_generator import BatchGenerator
+from column_pool import PROTECTED_COLUMNS
+from metrics import registry
+from mutation_engine import MutationEngine
+from schema_manager import SchemaManager
+
+
+def quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+async def create_pool(conn_params: dict, size: int):
+    """Create an asyncpg pool from the psycopg2-style CONN_PARAMS used by main.py."""
+    if asyncpg is None:
+        raise RuntimeError("ENGINE=async requires asyncpg (pip install asyncpg)")
+    params = dict(conn_params)
+    if "dbname" in params:
+        params["database"] = params.pop("dbname")
+    return await asyncpg.create_pool(min_size=1, max_size=size, **params)
+
+
+class AsyncSchemaManager(SchemaManager):
+    """
+    SchemaManager whose DDL runs on an asyncpg pool. The pool is attached
+    when the event loop starts (see run_async_cdc_simulation).
+    """
+
+    def __init__(self, pool=None, schema="public", table_name="sales", **schema_options):
+        super().__init__(None, schema=schema, table_name=table_name, **schema_options)
+        self.pool = pool
+
+    @property
+    def qualified_table(self) -> str:
+        return f"{quote_ident(self.schema)}.{quote_ident(self.table_name)}"
+
+    async def initialize_table(self):
+        columns_ddl = ",\n".join(col.ddl() for col in self.base_column_defs)
+        async with self.pool.acquire() as conn:
+            await conn.execute('CREATE EXTENSION IF NOT EXISTS "uuid-ossp";')
+            await conn.execute(f"CREATE TABLE IF NOT EXISTS {self.qualified_table} (\n{columns_ddl}\n);")
+
+    async def add_random_column(self) -> Optional[str]:
+        col_def = self._take_pool_column()
+        if col_def is None:
+            return None
+
+        with registry.timed("ddl", table=self.table_name):
+            async with self.pool.acquire() as conn:
+                await conn.execute(
+                    f"ALTER TABLE {self.qualified_table} ADD COLUMN {quote_ident(col_def.name)} "
+                    f"{col_def.sql_type} {col_def.constraints or ''}"
+                )
+
+        self._record_added(col_def)
+        return col_def.name
+
+    async def drop_random_column(self) -> Optional[str]:
+        col_name = self._choose_drop_candidate()
+        if col_name is None:
+            return None
+
+        with registry.timed("ddl", table=self.table_name):
+            async with self.pool.acquire() as conn:
+                await conn.execute(f"ALTER TABLE {self.qualified_table} DROP COLUMN {quote_ident(col_name)}")
+
+        self._record_dropped(col_name)
+        return col_name
+
+
+class AsyncMutationEngine(MutationEngine):
+    """
+    MutationEngine on an asyncpg pool. Each call acquires its own pooled
+    connection, so several streams can insert and mutate concurrently.
+    """
+
+    def __init__(self, pool=None, schema="public", table_name="sales",
+                 column_types: Optional[Dict[str, str]] = None):
+        super().__init__(None, schema=schema, table_name=table_name, column_types=column_types)
+        self.pool = pool
+
+    @property
+    def qualified_table(self) -> str:
+        return f"{quote_ident(self.schema)}.{quote_ident(self.table_name)}"
+
+    async def insert_batch(self, rows: List[Dict]) -> List[str]:
+        if not rows:
+            return []
+        columns = list(self.column_types or rows[0].keys())
+        records = [tuple(row[col] for col in columns) for row in rows]
+        return await self._copy_records(columns, records, [row["id"] for row in rows])
+
+    async def insert_columns(self, columns: Dict[str, List]) -> List[str]:
+        inserted_ids = list(columns.get("id", []))
+        if not inserted_ids:
+            return []
+        names = list(self.column_types or columns.keys())
+        records = list(zip(*(columns[name] for name in names)))
+        return await self._copy_records(names, records, inserted_ids)
+
+    async def _copy_records(self, columns: List[str], records: list, inserted_ids: List[str]) -> List[str]:
+        with registry.timed("insert", len(records), self.table_name):
+            async with self.pool.acquire() as conn:
+                await conn.copy_records_to_table(
+                    self.table_name, schema_name=self.schema, columns=columns, records=records
+                )
+        self.total_inserts += len(records)
+        return inserted_ids
+
+    async def maybe_mutate_batch(self, generator: BatchGenerator, inserted_ids: List[str]):
+        if not inserted_ids or random.choice([True, False]) is False:
+            return 0, 0  # skip mutation
+
+        mutation_type = random.choice(["update", "delete"])
+        num_to_change = random.randint(1, max(1, len(inserted_ids) // 2))
+        chosen_ids = random.sample(inserted_ids, num_to_change)
+
+        if mutation_type == "update":
+            updated_count = await self._update_records(generator, chosen_ids)
+            self.total_updates += updated_count
+            return updated_count, 0
+        else:
+            deleted_count = await self._delete_records(chosen_ids)
+            self.total_deletes += deleted_count
+            return 0, deleted_count
+
+    async def _update_records(self, generator: BatchGenerator, ids: List[str]) -> int:
+        modifiable_columns = [col for col in generator.schema if col not in PROTECTED_COLUMNS]
+        if not modifiable_columns:
+            return 0
+
+        updates_by_column: Dict[str, tuple] = {}
+        for row_id in ids:
+            col = random.choice(modifiable_columns)
+            col_ids, col_vals = updates_by_column.setdefault(col, ([], []))
+            col_ids.append(row_id)
+            col_vals.append(generator._generate_value(col))
+
+        with registry.timed("update", len(ids), self.table_name):
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    for col, (col_ids, col_vals) in updates_by_column.items():
+                        # Same text per column, so asyncpg reuses the prepared statement
+                        await conn.execute(
+                            f"UPDATE {self.qualified_table} AS t SET {quote_ident(col)} = v.val, updated_at = now() "
+                            f"FROM unnest($1::uuid[], $2::{generator.schema[col]}[]) AS v(id, val) "
+                            f"WHERE t.id = v.id",
+                            col_ids, col_vals,
+                        )
+        return len(ids)
+
+    async def _delete_records(self, ids: List[str]) -> int:
+        with registry.timed("delete", len(ids), self.table_name):
+            async with self.pool.acquire() as conn:
+                await conn.execute(f"DELETE FROM {self.qualified_table} WHERE id = ANY($1::uuid[])", ids)
+        return len(ids)
+
+
+class _SchemaGate:
+    """
+    Lets any number of batch writes run at once, but makes a schema change
+    wait for in-flight writes to finish and hold new ones until it is done.
+    """
+
+    def __init__(self):
+        self._cond = asyncio.Condition()
+        self._writers = 0
+        self._evolving = False
+
+    async def enter_write(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: not self._evolving)
+            self._writers += 1
+
+    async def exit_write(self):
+        async with self._cond:
+            self._writers -= 1
+            self._cond.notify_all()
+
+    async def enter_evolution(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: not self._evolving)
+            self._evolving = True
+            await self._cond.wait_for(lambda: self._writers == 0)
+
+    async def exit_evolution(self):
+        async with self._cond:
+            self._evolving = False
+            self._cond.notify_all()
+
+
+async def _evolve(schema_mgr: AsyncSchemaManager, schema_evolver, batch_no: int) -> bool:
+    """Async twin of runner.evolve_schema(). Online migrations run on psycopg2 only, so they are never chosen here."""
+    if not schema_evolver.should_evolve(batch_no):
+        return False
+
+    action = schema_evolver.choose_action(allow_migrations=False)
+    if action == "add":
+        added = await schema_mgr.add_random_column()
+        if added:
+            schema_evolver.record_action("add")
+            print(f"📦 [Batch {batch_no}] Added column '{added}'")
+            return True
+    elif action == "drop":
+        dropped = await schema_mgr.drop_random_column()
+        if dropped:
+            schema_evolver.record_action("drop")
+            print(f"🗑️ [Batch {batch_no}] Dropped column '{dropped}'")
+            return True
+    return False
+
+
+async def _simulate(schema_mgr, mutator, schema_evolver, conn_params, total_records, batch_size,
+                    enable_evolution, columnar, streams, pool_size, rate_controller):
+    pool = await create_pool(conn_params, pool_size or streams + 1)
+    schema_mgr.pool = pool
+    mutator.pool = pool
+
+    generator = BatchGenerator(
+        schema_mgr.get_active_column_definitions(), schema_mgr.get_column_definitions(),
+        table_name=schema_mgr.table_name,
+    )
+    mutator.update_schema(schema_mgr.get_active_column_definitions())
+    total_batches = total_records // batch_size
+    next_batch = iter(range(1, total_batches + 1))
+    gate = _SchemaGate()
+
+    async def stream():
+        for batch_no in next_batch:
+            await gate.enter_write()
+            try:
+                if columnar:
+                    inserted_ids = await mutator.insert_columns(generator.generate_columns(batch_size))
+                else:
+                    inserted_ids = await mutator.insert_batch(generator.generate_batch(batch_size))
+                updated, deleted = await mutator.maybe_mutate_batch(generator, inserted_ids)
+            finally:
+                await gate.exit_write()
+
+            if rate_controller:
+                await rate_controller.athrottle(len(inserted_ids) + updated + deleted)
+
+            if enable_evolution and batch_no % schema_evolver.evolution_interval == 0:
+                await gate.enter_evolution()
+                try:
+                    if await _evolve(schema_mgr, schema_evolver, batch_no):
+                        generator.update_schema(schema_mgr.get_active_column_definitions())
+                        mutator.update_schema(schema_mgr.get_active_column_definitions())
+                        await pool.expire_connections()
+                finally:
+                    await gate.exit_evolution()
+
+            if batch_no % 10 == 0:
+                counts = mutator.get_counters()
+                print(
+                    f"[Batch {batch_no}] Inserts: {counts['total_inserts']}, "
+                    f"Updates: {counts['total_updates']}, Deletes: {counts['total_deletes']}"
+                )
+
+    print(
+        f"\n🚀 Starting async CDC Simulation: {total_records} records in {total_batches} batches "
+        f"over {streams} concurrent streams\n"
+    )
+    if not enable_evolution:
+        print("🔒 Schema evolution disabled. Only inserts, updates, and deletes will be simulated.")
+    if rate_controller:
+        rate_controller.start()
+
+    try:
+        await asyncio.gather(*(stream() for _ in range(streams)))
+    finally:
+        await pool.close()
+
+    if rate_controller:
+        print(rate_controller.summary_line())
+
+
+def run_async_cdc_simulation(
+    schema_mgr: AsyncSchemaManager,
+    mutator: AsyncMutationEngine,
+    schema_evolver,
+    conn_params: dict,
+    total_records: int,
+    batch_size: int,
+    enable_evolution: bool = True,
+    columnar: bool = False,
+    streams: int = 4,
+    pool_size: Optional[int] = None,
+    rate_controller=None,
+):
+    """
+    Run the simulation on asyncio with `streams` concurrent insert/mutate
+    tasks sharing one asyncpg pool. Schema evolution waits for in-flight
+    batches to finish before altering the table.
+    """
+    asyncio.run(_simulate(
+        schema_mgr, mutator, schema_evolver, conn_params, total_records, batch_size,
+        enable_evolution, columnar, streams, pool_size, rate_controller,
+    ))
@@ -1,24 +1,43 @@
 import random
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional
 from column_manager import ColumnDefinition
 from column_pool import BASE_COLUMN_DEFINITIONS, COLUMN_POOL
+from metrics import registry
 
 class BatchGenerator:
-    def __init__(self, schema: Dict[str, str]):
+    def __init__(
+        self,
+        schema: Dict[str, str],
+        column_definitions: Optional[Iterable[ColumnDefinition]] = None,
+        table_name: str = "",
+    ):
         """
         Initialize with a schema mapping of column name to SQL type.
-        This assumes schema keys match names in available column definitions.
+        This assumes schema keys match names in available column definitions,
+        which default to the built-in sales columns. table_name only labels
+        the generation timings in the metrics registry.
         """
         self.schema = schema
+        self.table_name = table_name
 
         # Build a lookup from all known column definitions
-        all_columns = BASE_COLUMN_DEFINITIONS + COLUMN_POOL
+        all_columns = (
+            list(column_definitions) if column_definitions is not None
+            else BASE_COLUMN_DEFINITIONS + COLUMN_POOL
+        )
         self.column_lookup: Dict[str, ColumnDefinition] = {
             col.name: col for col in all_columns
         }
 
-    def update_schema(self, new_schema: Dict[str, str]):
+    def update_schema(self, new_schema: Dict[str, str], aliases: Optional[Dict[str, str]] = None):
+        """
+        aliases maps renamed columns to the definition that still generates
+        their values (see SchemaManager.get_column_aliases).
+        """
         self.schema = new_schema
+        for column, source in (aliases or {}).items():
+            if column not in self.column_lookup and source in self.column_lookup:
+                self.column_lookup[column] = self.column_lookup[source]
     
     def _generate_value(self, column: str) -> Any:
         col_def = self.column_lookup.get(column)
@@ -28,10 +47,25 @@ class BatchGenerator:
 
     def generate_batch(self, batch_size: int = 500) -> List[Dict[str, Any]]:
         rows = []
-        for _ in range(batch_size):
-            row = {
-                column: self._generate_value(column)
-                for column in self.schema
-            }
-            rows.append(row)
-        return rows
\ No newline at end of file
+        with registry.timed("generate", batch_size, self.table_name):
+            for _ in range(batch_size):
+                row = {
+                    column: self._generate_value(column)
+                    for column in self.schema
+                }
+                rows.append(row)
+        return rows
+
+    def generate_columns(self, batch_size: int = 500) -> Dict[str, List[Any]]:
+        """
+        Columnar variant of generate_batch: one list of values per column,
+        produced by each ColumnDefinition's batch generator.
+        """
+        columns = {}
+        with registry.timed("generate", batch_size, self.table_name):
+            for column in self.schema:
+                col_def = self.column_lookup.get(column)
+                if not col_def:
+                    raise ValueError(f"No generator defined for column '{column}'")
+                columns[column] = col_def.generate_column(batch_size)
+        return columns
@@ -0,0 +1,268 @@
+"""
+Batch-size autotuning.
+
+The best batch size depends on row width (which grows as evolution adds
+columns), network latency and server load, so a fixed BATCH_SIZE is only
+right some of the time. BatchSizeTuner measures the write time of every
+batch: the insert plus the updates and deletes that follow it, without
+generation or pacing sleeps. Once per window (at least `window` batches
+and `min_seconds` of write time, so periodic costs such as a commit every
+few batches or a sink flushing its buffer are averaged in) it picks a new
+size between `min_size` and `max_size`:
+
+- throughput: hill-climb on change events per second of write time. The
+  size keeps moving by a factor of `step` while throughput improves, turns
+  around when it drops by more than `tolerance`, and holds when the change
+  is within that noise band. An optional `max_ms` p95 ceiling shrinks the
+  batch whatever the throughput.
+- latency: AIMD toward a p95 batch latency ceiling of `ms`. The size grows
+  by `add` rows per window while p95 stays under the ceiling and is cut by
+  `cut` (a factor) when it goes over.
+
+A schema change restarts the measurement, since rates from before a column
+was added don't compare with rates after it. Every decision is kept in
+`decisions`, sets the batch_size gauge and, with `log_path`, is appended
+to a JSON-lines log so a run can be explained afterwards.
+"""
+import json
+import time
+from typing import Dict, List, Optional
+
+from metrics import registry
+
+MODES = ("throughput", "latency")
+
+
+def _p95(values: List[float]) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+
+class BatchSizeTuner:
+    def __init__(
+        self,
+        initial_size: int,
+        mode: str = "throughput",
+        min_size: int = 50,
+        max_size: int = 50_000,
+        window: int = 5,
+        min_seconds: float = 1.0,
+        step: float = 1.25,
+        tolerance: float = 0.03,
+        max_ms: Optional[float] = None,
+        add: int = 100,
+        cut: float = 0.5,
+        table: str = "",
+        log_path: Optional[str] = None,
+    ):
+        """
+        initial_size: batch size to start from (BATCH_SIZE).
+        mode: "throughput" (hill-climb) or "latency" (AIMD toward max_ms).
+        window, min_seconds: batches and seconds of write time measured per decision.
+        step: hill-climb factor per move; tolerance: relative throughput change treated as noise.
+        max_ms: p95 batch latency ceiling in ms; required in latency mode, a guard in throughput mode.
+        add, cut: AIMD additive increase (rows) and multiplicative decrease.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown batch tuner mode '{mode}', expected one of {MODES}")
+        if mode == "latency" and not max_ms:
+            raise ValueError("The latency batch tuner needs a ceiling, e.g. latency:ms=200")
+        if not 0 < min_size <= max_size:
+            raise ValueError(f"Batch tuner needs 0 < min ({min_size}) <= max ({max_size})")
+        self.mode = mode
+        self.min_size = min_size
+        self.max_size = max_size
+        self.window = window
+        self.min_seconds = min_seconds
+        self.step = step
+        self.tolerance = tolerance
+        self.max_ms = max_ms
+        self.add = add
+        self.cut = cut
+        self.table = table
+        self.log_path = log_path
+
+        self.initial_size = self._clamp(initial_size)
+        self.size = self.initial_size
+        self.decisions: List[dict] = []
+        self.batches = 0
+        self.best: Optional[dict] = None
+
+        self._direction = 1
+        self._previous_eps: Optional[float] = None
+        self._latencies: List[float] = []
+        self._events = 0
+        self._seconds = 0.0
+        self._log = open(log_path, "a", encoding="utf-8") if log_path else None
+        registry.set_gauge("batch_size", self.size, table)
+
+    def _clamp(self, size: float) -> int:
+        return max(self.min_size, min(self.max_size, int(round(size))))
+
+    # ────────── MEASUREMENT ────────── #
+
+    def observe(self, rows: int, events: int, seconds: float) -> Optional[dict]:
+        """
+        Record one batch of `rows` inserted rows that produced `events`
+        change events in `seconds` of write time. Batches of another size
+        than the current one (trimmed final batches, or batches generated
+        before the last decision in a pipelined run) are not counted.
+        Returns the decision when this batch closed a window.
+        """
+        self.batches += 1
+        if rows != self.size:
+            return None
+        self._latencies.append(seconds)
+        self._events += events
+        self._seconds += seconds
+        if len(self._latencies) < self.window or self._seconds < self.min_seconds:
+            return None
+        return self._decide()
+
+    def reset(self, reason: str):
+        """Discard the current window and the hill-climb baseline, e.g. after a schema change."""
+        self._latencies = []
+        self._events = 0
+        self._seconds = 0.0
+        self._previous_eps = None
+        self._record(self.size, None, None, "reset", reason)
+
+    # ────────── DECISIONS ────────── #
+
+    def _decide(self) -> dict:
+        eps = self._events / self._seconds if self._seconds > 0 else 0.0
+        p95_ms = _p95(self._latencies) * 1000
+        self._latencies = []
+        self._events = 0
+        self._seconds = 0.0
+
+        if self.best is None or eps > self.best["events_per_sec"]:
+            self.best = {"size": self.size, "events_per_sec": round(eps, 1), "p95_ms": round(p95_ms, 2)}
+
+        if self.max_ms and p95_ms > self.max_ms:
+            # Over the ceiling: back off hard, whatever the mode
+            new_size = self._clamp(self.size * self.cut)
+            self._direction = -1
+            self._previous_eps = None
+            reason = f"p95 {p95_ms:.1f} ms over the {self.max_ms:g} ms ceiling"
+        elif self.mode == "latency":
+            new_size = self._clamp(self.size + self.add)
+            reason = f"p95 {p95_ms:.1f} ms under the {self.max_ms:g} ms ceiling"
+        else:
+            new_size, reason = self._climb(eps)
+
+        action = "grow" if new_size > self.size else "shrink" if new_size < self.size else "hold"
+        return self._record(new_size, eps, p95_ms, action, reason)
+
+    def _climb(self, eps: float):
+        previous, self._previous_eps = self._previous_eps, eps
+        if previous is None:
+            reason = "first window since start or reset, probing"
+        elif eps > previous * (1 + self.tolerance):
+            reason = f"throughput up {eps / previous - 1:.0%}, continuing"
+        elif eps < previous * (1 - self.tolerance):
+            self._direction = -self._direction
+            reason = f"throughput down {1 - eps / previous:.0%}, reversing"
+        else:
+            return self.size, f"throughput within {self.tolerance:.0%} of the last window"
+
+        factor = self.step if self._direction > 0 else 1 / self.step
+        new_size = self._clamp(self.size * factor)
+        if new_size == self.size:
+            # Pinned at a bound: look the other way next time
+            self._direction = -self._direction
+            reason += f", but already at the {'maximum' if factor > 1 else 'minimum'}"
+        return new_size, reason
+
+    def _record(self, new_size: int, eps: Optional[float], p95_ms: Optional[float], action: str, reason: str) -> dict:
+        decision = {
+            "ts": round(time.time(), 3),
+            "batch": self.batches,
+            "mode": self.mode,
+            "action": action,
+            "from": self.size,
+            "to": new_size,
+            "events_per_sec": round(eps, 1) if eps is not None else None,
+            "p95_ms": round(p95_ms, 2) if p95_ms is not None else None,
+            "reason": reason,
+        }
+        self.decisions.append(decision)
+        self.size = new_size
+        registry.set_gauge("batch_size", new_size, self.table)
+        if self._log is not None:
+            self._log.write(json.dumps(decision) + "\n")
+            self._log.flush()
+        return decision
+
+    # ────────── REPORTING ────────── #
+
+    def describe(self, decision: dict) -> str:
+        if decision["action"] == "reset":
+            return f"🎛️  Batch tuner reset: {decision['reason']}"
+        return (
+            f"🎛️  [Batch {decision['batch']}] Batch size {decision['from']} → {decision['to']}: "
+            f"{decision['events_per_sec']:,.0f} ev/s, p95 {decision['p95_ms']} ms; {decision['reason']}"
+        )
+
+    def report(self) -> Dict[str, object]:
+        sizes = [self.initial_size] + [d["to"] for d in self.decisions]
+        return {
+            "mode": self.mode,
+            "initial_size": self.initial_size,
+            "final_size": self.size,
+            "min_seen": min(sizes),
+            "max_seen": max(sizes),
+            "decisions": len(self.decisions),
+            "changes": sum(1 for d in self.decisions if d["to"] != d["from"]),
+            "best_window": self.best,
+        }
+
+    def summary_line(self) -> str:
+        report = self.report()
+        line = (
+            f"🎛️  Batch tuner ({report['mode']}): {report['initial_size']} → {report['final_size']} rows "
+            f"(range {report['min_seen']}-{report['max_seen']}), {report['changes']} changes in "
+            f"{report['decisions']} decisions"
+        )
+        best = report["best_window"]
+        if best:
+            line += f"; best window {best['events_per_sec']:,.0f} ev/s at {best['size']} rows (p95 {best['p95_ms']} ms)"
+        return line
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+def parse_tuner(spec: str, initial_size: int, table: str = "", log_path: Optional[str] = None) -> BatchSizeTuner:
+    """
+    Build a tuner from a BATCH_TUNER string, e.g.
+
+        throughput
+        throughput:min=100,max=20000,window=5,seconds=1,step=1.5,max_ms=500
+        latency:ms=200,add=250,cut=0.5
+    """
+    mode, _, raw_args = spec.partition(":")
+    args: Dict[str, str] = {}
+    for part in filter(None, raw_args.split(",")):
+        key, _, value = part.partition("=")
+        args[key.strip()] = value.strip()
+
+    mode = mode.strip().lower()
+    ceiling = args.get("ms" if mode == "latency" else "max_ms")
+    return BatchSizeTuner(
+        initial_size,
+        mode=mode,
+        min_size=int(args.get("min", 50)),
+        max_size=int(args.get("max", 50_000)),
+        window=int(args.get("window", 5)),
+        min_seconds=float(args.get("seconds", 1.0)),
+        step=float(args.get("step", 1.25)),
+        tolerance=float(args.get("tolerance", 0.03)),
+        max_ms=float(ceiling) if ceiling else None,
+        add=int(args.get("add", 100)),
+        cut=float(args.get("cut", 0.5)),
+        table=table,
+        log_path=log_path,
+    )
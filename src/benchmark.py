@@ -0,0 +1,339 @@
+"""
+Benchmarks for CDCraft's own generation and write paths.
+
+    python src/benchmark.py                          # everything, against Postgres
+    python src/benchmark.py --sink memory            # generation + encoding only, no database
+    python src/benchmark.py --suites writes --batch-sizes 100,1000,5000
+    python src/benchmark.py --output new.json --compare old.json
+
+Suites:
+  generation  rows/sec of every ColumnDefinition (per-row and batch
+              generators) and of whole BatchGenerator batches
+  writes      insert/update/delete rows/sec per batch size. With
+              --sink memory, only the insert path's row encoding is timed
+  ddl         cost of each ADD/DROP COLUMN an evolution run would issue
+
+Database benchmarks run in a throwaway schema (dropped afterwards) on the
+PG* connection settings used by main.py. Results go to a JSON file so
+runs can be compared across versions.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import psycopg2
+from psycopg2 import sql
+
+import vector_generators as vg
+from batch_generator import BatchGenerator
+from column_pool import BASE_COLUMN_DEFINITIONS, COLUMN_POOL
+from copy_encoder import binary_encoders_for, encode_binary_copy, encode_text_copy
+from mutation_engine import INGEST_MODES, MutationEngine
+from schema_manager import SchemaManager
+from seeding import seed_all
+
+SUITES = ("generation", "writes", "ddl")
+
+
+def _conn_params() -> dict:
+    return dict(
+        host=os.getenv("PGHOST", "localhost"),
+        dbname=os.getenv("PGDATABASE", "postgres"),
+        user=os.getenv("PGUSER", "postgres"),
+        password=os.getenv("PGPASSWORD", "postgres"),
+        port=int(os.getenv("PGPORT", "5432")),
+    )
+
+
+def _timed(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Run fn `repeat` times and return the best and median wall time."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return {"best_s": min(timings), "median_s": statistics.median(timings)}
+
+
+def _rate(rows: int, seconds: float) -> float:
+    return round(rows / seconds, 1) if seconds > 0 else 0.0
+
+
+# ────────── GENERATION ────────── #
+
+def bench_generation(rows: int, repeat: int) -> List[dict]:
+    results = []
+    for col in BASE_COLUMN_DEFINITIONS + COLUMN_POOL:
+        per_row = _timed(lambda: [col.generate() for _ in range(rows)], repeat)
+        entry = {
+            "column": col.name,
+            "sql_type": col.sql_type,
+            "row_rows_per_sec": _rate(rows, per_row["median_s"]),
+        }
+        if col.batch_generator is not None or col.value_pool is not None:
+            batched = _timed(lambda: col.generate_column(rows), repeat)
+            entry["batch_rows_per_sec"] = _rate(rows, batched["median_s"])
+        results.append(entry)
+
+    schema = {col.name: col.sql_type for col in BASE_COLUMN_DEFINITIONS}
+    generator = BatchGenerator(schema)
+    for mode, fn in (
+        ("generate_batch", lambda: generator.generate_batch(rows)),
+        ("generate_columns", lambda: generator.generate_columns(rows)),
+    ):
+        timing = _timed(fn, repeat)
+        results.append({"column": f"<{mode}>", "sql_type": "", "row_rows_per_sec": _rate(rows, timing["median_s"])})
+    return results
+
+
+# ────────── WRITES ────────── #
+
+def bench_memory_writes(rows: int, batch_sizes: List[int], repeat: int) -> List[dict]:
+    """Row encoding for each ingest mode, without a database on the other end."""
+    schema = {col.name: col.sql_type for col in BASE_COLUMN_DEFINITIONS}
+    generator = BatchGenerator(schema)
+    columns = list(schema)
+    encoders = binary_encoders_for(schema)
+
+    sinks = {
+        "values": lambda batch: [[row[col] for col in columns] for row in batch],
+        "copy_text": lambda batch: encode_text_copy([row[col] for col in columns] for row in batch),
+        "copy_binary": lambda batch: encode_binary_copy(([row[col] for col in columns] for row in batch), encoders),
+    }
+
+    results = []
+    for batch_size in batch_sizes:
+        batches = [generator.generate_batch(batch_size) for _ in range(max(1, rows // batch_size))]
+        total = batch_size * len(batches)
+        for mode, sink in sinks.items():
+            timing = _timed(lambda: [sink(batch) for batch in batches], repeat)
+            results.append({
+                "sink": "memory",
+                "ingest_mode": mode,
+                "batch_size": batch_size,
+                "insert_rows_per_sec": _rate(total, timing["median_s"]),
+            })
+    return results
+
+
+def _fresh_table(conn, schema: str, table_name: str) -> SchemaManager:
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {}.{}").format(sql.Identifier(schema), sql.Identifier(table_name)))
+    conn.commit()
+    schema_mgr = SchemaManager(conn, schema=schema, table_name=table_name)
+    schema_mgr.initialize_table()
+    return schema_mgr
+
+
+def bench_pg_writes(conn, schema: str, rows: int, batch_sizes: List[int], repeat: int,
+                    ingest_mode: str) -> List[dict]:
+    results = []
+    for batch_size in batch_sizes:
+        num_batches = max(1, rows // batch_size)
+        total = batch_size * num_batches
+        samples = {"insert": [], "update": [], "delete": []}
+
+        for _ in range(repeat):
+            schema_mgr = _fresh_table(conn, schema, "bench_writes")
+            columns = schema_mgr.get_active_column_definitions()
+            generator = BatchGenerator(columns)
+            mutator = MutationEngine(conn, schema=schema, table_name="bench_writes",
+                                     ingest_mode=ingest_mode, column_types=columns)
+            # Generation is measured separately; pre-build every batch
+            batches = [generator.generate_batch(batch_size) for _ in range(num_batches)]
+
+            started = time.perf_counter()
+            id_batches = [mutator.insert_batch(batch) for batch in batches]
+            samples["insert"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for ids in id_batches:
+                mutator._update_records(generator, ids)
+            samples["update"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for ids in id_batches:
+                mutator._delete_records(ids)
+            samples["delete"].append(time.perf_counter() - started)
+            mutator.flush()
+
+        results.append({
+            "sink": "postgres",
+            "ingest_mode": ingest_mode,
+            "batch_size": batch_size,
+            **{f"{op}_rows_per_sec": _rate(total, statistics.median(times)) for op, times in samples.items()},
+        })
+    return results
+
+
+# ────────── DDL ────────── #
+
+def bench_ddl(conn, schema: str, table_rows: int) -> List[dict]:
+    """Time every ADD COLUMN from the pool, then every DROP, on a table of `table_rows` rows."""
+    schema_mgr = _fresh_table(conn, schema, "bench_ddl")
+    columns = schema_mgr.get_active_column_definitions()
+    mutator = MutationEngine(conn, schema=schema, table_name="bench_ddl", ingest_mode="copy_binary",
+                             column_types=columns)
+    generator = BatchGenerator(columns)
+    for _ in range(max(1, table_rows // 5000)):
+        mutator.insert_columns(generator.generate_columns(min(5000, table_rows)))
+    mutator.flush()
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("ANALYZE {}.{}").format(sql.Identifier(schema), sql.Identifier("bench_ddl")))
+    conn.commit()
+
+    sql_types = {col.name: col.sql_type for col in schema_mgr.get_column_definitions()}
+    results = []
+    for action, evolve in (("add", schema_mgr.add_random_column), ("drop", schema_mgr.drop_random_column)):
+        while True:
+            started = time.perf_counter()
+            column = evolve()
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+            if column is None:
+                break
+            results.append({"action": action, "column": column, "sql_type": sql_types[column],
+                            "table_rows": table_rows, "ms": elapsed_ms})
+    return results
+
+
+# ────────── REPORTING ────────── #
+
+def _environment(conn) -> dict:
+    env = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": vg.numpy_available(),
+    }
+    try:
+        from importlib.metadata import version
+        env["cdcraft"] = version("dlt-hackathon")
+    except Exception:
+        env["cdcraft"] = "unknown"
+    if conn is not None:
+        with conn.cursor() as cur:
+            cur.execute("SHOW server_version")
+            env["postgres"] = cur.fetchone()[0]
+    return env
+
+
+def _flatten(results: dict) -> Dict[str, float]:
+    """Map every numeric result to a stable key, for --compare."""
+    flat = {}
+    for entry in results.get("generation", []):
+        for metric in ("row_rows_per_sec", "batch_rows_per_sec"):
+            if metric in entry:
+                flat[f"generation/{entry['column']}/{metric}"] = entry[metric]
+    for entry in results.get("writes", []):
+        for metric, value in entry.items():
+            if metric.endswith("_per_sec"):
+                flat[f"writes/{entry['sink']}/{entry['ingest_mode']}/{entry['batch_size']}/{metric}"] = value
+    for entry in results.get("ddl", []):
+        flat[f"ddl/{entry['action']}/{entry['column']}/ms"] = entry["ms"]
+    return flat
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.1):
+    """Print every metric that moved by more than `threshold` against a previous run."""
+    now, before = _flatten(current["results"]), _flatten(baseline["results"])
+    print(f"\n🔍 Compared with baseline from {baseline.get('timestamp', '?')}:")
+    changed = 0
+    for key in sorted(now.keys() & before.keys()):
+        if not before[key]:
+            continue
+        delta = (now[key] - before[key]) / before[key]
+        if abs(delta) >= threshold:
+            # Lower is better for DDL timings, higher for everything else
+            worse = delta > 0 if key.startswith("ddl/") else delta < 0
+            print(f" {'🔻' if worse else '🔺'} {key}: {before[key]} → {now[key]} ({delta:+.0%})")
+            changed += 1
+    if not changed:
+        print(f" No metric moved by more than {threshold:.0%}.")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark CDCraft's generation and write paths.")
+    parser.add_argument("--suites", default=",".join(SUITES),
+                        help=f"comma-separated subset of {','.join(SUITES)}")
+    parser.add_argument("--sink", choices=("postgres", "memory"), default="postgres",
+                        help="memory skips the database: generation and row encoding only")
+    parser.add_argument("--rows", type=int, default=20_000, help="rows per measurement")
+    parser.add_argument("--batch-sizes", default="100,500,2000")
+    parser.add_argument("--ingest-mode", choices=INGEST_MODES, default="values")
+    parser.add_argument("--ddl-rows", type=int, default=100_000, help="table size for the DDL suite")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the median is reported")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark.json", help="results file; benchmark*.json is git-ignored")
+    parser.add_argument("--compare", help="previous --output file to diff against")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    suites = [suite.strip() for suite in args.suites.split(",") if suite.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        sys.exit(f"Unknown suites: {sorted(unknown)}")
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+
+    seed_all(args.seed)
+
+    conn = None
+    schema = f"cdcraft_bench_{os.getpid()}"
+    if args.sink == "postgres":
+        conn = psycopg2.connect(**_conn_params())
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("CREATE SCHEMA {}").format(sql.Identifier(schema)))
+            cur.execute('CREATE EXTENSION IF NOT EXISTS "uuid-ossp";')
+        conn.commit()
+
+    results: Dict[str, list] = {}
+    try:
+        if "generation" in suites:
+            print("⏱️  generation ...")
+            results["generation"] = bench_generation(args.rows, args.repeat)
+        if "writes" in suites:
+            print("⏱️  writes ...")
+            if conn is None:
+                results["writes"] = bench_memory_writes(args.rows, batch_sizes, args.repeat)
+            else:
+                results["writes"] = bench_pg_writes(conn, schema, args.rows, batch_sizes, args.repeat, args.ingest_mode)
+        if "ddl" in suites and conn is not None:
+            print("⏱️  ddl ...")
+            results["ddl"] = bench_ddl(conn, schema, args.ddl_rows)
+
+        report = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "environment": _environment(conn),
+            "config": vars(args),
+            "results": results,
+        }
+    finally:
+        if conn is not None:
+            conn.rollback()
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(schema)))
+            conn.commit()
+            conn.close()
+
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    for suite, entries in results.items():
+        print(f"\n{suite}:")
+        for entry in entries:
+            print(" - " + ", ".join(f"{key}={value}" for key, value in entry.items()))
+
+    if args.compare:
+        with open(args.compare) as fh:
+            compare(report, json.load(fh))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+"""
+Checkpoints of simulator state, for resuming long runs.
+
+A checkpoint holds what a restart would otherwise lose:
+
+- the run position (batches and records written);
+- MutationEngine counters and transaction stats;
+- SchemaManager's active columns, the order of the remaining (shuffled)
+  column pool, the schema history, column aliases and migration history;
+- SchemaEvolutionController's add/drop/migration counts;
+- the phase histograms and the original schema, for the final report.
+
+The file is small and binary: the magic bytes, a format version, a CRC32
+and the payload length, then zlib-compressed JSON. It is written to a
+temporary file, fsynced and renamed over the old one, so a crash while
+saving leaves the previous checkpoint intact. A truncated or corrupted
+file fails its CRC check instead of resuming from garbage.
+
+Checkpointer saves every `interval` seconds at batch boundaries. It first
+commits the mutator's open transaction, so the counters match what is in
+the table. No checkpoint is taken while an online migration is in
+flight. Ctrl+C stops the run at the next batch boundary where it can
+save one. On resume, the state is reconciled with the live catalog:
+
+- columns added or dropped after the checkpoint are taken into account,
+  and the evolution counts follow;
+- a type changed by a migration is adopted;
+- the row count is compared with inserts minus deletes. After a second
+  Ctrl+C or a crash, transactions committed since the last checkpoint
+  are still in the table; their net rows are counted as inserts and move
+  the position on, so the run doesn't overshoot its record total. Their
+  updates and deletes can't be told apart and are not counted. Fewer
+  rows than expected (e.g. retired partitions) are only reported.
+
+Whole-table targeting reloads its key index from the table, so per-key
+touch counts start over.
+"""
+import json
+import os
+import signal
+import struct
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from psycopg2 import sql
+
+from copy_encoder import normalize_sql_type
+from metrics import registry
+from online_migrations import copy_definition
+
+MAGIC = b"CDCK"
+FORMAT_VERSION = 1
+# Magic, format version, CRC32 of the compressed payload, payload length
+_HEADER = struct.Struct("!4sHII")
+
+
+class CheckpointError(Exception):
+    pass
+
+
+def write_checkpoint(path: str, state: dict):
+    """Atomically replace `path` with a checkpoint of `state`."""
+    payload = zlib.compress(json.dumps(state, separators=(",", ":")).encode("utf-8"), 6)
+    data = _HEADER.pack(MAGIC, FORMAT_VERSION, zlib.crc32(payload), len(payload)) + payload
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def read_checkpoint(path: str) -> dict:
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if len(data) < _HEADER.size:
+        raise CheckpointError(f"{path} is too short to be a checkpoint")
+    magic, version, crc, length = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise CheckpointError(f"{path} is not a CDCraft checkpoint")
+    if version != FORMAT_VERSION:
+        raise CheckpointError(f"{path} has checkpoint format {version}; this version reads {FORMAT_VERSION}")
+    payload = data[_HEADER.size:]
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        raise CheckpointError(f"{path} is truncated or corrupted (CRC mismatch)")
+    return json.loads(zlib.decompress(payload))
+
+
+def _catalog_columns(conn, schema: str, table: str) -> Dict[str, str]:
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT a.attname, format_type(a.atttypid, a.atttypmod) FROM pg_attribute a "
+            "WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped ORDER BY a.attnum",
+            (sql.SQL("{}.{}").format(sql.Identifier(schema), sql.Identifier(table)).as_string(cur),),
+        )
+        columns = dict(cur.fetchall())
+    conn.commit()
+    return columns
+
+
+def _row_count(conn, schema: str, table: str) -> int:
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("SELECT count(*) FROM {}.{}").format(sql.Identifier(schema), sql.Identifier(table)))
+        (rows,) = cur.fetchone()
+    conn.commit()
+    return rows
+
+
+# Spellings PostgreSQL's format_type() reports differently from a column definition
+_CATALOG_NAMES = {
+    "int": "integer", "int4": "integer", "int2": "smallint", "int8": "bigint", "float": "double precision",
+    "float8": "double precision", "float4": "real", "bool": "boolean", "varchar": "character varying",
+    "timestamp": "timestamp without time zone", "timestamptz": "timestamp with time zone",
+}
+
+
+def _same_type(declared: str, catalog: str) -> bool:
+    declared = normalize_sql_type(declared)
+    return _CATALOG_NAMES.get(declared, declared) == normalize_sql_type(catalog)
+
+
+class Checkpointer:
+    def __init__(
+        self,
+        path: str,
+        schema_mgr,
+        mutator,
+        schema_evolver,
+        total_records: int,
+        interval: float = 60.0,
+        original_schema: Optional[Dict[str, str]] = None,
+        batch_tuner=None,
+    ):
+        """
+        path: checkpoint file, replaced on every save.
+        interval: seconds between checkpoints; 0 saves after every batch.
+        """
+        self.path = path
+        self.schema_mgr = schema_mgr
+        self.mutator = mutator
+        self.schema_evolver = schema_evolver
+        self.total_records = total_records
+        self.interval = interval
+        self.original_schema = dict(original_schema or {})
+        self.batch_tuner = batch_tuner
+
+        self.saves = 0
+        self.skipped_migrating = 0
+        self.save_seconds = 0.0
+        self.last_size = 0
+        self.stop_requested = False
+        self.stopped_cleanly = False
+        self._deferred = False
+        self._default_handler = None
+        # Records written before this process started, and the insert count this process started from
+        self._prior_written = 0
+        self._prior_elapsed = 0.0
+        self._batch_no = 0
+        self._start_inserts = mutator.total_inserts
+        self._started_at = time.perf_counter()
+        self._next_save = time.monotonic() + interval
+
+    # ────────── SAVING ────────── #
+
+    def position(self) -> Tuple[int, int]:
+        """(batches done, records written) to continue from; (0, 0) for a fresh run."""
+        return self._batch_no, self._written()
+
+    def _written(self) -> int:
+        return self._prior_written + self.mutator.total_inserts - self._start_inserts
+
+    def after_batch(self, batch_no: int):
+        """
+        Called by the runner after every batch; saves when the interval has
+        passed, or saves and raises KeyboardInterrupt once a stop was requested.
+        """
+        self._batch_no = batch_no
+        if self.stop_requested:
+            if self.save():
+                self.stopped_cleanly = True
+                raise KeyboardInterrupt
+        elif time.monotonic() >= self._next_save:
+            self.save()
+
+    def save(self, finished: bool = False) -> bool:
+        """Commit the mutator's open transaction and write a checkpoint. False when skipped for a migration."""
+        if self.schema_mgr.migrator.active is not None:
+            if not self._deferred:
+                self.skipped_migrating += 1
+                self._deferred = True
+            return False
+        self._deferred = False
+        started = time.perf_counter()
+        self.mutator.flush()
+        state = self._state(finished)
+        write_checkpoint(self.path, state)
+        self.saves += 1
+        self.save_seconds += time.perf_counter() - started
+        self.last_size = os.path.getsize(self.path)
+        self._next_save = time.monotonic() + self.interval
+        return True
+
+    def _state(self, finished: bool) -> dict:
+        schema_mgr = self.schema_mgr
+        evolver = self.schema_evolver
+        metrics_state = registry.export_state()
+        return {
+            "table": f"{schema_mgr.schema}.{schema_mgr.table_name}",
+            "saved_at": time.time(),
+            "finished": finished,
+            "total_records": self.total_records,
+            "position": {"batch": self._batch_no, "written": self._written()},
+            "elapsed_s": round(self._prior_elapsed + time.perf_counter() - self._started_at, 3),
+            "counters": self.mutator.get_counters(),
+            "txn_stats": dict(self.mutator.txn_stats),
+            "schema_version": self.mutator.schema_version,
+            "original_schema": self.original_schema,
+            "schema": {
+                "active": [
+                    [name, col_def.sql_type, col_def.constraints, schema_mgr.column_aliases.get(name, name)]
+                    for name, col_def in schema_mgr.active_columns.items()
+                ],
+                "pool": [col_def.name for col_def in schema_mgr.column_pool],
+                "history": schema_mgr.schema_history,
+                "aliases": schema_mgr.column_aliases,
+                "migrations": schema_mgr.migrator.history,
+            },
+            "evolver": {
+                "additions": evolver.num_additions,
+                "drops": evolver.num_drops,
+                "migrations": evolver.num_migrations,
+            },
+            "batch_size": self.batch_tuner.size if self.batch_tuner is not None else None,
+            "metrics": {
+                "histograms": [[phase, table, state] for (phase, table), state in metrics_state["histograms"].items()],
+                "rows": [[phase, table, rows] for (phase, table), rows in metrics_state["rows"].items()],
+            },
+        }
+
+    # ────────── STOPPING ────────── #
+
+    def watch_interrupts(self):
+        """
+        Turn the first Ctrl+C into a stop request, honoured by after_batch at
+        the next batch boundary where a checkpoint can be taken. A Ctrl+C in
+        the middle of a statement can't tell whether its rows were counted;
+        a second Ctrl+C still stops at once.
+        """
+        self._default_handler = signal.signal(signal.SIGINT, self._request_stop)
+
+    def _request_stop(self, signum, frame):
+        signal.signal(signal.SIGINT, self._default_handler)
+        self._default_handler = None
+        self.stop_requested = True
+        print("\n⏸️  Stopping at the end of this batch to save a checkpoint (Ctrl+C again to stop now)...")
+
+    def after_interrupt(self) -> bool:
+        """
+        True when the run stopped at a checkpoint. Otherwise the open
+        transaction is rolled back and the previous checkpoint stands.
+        """
+        if not self.stopped_cleanly:
+            self.mutator.rollback()
+        return self.stopped_cleanly
+
+    def close(self):
+        if self._default_handler is not None:
+            signal.signal(signal.SIGINT, self._default_handler)
+            self._default_handler = None
+
+    # ────────── RESUMING ────────── #
+
+    def resume(self, conn) -> List[str]:
+        """
+        Rebuild schema, counters and evolution state from the checkpoint at
+        `path`, reconciled with the table's live columns. Returns what the
+        reconciliation changed, one line per difference.
+        """
+        state = read_checkpoint(self.path)
+        schema_mgr = self.schema_mgr
+        table = f"{schema_mgr.schema}.{schema_mgr.table_name}"
+        if state["table"] != table:
+            raise CheckpointError(f"{self.path} is a checkpoint of {state['table']}, not {table}")
+
+        known = {col_def.name: col_def for col_def in schema_mgr.known_column_defs}
+        active = {}
+        for name, sql_type, constraints, source in state["schema"]["active"]:
+            col_def = known[source]
+            if (name, sql_type, constraints) != (col_def.name, col_def.sql_type, col_def.constraints):
+                col_def = copy_definition(col_def, name=name, sql_type=sql_type, constraints=constraints)
+            active[name] = col_def
+        schema_mgr.active_columns = active
+        schema_mgr.column_aliases = dict(state["schema"]["aliases"])
+        schema_mgr.schema_history = list(state["schema"]["history"])
+        schema_mgr.migrator.history = list(state["schema"]["migrations"])
+        schema_mgr.column_pool = [known[name] for name in state["schema"]["pool"] if name in known]
+
+        evolver = self.schema_evolver
+        evolver.num_additions = state["evolver"]["additions"]
+        evolver.num_drops = state["evolver"]["drops"]
+        evolver.num_migrations = state["evolver"]["migrations"]
+
+        notes = self._reconcile(_catalog_columns(conn, schema_mgr.schema, schema_mgr.table_name))
+
+        mutator = self.mutator
+        mutator.total_inserts = state["counters"]["total_inserts"]
+        mutator.total_updates = state["counters"]["total_updates"]
+        mutator.total_deletes = state["counters"]["total_deletes"]
+        mutator.txn_stats.update(state["txn_stats"])
+        if mutator.txn_stats["elapsed_seconds"]:
+            # Keep commits/s spanning the resumed runs
+            mutator._first_op_at = time.perf_counter() - mutator.txn_stats["elapsed_seconds"]
+        mutator.update_schema(schema_mgr.get_active_column_definitions())
+        mutator.schema_version = max(mutator.schema_version, state["schema_version"])
+        written = state["position"]["written"]
+        drift = _row_count(conn, schema_mgr.schema, schema_mgr.table_name) - (
+            mutator.total_inserts - mutator.total_deletes
+        )
+        notes += self._reconcile_rows(drift)
+        if drift > 0:
+            written += drift
+
+        registry.merge_state({
+            "histograms": {(phase, table): hist for phase, table, hist in state["metrics"]["histograms"]},
+            "rows": {(phase, table): rows for phase, table, rows in state["metrics"]["rows"]},
+        })
+        if self.batch_tuner is not None and state.get("batch_size"):
+            self.batch_tuner.size = self.batch_tuner.initial_size = state["batch_size"]
+
+        self.original_schema = dict(state["original_schema"])
+        self.total_records = state["total_records"]
+        self._batch_no = state["position"]["batch"]
+        self._prior_written = written
+        self._prior_elapsed = state["elapsed_s"]
+        self._start_inserts = mutator.total_inserts
+        self._started_at = time.perf_counter()
+        self._next_save = time.monotonic() + self.interval
+        self.resumed_state = state
+        return notes
+
+    def _reconcile(self, catalog: Dict[str, str]) -> List[str]:
+        schema_mgr = self.schema_mgr
+        evolver = self.schema_evolver
+        notes = []
+        for name in [name for name in schema_mgr.active_columns if name not in catalog]:
+            # Dropped after the checkpoint was taken
+            schema_mgr._record_dropped(name)
+            evolver.record_action("drop")
+            notes.append(f"column '{name}' is gone from the table; recorded as dropped")
+        for name, col_def in list(schema_mgr.active_columns.items()):
+            if not _same_type(col_def.sql_type, catalog[name]):
+                schema_mgr.active_columns[name] = copy_definition(col_def, sql_type=catalog[name].upper())
+                notes.append(f"column '{name}' is {catalog[name]} in the table, not {col_def.sql_type}; using the table's type")
+        pool = {col_def.name: col_def for col_def in schema_mgr.column_pool}
+        for name in catalog:
+            if name in schema_mgr.active_columns:
+                continue
+            if name in pool:
+                # Added after the checkpoint was taken
+                schema_mgr.column_pool.remove(pool[name])
+                schema_mgr._record_added(pool[name])
+                evolver.record_action("add")
+                notes.append(f"column '{name}' was added after the checkpoint; now active")
+            else:
+                notes.append(f"column '{name}' is not one CDCraft can generate (e.g. a shadow column); left alone")
+        return notes
+
+    def _reconcile_rows(self, drift: int) -> List[str]:
+        """Count rows committed after the checkpoint as inserts; `drift` is live rows minus inserts plus deletes."""
+        if drift > 0:
+            self.mutator.total_inserts += drift
+            return [
+                f"the table has {drift} more rows than the checkpoint's counters; "
+                f"counted as inserts committed after the checkpoint"
+            ]
+        if drift < 0:
+            return [
+                f"the table has {-drift} fewer rows than inserts minus deletes "
+                f"(e.g. retired partitions or deletes outside the run); counters left as saved"
+            ]
+        return []
+
+    def report(self) -> Dict[str, object]:
+        return {
+            "path": self.path,
+            "saves": self.saves,
+            "skipped_during_migrations": self.skipped_migrating,
+            "avg_save_ms": round(self.save_seconds / self.saves * 1000, 2) if self.saves else 0.0,
+            "size_bytes": self.last_size,
+        }
+
+    def summary_line(self) -> str:
+        report = self.report()
+        line = (
+            f"💾 Checkpoints: {report['saves']} saved to {report['path']} "
+            f"({report['size_bytes']:,} bytes, {report['avg_save_ms']} ms each incl. commit)"
+        )
+        if report["skipped_during_migrations"]:
+            line += f", {report['skipped_during_migrations']} deferred while a migration ran"
+        return line
+
+
+def print_resume_summary(checkpointer: Checkpointer, notes: List[str]):
+    state = checkpointer.resumed_state
+    position = state["position"]
+    age = time.time() - state["saved_at"]
+    print(
+        f"\n⏯️  Resuming {state['table']} from {checkpointer.path} (saved {age:.0f}s ago): "
+        f"{position['written']}/{state['total_records']} records after {position['batch']} batches, "
+        f"{len(checkpointer.schema_mgr.active_columns)} active columns"
+    )
+    if state["finished"]:
+        print(" - The checkpointed run had already finished; nothing is left to write.")
+    for note in notes:
+        print(f" - {note}")
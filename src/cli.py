@@ -1,7 +1,25 @@
+from metrics import registry
+from partitions import print_partition_report
 from prompt_utils import prompt_yes_no
 
-def handle_interrupt(schema_mgr, mutator, SCHEMA_EVOLVER, original_schema, conn):
+def handle_interrupt(schema_mgr, mutator, SCHEMA_EVOLVER, original_schema, conn, checkpointer=None):
     print("\n\U0001F6D1 Simulation interrupted!")
+    if checkpointer is not None:
+        if checkpointer.after_interrupt():
+            print(f"\U0001F4BE Checkpoint saved to {checkpointer.path}; run again with RESUME=true to continue.")
+        else:
+            print(
+                f"\U0001F4BE Kept the previous checkpoint in {checkpointer.path}; transactions committed since then "
+                f"stay in the table and are reconciled on resume."
+            )
+    else:
+        # conn.close() would roll the open transaction back anyway; take it out of the totals first
+        dropped = mutator.rollback()
+        if any(dropped.values()):
+            print(
+                f"\u21A9\uFE0F  Rolled back the open transaction ({dropped['total_inserts']} inserts, "
+                f"{dropped['total_updates']} updates, {dropped['total_deletes']} deletes); totals count committed rows only."
+            )
     print_final_report(schema_mgr, mutator, SCHEMA_EVOLVER, original_schema)
 
     if prompt_yes_no(f"\n\u26A0\uFE0F  Drop table '{schema_mgr.schema}.{schema_mgr.table_name}'?", default=False):
@@ -21,13 +39,53 @@ def print_final_report(schema_mgr, mutator, SCHEMA_EVOLVER, original_schema):
     print("Totals:")
     print(mutator.get_counters())
 
+    txn_stats = mutator.get_transaction_stats()
+    if txn_stats["commits"]:
+        print("\nTransactions:")
+        print(txn_stats)
+
+    if getattr(mutator, "live_index", None) is not None:
+        touches = mutator.live_index.touch_summary()
+        print(f"\nKey Touches ({mutator.access_pattern.describe()}):")
+        print(f" - Touches: {touches['total_touches']}, hottest 1% of live keys took {touches['top_1pct_share']:.1%}")
+        print(" - Keys by touch count: " + ", ".join(f"{label}: {keys}" for label, keys in touches["histogram"].items()))
+        for row_id, count in touches["top_keys"][:5]:
+            print(f"   • {row_id}: {count}")
+
+    phases = registry.phase_summary()
+    if phases:
+        print("\nPhase Timings:")
+        for entry in phases:
+            table = f"{entry['table']}." if entry["table"] else ""
+            print(
+                f" - {table}{entry['phase']}: {entry['ops']} ops, {entry['rows']} rows "
+                f"({entry['rows_per_sec']} rows/s), p50 {entry['p50_ms']} ms, "
+                f"p95 {entry['p95_ms']} ms, p99 {entry['p99_ms']} ms"
+            )
+
     print("\nOriginal Schema:")
     for col, dtype in original_schema.items():
         print(f" - {col}: {dtype}")
 
     print("\nSchema Changes:")
     for entry in schema_mgr.get_schema_history():
-        print(f" - {entry['action'].upper()}: {entry['column']}")
+        detail = f" ({entry['detail']})" if entry.get("detail") else ""
+        print(f" - {entry['action'].upper()}: {entry['column']}{detail}")
+
+    migrations = schema_mgr.migrator.summary()
+    if migrations or schema_mgr.migrator.active is not None:
+        print("\nOnline Migrations:")
+        for entry in migrations:
+            print(
+                f" - {entry['description']} [{entry['strategy']}]: {entry['state']} in {entry['elapsed_s']}s, "
+                f"{entry['lock_failures']} lock timeouts, {entry['backfilled_rows']} rows backfilled"
+            )
+        if schema_mgr.migrator.active is not None:
+            active = schema_mgr.migrator.active
+            print(f" - {active.describe()} [{active.strategy}]: still running, {active.backfilled} rows backfilled so far")
+
+    if getattr(schema_mgr, "partitions", None) is not None:
+        print_partition_report(schema_mgr.partitions)
 
     print("\nFinal Schema:")
     for col, dtype in schema_mgr.get_active_column_definitions().items():
@@ -1,4 +1,6 @@
-from typing import Any, Callable, Optional
+from typing import Any, Callable, List, Optional
+
+from value_pool import DEFAULT_POOL_SIZE, ValuePool
 
 class ColumnDefinition:
     """
@@ -9,16 +11,36 @@ class ColumnDefinition:
         self, name: str, 
         sql_type: str, 
         generator: Callable[[], Any],
-        constraints: Optional[str] = None  # e.g., "PRIMARY KEY NOT NULL"
+        constraints: Optional[str] = None,  # e.g., "PRIMARY KEY NOT NULL"
+        batch_generator: Optional[Callable[[int], List[Any]]] = None,
+        pool_size: Optional[int] = None,  # serve values from a pre-generated ValuePool
+        cardinality: Optional[int] = None  # distinct values in that pool; None keeps every value fresh
         ):
         self.name = name
         self.sql_type = sql_type
         self.generator = generator
         self.constraints = constraints or ""
+        self.batch_generator = batch_generator
+        self.value_pool = None
+        if pool_size or cardinality:
+            self.value_pool = ValuePool(generator, pool_size or DEFAULT_POOL_SIZE, cardinality)
 
     def generate(self) -> Any:
+        if self.value_pool is not None:
+            return self.value_pool.next()
         return self.generator()
 
+    def generate_column(self, n: int) -> List[Any]:
+        """
+        Generate n values at once, using the batch generator when one is set,
+        then the value pool.
+        """
+        if self.batch_generator is not None:
+            return self.batch_generator(n)
+        if self.value_pool is not None:
+            return self.value_pool.take(n)
+        return [self.generator() for _ in range(n)]
+
     def ddl(self) -> str:
         """
         Generate DDL fragment for this column.
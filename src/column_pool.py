@@ -4,6 +4,7 @@ import string
 import uuid
 from column_manager import ColumnDefinition
 from faker import Faker
+import vector_generators as vg
 
 fake = Faker()
 
@@ -20,30 +21,53 @@ def random_bool():
 def random_timestamp():
     return datetime.utcnow() - timedelta(days=random.randint(0, 1000))
 
+def random_uuid():
+    # Drawn from `random` rather than os.urandom so seeded runs replay the same ids
+    return str(uuid.UUID(int=random.getrandbits(128), version=4))
+
 # Pre-defined column pool (we'll track which ones were used)
 COLUMN_POOL = [
-    ColumnDefinition("promo_code", "text", lambda: random_string(5).upper()),
-    ColumnDefinition("discount_rate", "float", random_float),
-    ColumnDefinition("is_gift", "boolean", random_bool),
-    ColumnDefinition("sales_channel", "text", lambda: random.choice(["web", "mobile", "store"])),
-    ColumnDefinition("region", "text", lambda: random.choice(["NA", "EU", "APAC"])),
-    ColumnDefinition("currency", "text", lambda: random.choice(["USD", "EUR", "GBP", "NGN"])),
-    ColumnDefinition("payment_method", "text", lambda: random.choice(["card", "paypal", "bank_transfer"])),
-    ColumnDefinition("is_returned", "boolean", random_bool),
-    ColumnDefinition("customer_tier", "text", lambda: random.choice(["bronze", "silver", "gold", "platinum"])),
-    ColumnDefinition("tax_amount", "float", lambda: round(random.uniform(0, 500), 2))
+    ColumnDefinition("promo_code", "text", lambda: random_string(5).upper(),
+                     batch_generator=vg.uppercase_strings(5)),
+    ColumnDefinition("discount_rate", "float", random_float,
+                     batch_generator=vg.uniform_floats(10, 1000)),
+    ColumnDefinition("is_gift", "boolean", random_bool,
+                     batch_generator=vg.random_bools()),
+    ColumnDefinition("sales_channel", "text", lambda: random.choice(["web", "mobile", "store"]),
+                     batch_generator=vg.random_choices(["web", "mobile", "store"])),
+    ColumnDefinition("region", "text", lambda: random.choice(["NA", "EU", "APAC"]),
+                     batch_generator=vg.random_choices(["NA", "EU", "APAC"])),
+    ColumnDefinition("currency", "text", lambda: random.choice(["USD", "EUR", "GBP", "NGN"]),
+                     batch_generator=vg.random_choices(["USD", "EUR", "GBP", "NGN"])),
+    ColumnDefinition("payment_method", "text", lambda: random.choice(["card", "paypal", "bank_transfer"]),
+                     batch_generator=vg.random_choices(["card", "paypal", "bank_transfer"])),
+    ColumnDefinition("is_returned", "boolean", random_bool,
+                     batch_generator=vg.random_bools()),
+    ColumnDefinition("customer_tier", "text", lambda: random.choice(["bronze", "silver", "gold", "platinum"]),
+                     batch_generator=vg.random_choices(["bronze", "silver", "gold", "platinum"])),
+    ColumnDefinition("tax_amount", "float", lambda: round(random.uniform(0, 500), 2),
+                     batch_generator=vg.uniform_floats(0, 500))
 ]
 
 
 BASE_COLUMN_DEFINITIONS = [
-    ColumnDefinition("id", "UUID", lambda: str(uuid.uuid4()), constraints="PRIMARY KEY DEFAULT uuid_generate_v4()"),
-    ColumnDefinition("customer_name", "TEXT", fake.name, constraints="NOT NULL"),
-    ColumnDefinition("item_id", "INTEGER", lambda: random.randint(1, 10000), constraints="NOT NULL"),
-    ColumnDefinition("quantity", "INTEGER", lambda: random.randint(1, 10), constraints="NOT NULL"),
-    ColumnDefinition("total_amount", "FLOAT", lambda: round(random.uniform(5.0, 10000.0), 2), constraints="NOT NULL"),
-    ColumnDefinition("purchased_at", "TIMESTAMP WITHOUT TIME ZONE", lambda: fake.date_time_between(start_date='-2y', end_date='now'), constraints="NOT NULL"),
-    ColumnDefinition("created_at", "TIMESTAMP WITHOUT TIME ZONE", lambda: datetime.utcnow(), constraints="NOT NULL DEFAULT now()"),
-    ColumnDefinition("updated_at", "TIMESTAMP WITHOUT TIME ZONE", lambda: datetime.utcnow(), constraints="NOT NULL DEFAULT now()")
+    ColumnDefinition("id", "UUID", random_uuid, constraints="PRIMARY KEY DEFAULT uuid_generate_v4()",
+                     batch_generator=vg.uuid4_strings()),
+    # Faker providers cost tens of microseconds per call, so these two are served from value pools
+    ColumnDefinition("customer_name", "TEXT", fake.name, constraints="NOT NULL",
+                     cardinality=50_000),
+    ColumnDefinition("item_id", "INTEGER", lambda: random.randint(1, 10000), constraints="NOT NULL",
+                     batch_generator=vg.random_ints(1, 10000)),
+    ColumnDefinition("quantity", "INTEGER", lambda: random.randint(1, 10), constraints="NOT NULL",
+                     batch_generator=vg.random_ints(1, 10)),
+    ColumnDefinition("total_amount", "FLOAT", lambda: round(random.uniform(5.0, 10000.0), 2), constraints="NOT NULL",
+                     batch_generator=vg.uniform_floats(5.0, 10000.0)),
+    ColumnDefinition("purchased_at", "TIMESTAMP WITHOUT TIME ZONE", lambda: fake.date_time_between(start_date='-2y', end_date='now'), constraints="NOT NULL",
+                     batch_generator=vg.timestamps_between(timedelta(days=730)), pool_size=65_536),
+    ColumnDefinition("created_at", "TIMESTAMP WITHOUT TIME ZONE", lambda: datetime.utcnow(), constraints="NOT NULL DEFAULT now()",
+                     batch_generator=vg.current_timestamps()),
+    ColumnDefinition("updated_at", "TIMESTAMP WITHOUT TIME ZONE", lambda: datetime.utcnow(), constraints="NOT NULL DEFAULT now()",
+                     batch_generator=vg.current_timestamps())
 ]
 
 PROTECTED_COLUMNS = {"id", "created_at", "updated_at"}
\ No newline at end of file
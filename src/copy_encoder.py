@@ -0,0 +1,202 @@
+import io
+import re
+import struct
+import uuid
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+# ────────── TEXT FORMAT ────────── #
+
+_TEXT_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\r": "\\r",
+})
+
+
+def _text_value(value: Any) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, str):
+        return value.translate(_TEXT_ESCAPES)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # bytea hex format; the backslash itself is escaped for COPY
+        return "\\\\x" + value.hex()
+    if isinstance(value, list):
+        return "{" + ",".join("NULL" if item is None else str(item) for item in value) + "}"
+    return str(value).translate(_TEXT_ESCAPES)
+
+
+def encode_text_copy(rows: Iterable[Sequence[Any]]) -> io.BytesIO:
+    """
+    Encode rows (already in column order) as a COPY text-format buffer.
+    """
+    lines = ["\t".join(map(_text_value, row)) for row in rows]
+    if not lines:
+        return io.BytesIO()
+    return io.BytesIO(("\n".join(lines) + "\n").encode("utf-8"))
+
+
+# ────────── BINARY FORMAT ────────── #
+
+_BINARY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+_BINARY_HEADER = _BINARY_SIGNATURE + struct.pack("!ii", 0, 0)
+_BINARY_TRAILER = struct.pack("!h", -1)
+_NULL_FIELD = struct.pack("!i", -1)
+
+_PG_EPOCH = datetime(2000, 1, 1)
+_PG_EPOCH_TZ = datetime(2000, 1, 1, tzinfo=timezone.utc)
+_PG_EPOCH_DATE = date(2000, 1, 1)
+
+_INT2 = struct.Struct("!h")
+_INT4 = struct.Struct("!i")
+_INT8 = struct.Struct("!q")
+_FLOAT4 = struct.Struct("!f")
+_FLOAT8 = struct.Struct("!d")
+
+
+def _encode_uuid(value: Any) -> bytes:
+    if isinstance(value, uuid.UUID):
+        return value.bytes
+    return uuid.UUID(str(value)).bytes
+
+
+def _encode_text(value: Any) -> bytes:
+    return str(value).encode("utf-8")
+
+
+def _encode_bool(value: Any) -> bytes:
+    return b"\x01" if value else b"\x00"
+
+
+def _encode_timestamp(value: datetime) -> bytes:
+    if value.tzinfo is not None:
+        delta = value - _PG_EPOCH_TZ
+    else:
+        delta = value - _PG_EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return _INT8.pack(micros)
+
+
+def _encode_date(value: date) -> bytes:
+    return _INT4.pack((value - _PG_EPOCH_DATE).days)
+
+
+def _encode_bytea(value: Any) -> bytes:
+    # bytes and memoryviews are written to the COPY buffer as they are, without a copy
+    if isinstance(value, (bytes, memoryview)):
+        return value
+    return bytes(value)
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    # jsonb binary format: a version byte, then the JSON text
+    return b"\x01" + _encode_text(value)
+
+
+_ARRAY_HEADER = struct.Struct("!iiiii")
+
+
+def _int_array_encoder(element_oid: int, width: int, code: str) -> Callable[[Any], bytes]:
+    """One-dimensional arrays without NULLs: header, dimension, then (length, value) per element."""
+    def encode(values: Sequence[int]) -> bytes:
+        header = _ARRAY_HEADER.pack(1, 0, element_oid, len(values), 1)
+        fields = [item for value in values for item in (width, value)]
+        return header + struct.pack("!" + ("i" + code) * len(values), *fields)
+    return encode
+
+
+_BINARY_ENCODERS: Dict[str, Callable[[Any], bytes]] = {
+    "uuid": _encode_uuid,
+    "text": _encode_text,
+    "varchar": _encode_text,
+    "character varying": _encode_text,
+    "smallint": _INT2.pack,
+    "int2": _INT2.pack,
+    "integer": _INT4.pack,
+    "int": _INT4.pack,
+    "int4": _INT4.pack,
+    "bigint": _INT8.pack,
+    "int8": _INT8.pack,
+    "real": _FLOAT4.pack,
+    "float4": _FLOAT4.pack,
+    "float": _FLOAT8.pack,
+    "float8": _FLOAT8.pack,
+    "double precision": _FLOAT8.pack,
+    "boolean": _encode_bool,
+    "bool": _encode_bool,
+    "timestamp": _encode_timestamp,
+    "timestamp without time zone": _encode_timestamp,
+    "timestamptz": _encode_timestamp,
+    "timestamp with time zone": _encode_timestamp,
+    "date": _encode_date,
+    "bytea": _encode_bytea,
+    "json": _encode_text,
+    "jsonb": _encode_jsonb,
+    "smallint[]": _int_array_encoder(21, 2, "h"),
+    "int2[]": _int_array_encoder(21, 2, "h"),
+    "integer[]": _int_array_encoder(23, 4, "i"),
+    "int[]": _int_array_encoder(23, 4, "i"),
+    "int4[]": _int_array_encoder(23, 4, "i"),
+    "bigint[]": _int_array_encoder(20, 8, "q"),
+    "int8[]": _int_array_encoder(20, 8, "q"),
+}
+
+
+def normalize_sql_type(sql_type: str) -> str:
+    """
+    Lower-case a SQL type and strip modifiers, e.g. 'VARCHAR(20)' -> 'varchar'.
+    """
+    base = re.sub(r"\(.*?\)", "", sql_type)
+    return " ".join(base.lower().split())
+
+
+def binary_encoders_for(column_types: Dict[str, str]) -> List[Callable[[Any], bytes]]:
+    """
+    Resolve a binary field encoder for every column, in order.
+    Raises ValueError for types that have no binary encoder.
+    """
+    encoders = []
+    for column, sql_type in column_types.items():
+        encoder = _BINARY_ENCODERS.get(normalize_sql_type(sql_type))
+        if encoder is None:
+            raise ValueError(
+                f"No binary COPY encoder for column '{column}' of type '{sql_type}'. "
+                f"Use the 'copy_text' ingest mode for this table."
+            )
+        encoders.append(encoder)
+    return encoders
+
+
+def encode_binary_copy(
+    rows: Iterable[Sequence[Any]],
+    encoders: Sequence[Callable[[Any], bytes]],
+) -> io.BytesIO:
+    """
+    Encode rows (already in column order) as a COPY binary-format buffer.
+    """
+    buffer = io.BytesIO()
+    write = buffer.write
+    write(_BINARY_HEADER)
+    field_count = _INT2.pack(len(encoders))
+
+    for row in rows:
+        write(field_count)
+        for encoder, value in zip(encoders, row):
+            if value is None:
+                write(_NULL_FIELD)
+                continue
+            data = encoder(value)
+            write(_INT4.pack(len(data)))
+            write(data)
+
+    write(_BINARY_TRAILER)
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,690 @@
+"""
+Offline file sink: Debezium-shaped change events written straight to
+files, for load-testing downstream consumers without PostgreSQL.
+
+FileSinkMutationEngine keeps the MutationEngine surface. Instead of
+statements it emits one envelope per row:
+
+    {"before": {...} | null, "after": {...} | null,
+     "source": {"connector": "postgresql", "schema": ..., "table": ..., "txId": ..., "lsn": ...},
+     "op": "c" | "u" | "d", "ts_ms": ...}
+
+Values follow the Debezium JSON converter defaults:
+
+- TIMESTAMP columns become epoch microseconds, and DATE columns epoch days.
+- NUMERIC and FLOAT columns become doubles.
+- BYTEA values are base64 in NDJSON and raw bytes in Avro and Parquet.
+- JSON/JSONB values are strings.
+
+Before images follow the table's replica identity:
+
+- FULL gives whole before rows.
+- DEFAULT gives no before image on updates, and only the key on deletes.
+
+Rows the simulator may still mutate are kept in memory for this. With
+"batch" targeting, that is just the last inserted batch.
+
+OfflineSchemaManager evolves the column set without DDL. Every
+schema_history entry becomes a Debezium schema-change event with the
+resulting columns. These go to <table>.schema-changes.ndjson, the file
+equivalent of Debezium's separate schema-change topic.
+
+Events are buffered and written out in batches at commit points.
+Commits become Parquet row groups, Avro blocks, or one write per batch of
+NDJSON lines. Files rotate after `rotate_events` events or `rotate_seconds`.
+Avro and Parquet files also rotate on every schema change, because their
+schema is fixed per file. A file is written as <name>.inprogress and
+renamed once complete. Parquet needs `pyarrow`, and zstd compression
+needs `zstandard` (pip install 'dlt-hackathon[sink]'). Avro is encoded in
+avro_encoder, and its snappy codec needs `python-snappy`.
+"""
+import base64
+import gzip
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; only needed for FILE_SINK_FORMAT=parquet
+    pa = pq = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; only needed for zstd-compressed NDJSON
+    zstandard = None
+
+import avro_encoder as avro
+from batch_generator import BatchGenerator
+from column_manager import ColumnDefinition
+from copy_encoder import normalize_sql_type
+from metrics import registry
+from mutation_engine import MutationEngine
+from schema_manager import SchemaManager
+
+FORMATS = ("ndjson", "avro", "parquet")
+
+# Compression name -> what each format calls it; None means unsupported
+COMPRESSIONS = {
+    "none": {"ndjson": "none", "avro": "null", "parquet": "none"},
+    "gzip": {"ndjson": "gzip", "avro": "deflate", "parquet": "gzip"},
+    "snappy": {"ndjson": None, "avro": "snappy", "parquet": "snappy"},
+    "zstd": {"ndjson": "zstd", "avro": "zstandard", "parquet": "zstd"},
+}
+
+_EXTENSIONS = {"ndjson": "ndjson", "avro": "avro", "parquet": "parquet"}
+_NDJSON_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+# Buffered events are written out at the first commit past this many
+DEFAULT_BUFFER_EVENTS = 50_000
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_DATE = date(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+_encode_json = json.JSONEncoder(separators=(",", ":")).encode
+_json_string = json.encoder.encode_basestring_ascii
+
+
+# ────────── VALUE MAPPING ────────── #
+
+def column_kind(sql_type: str) -> str:
+    """Debezium-style logical kind of a SQL type: string, int, long, double, boolean, timestamp, zoned, date, bytes or an array of one."""
+    sql_type = normalize_sql_type(sql_type)
+    if sql_type.endswith("[]"):
+        return "array:" + column_kind(sql_type[:-2])
+    if sql_type.startswith("timestamp"):
+        return "zoned" if "with time zone" in sql_type or sql_type == "timestamptz" else "timestamp"
+    if sql_type == "date":
+        return "date"
+    if sql_type in ("integer", "int", "int4", "smallint", "int2", "serial"):
+        return "int"
+    if sql_type in ("bigint", "int8", "bigserial"):
+        return "long"
+    if sql_type.startswith(("float", "double", "real", "numeric", "decimal")):
+        return "double"
+    if sql_type in ("boolean", "bool"):
+        return "boolean"
+    if sql_type == "bytea":
+        return "bytes"
+    return "string"
+
+
+def _micros(value: datetime) -> int:
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _days(value: date) -> int:
+    return (value - _EPOCH_DATE).days
+
+
+def _base64(value) -> str:
+    return base64.b64encode(value).decode("ascii")
+
+
+def _json_fragment(kind: str) -> Callable[[Any], str]:
+    """Encoder of one column kind's (non-NULL) values to JSON text."""
+    if kind == "string":
+        return _json_string
+    if kind in ("int", "long", "double"):
+        return repr
+    if kind == "boolean":
+        return lambda value: "true" if value else "false"
+    if kind == "timestamp":
+        return lambda value: str(_micros(value))
+    if kind == "zoned":
+        return lambda value: _json_string(value.isoformat())
+    if kind == "date":
+        return lambda value: str(_days(value))
+    if kind == "bytes":
+        return lambda value: '"' + _base64(value) + '"'
+    return _encode_json
+
+
+# Timestamps are costly to convert and often repeat within a batch (created_at, updated_at)
+_DEDUPE_KINDS = ("timestamp", "zoned", "date")
+
+
+def _encode_by_column(rows: List[Sequence[Any]], encoders: List[Callable], dedupe: List[bool], null) -> Iterable[tuple]:
+    """
+    Encoded fields per row. Values are encoded column by column with one
+    function per type, which is several times faster than walking each row
+    through a generic encoder. `null` stands in for NULLs.
+    """
+    encoded = []
+    for encode, repeats, values in zip(encoders, dedupe, zip(*rows)):
+        if None in values:
+            encode = _or_null(encode, null)
+        if repeats:
+            texts = {value: encode(value) for value in dict.fromkeys(values)}
+            encoded.append(list(map(texts.__getitem__, values)))
+        else:
+            encoded.append(list(map(encode, values)))
+    return zip(*encoded)
+
+
+def _or_null(encode: Callable[[Any], Any], null) -> Callable[[Any], Any]:
+    return lambda value: null if value is None else encode(value)
+
+
+def _arrow_converter(kind: str) -> Optional[Callable[[Any], Any]]:
+    """
+    Conversion of one column kind's values for pyarrow; None when values
+    pass through as they are (pyarrow takes datetime and date objects).
+    """
+    return bytes if kind == "bytes" else None
+
+
+# ────────── FILE FORMATS ────────── #
+
+# One buffered operation: (op, before rows, after rows, ts_ms, txId, lsn of the first row)
+Operation = Tuple[str, Optional[List[Sequence[Any]]], Optional[List[Sequence[Any]]], int, int, int]
+
+
+class _NdjsonFile:
+    def __init__(self, path: str, names: List[str], kinds: List[str], compression: str, source: dict):
+        if compression == "zstd":
+            if zstandard is None:
+                raise RuntimeError("zstd-compressed NDJSON requires zstandard (pip install zstandard)")
+            self._raw = open(path, "wb")
+            self._fh = zstandard.ZstdCompressor(level=3).stream_writer(self._raw)
+        elif compression == "gzip":
+            # Level 1: roughly 3x faster than the default and most of the size win on JSON
+            self._raw = None
+            self._fh = gzip.open(path, "wb", compresslevel=1)
+        else:
+            self._raw = None
+            self._fh = open(path, "wb")
+        self.set_columns(names, kinds)
+        self._source_head = _encode_json(source)[:-1] + ',"txId":'
+
+    def set_columns(self, names: List[str], kinds: List[str]):
+        """NDJSON lines carry their own shape, so one file spans schema changes."""
+        self.names = names
+        self._encoders = [_json_fragment(kind) for kind in kinds]
+        self._dedupe = [kind in _DEDUPE_KINDS for kind in kinds]
+        self._template = "{" + ",".join(_json_string(name).replace("%", "%%") + ":%s" for name in names) + "}"
+
+    def _objects(self, rows: List[Sequence[Any]]) -> List[str]:
+        template = self._template
+        return [template % fields for fields in _encode_by_column(rows, self._encoders, self._dedupe, "null")]
+
+    def write(self, operations: List[Operation]):
+        head = self._source_head
+        lines = []
+        for op, before, after, ts_ms, txid, lsn in operations:
+            source = f'{head}{txid},"ts_ms":{ts_ms},"lsn":'
+            tail = f'}},"op":"{op}","ts_ms":{ts_ms}}}'
+            old = self._objects(before) if before is not None else ["null"] * len(after)
+            new = self._objects(after) if after is not None else ["null"] * len(before)
+            lines.extend(
+                f'{{"before":{old_json},"after":{new_json},"source":{source}{lsn + offset}{tail}'
+                for offset, (old_json, new_json) in enumerate(zip(old, new))
+            )
+        self._fh.write(("\n".join(lines) + "\n").encode("utf-8"))
+
+    def close(self):
+        self._fh.close()
+        if self._raw is not None and not self._raw.closed:
+            self._raw.close()
+
+
+def _nulls(rows: Optional[list]) -> List[None]:
+    return [None] * len(rows)
+
+
+def _avro_type(kind: str) -> Any:
+    if kind.startswith("array:"):
+        return {"type": "array", "items": _avro_type(kind[6:])}
+    return {
+        "timestamp": {"type": "long", "logicalType": "timestamp-micros"},
+        "zoned": "string",
+        "date": {"type": "int", "logicalType": "date"},
+        "bytes": "bytes",
+    }.get(kind, kind)
+
+
+def _avro_fragment(kind: str) -> Callable[[Any], bytes]:
+    """Encoder of one column kind's (non-NULL) values as the non-null branch of a ["null", T] union."""
+    encode = avro.value_encoder(_avro_type(kind))
+    convert = {"timestamp": _micros, "zoned": datetime.isoformat, "date": _days}.get(kind)
+    if convert is None:
+        return lambda value: avro.PRESENT + encode(value)
+    return lambda value: avro.PRESENT + encode(convert(value))
+
+
+class _AvroFile:
+    def __init__(self, path: str, names: List[str], kinds: List[str], compression: str, source: dict):
+        namespace = f"{source['name']}.{source['schema']}.{source['table']}"
+        value = {
+            "type": "record", "name": "Value", "namespace": namespace,
+            "fields": [{"name": name, "type": ["null", _avro_type(kind)], "default": None}
+                       for name, kind in zip(names, kinds)],
+        }
+        source_fields = [{"name": key, "type": "string"} for key in source]
+        source_fields += [{"name": key, "type": "long"} for key in ("txId", "ts_ms", "lsn")]
+        schema = {
+            "type": "record", "name": "Envelope", "namespace": namespace,
+            "fields": [
+                {"name": "before", "type": ["null", value], "default": None},
+                {"name": "after", "type": ["null", f"{namespace}.Value"], "default": None},
+                {"name": "source", "type": {"type": "record", "name": "Source", "namespace": "io.debezium.connector.postgresql",
+                                            "fields": source_fields}},
+                {"name": "op", "type": "string"},
+                {"name": "ts_ms", "type": "long"},
+            ],
+        }
+        self._writer = avro.ContainerWriter(open(path, "wb"), schema, codec=compression)
+        self._encoders = [_avro_fragment(kind) for kind in kinds]
+        self._dedupe = [kind in _DEDUPE_KINDS for kind in kinds]
+        self._source = b"".join(avro.encode_string(value) for value in source.values())
+
+    def _records(self, rows: List[Sequence[Any]]) -> List[bytes]:
+        return [
+            avro.PRESENT + b"".join(fields)
+            for fields in _encode_by_column(rows, self._encoders, self._dedupe, avro.NULL)
+        ]
+
+    def write(self, operations: List[Operation]):
+        records = []
+        for op, before, after, ts_ms, txid, lsn in operations:
+            count = len(before if before is not None else after)
+            old = self._records(before) if before is not None else [avro.NULL] * count
+            new = self._records(after) if after is not None else [avro.NULL] * count
+            source = self._source + avro.encode_long(txid) + avro.encode_long(ts_ms)
+            tail = avro.encode_string(op) + avro.encode_long(ts_ms)
+            records.extend(
+                old_record + new_record + source + avro.encode_long(lsn + offset) + tail
+                for offset, (old_record, new_record) in enumerate(zip(old, new))
+            )
+        self._writer.write_block(records)
+
+    def close(self):
+        self._writer.close()
+
+
+def _arrow_type(kind: str):
+    if kind.startswith("array:"):
+        return pa.list_(_arrow_type(kind[6:]))
+    return {
+        "string": pa.string(), "int": pa.int32(), "long": pa.int64(), "double": pa.float64(),
+        "boolean": pa.bool_(), "timestamp": pa.timestamp("us"), "zoned": pa.timestamp("us", tz="UTC"),
+        "date": pa.date32(), "bytes": pa.binary(),
+    }[kind]
+
+
+class _ParquetFile:
+    def __init__(self, path: str, names: List[str], kinds: List[str], compression: str, source: dict):
+        if pa is None:
+            raise RuntimeError("FILE_SINK_FORMAT=parquet requires pyarrow (pip install pyarrow)")
+        self.names = names
+        self._value_type = pa.struct([pa.field(name, _arrow_type(kind)) for name, kind in zip(names, kinds)])
+        self._converters = [_arrow_converter(kind) for kind in kinds]
+        self._source = source
+        source_type = pa.struct(
+            [pa.field(key, pa.string()) for key in source]
+            + [pa.field(key, pa.int64()) for key in ("txId", "ts_ms", "lsn")]
+        )
+        self._schema = pa.schema([
+            pa.field("before", self._value_type), pa.field("after", self._value_type),
+            pa.field("source", source_type), pa.field("op", pa.string()), pa.field("ts_ms", pa.int64()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema, compression=compression)
+
+    def _image(self, rows: List[Optional[Sequence[Any]]]):
+        empty = [None] * len(self.names)
+        columns = list(zip(*(row if row is not None else empty for row in rows))) or [[] for _ in self.names]
+        arrays = []
+        for values, field, fn in zip(columns, self._value_type, self._converters):
+            if fn is not None:
+                values = [fn(value) if value is not None else None for value in values]
+            arrays.append(pa.array(values, type=field.type))
+        mask = pa.array([row is None for row in rows], type=pa.bool_())
+        return pa.StructArray.from_arrays(arrays, fields=list(self._value_type), mask=mask)
+
+    def write(self, operations: List[Operation]):
+        before, after, ops, ts, txids, lsns = [], [], [], [], [], []
+        for op, old_rows, new_rows, ts_ms, txid, lsn in operations:
+            count = len(old_rows if old_rows is not None else new_rows)
+            before.extend(old_rows if old_rows is not None else _nulls(new_rows))
+            after.extend(new_rows if new_rows is not None else _nulls(old_rows))
+            ops.extend([op] * count)
+            ts.extend([ts_ms] * count)
+            txids.extend([txid] * count)
+            lsns.extend(range(lsn, lsn + count))
+
+        rows = len(ops)
+        source = pa.StructArray.from_arrays(
+            [pa.array([value] * rows, type=pa.string()) for value in self._source.values()]
+            + [pa.array(txids, pa.int64()), pa.array(ts, pa.int64()), pa.array(lsns, pa.int64())],
+            fields=list(self._schema.field("source").type),
+        )
+        self._writer.write_table(pa.Table.from_arrays(
+            [self._image(before), self._image(after), source, pa.array(ops, pa.string()), pa.array(ts, pa.int64())],
+            schema=self._schema,
+        ))
+
+    def close(self):
+        self._writer.close()
+
+
+_FILE_TYPES = {"ndjson": _NdjsonFile, "avro": _AvroFile, "parquet": _ParquetFile}
+
+
+class ChangeEventFiles:
+    """
+    Rotating, buffered event files for one table (and one worker process).
+    Files are named <table>[.w<worker>].<seq>.<ext>.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        schema: str,
+        table: str,
+        fmt: str = "ndjson",
+        compression: str = "none",
+        rotate_events: int = 1_000_000,
+        rotate_seconds: float = 0.0,
+        buffer_events: int = DEFAULT_BUFFER_EVENTS,
+        worker: Optional[int] = None,
+        topic_prefix: str = "cdcraft",
+        database: str = "cdcraft",
+    ):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown file sink format '{fmt}', expected one of {FORMATS}")
+        if compression not in COMPRESSIONS or COMPRESSIONS[compression][fmt] is None:
+            supported = [name for name, codecs in COMPRESSIONS.items() if codecs[fmt] is not None]
+            raise ValueError(f"Compression '{compression}' is not available for {fmt}, expected one of {supported}")
+
+        self.directory = directory
+        self.table = table
+        self.fmt = fmt
+        self.codec = COMPRESSIONS[compression][fmt]
+        self.rotate_events = rotate_events
+        self.rotate_seconds = rotate_seconds
+        self.buffer_events = buffer_events
+        self.worker = worker
+        self.source = {
+            "version": "cdcraft", "connector": "postgresql", "name": topic_prefix,
+            "db": database, "schema": schema, "table": table,
+        }
+        os.makedirs(directory, exist_ok=True)
+
+        self.names: List[str] = []
+        self.kinds: List[str] = []
+        self.total_files = 0
+        self.total_events = 0
+        self.total_bytes = 0
+        self._file = None
+        self._path: Optional[str] = None
+        self._seq = 0
+        self._file_events = 0
+        self._opened_at = 0.0
+        self._pending: List[Operation] = []
+        self._pending_events = 0
+        self._lsn = 0
+
+    def set_columns(self, column_types: Dict[str, str]):
+        """Switch to a new column set; Avro and Parquet start a new file for it."""
+        names = list(column_types)
+        kinds = [column_kind(sql_type) for sql_type in column_types.values()]
+        if names == self.names and kinds == self.kinds:
+            return
+        self._write_pending()
+        if self.fmt != "ndjson":
+            self._close_file()
+        self.names, self.kinds = names, kinds
+        if self._file is not None:
+            self._file.set_columns(names, kinds)
+
+    def append(self, op: str, before: Optional[List[Sequence[Any]]], after: Optional[List[Sequence[Any]]], txid: int):
+        """Buffer one statement's events; rows are in set_columns() order."""
+        count = len(before if before is not None else after)
+        self._pending.append((op, before, after, int(time.time() * 1000), txid, self._lsn))
+        self._pending_events += count
+        self._lsn += count
+
+    def commit(self):
+        """A transaction boundary: write out a full buffer, then rotate if the file is due."""
+        if self._pending_events >= self.buffer_events:
+            self._write_pending()
+        if self._file is not None and (
+            self._file_events >= self.rotate_events
+            or (self.rotate_seconds and time.monotonic() - self._opened_at >= self.rotate_seconds)
+        ):
+            self._write_pending()
+            self._close_file()
+
+    def close(self):
+        self._write_pending()
+        self._close_file()
+
+    def _write_pending(self):
+        if not self._pending:
+            return
+        if self._file is None:
+            self._open_file()
+        self._file.write(self._pending)
+        self._file_events += self._pending_events
+        self.total_events += self._pending_events
+        self._pending = []
+        self._pending_events = 0
+
+    def _open_file(self):
+        self._seq += 1
+        worker = f".w{self.worker}" if self.worker is not None else ""
+        extension = _EXTENSIONS[self.fmt] + (_NDJSON_SUFFIXES[self.codec] if self.fmt == "ndjson" else "")
+        self._path = os.path.join(self.directory, f"{self.table}{worker}.{self._seq:06d}.{extension}")
+        self._file = _FILE_TYPES[self.fmt](self._path + ".inprogress", self.names, self.kinds, self.codec, self.source)
+        self._file_events = 0
+        self._opened_at = time.monotonic()
+
+    def _close_file(self):
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(self._path + ".inprogress", self._path)
+        self.total_bytes += os.path.getsize(self._path)
+        self.total_files += 1
+        self._file = None
+
+    def summary(self) -> dict:
+        return {"files": self.total_files, "events": self.total_events, "bytes": self.total_bytes}
+
+    def merge_summary(self, summary: dict):
+        """Fold another process's summary() (e.g. a worker's) into this one's totals."""
+        self.total_events += summary["events"]
+        self.total_bytes += summary["bytes"]
+        self.total_files += summary["files"]
+
+
+# ────────── ENGINES ────────── #
+
+class FileSinkMutationEngine(MutationEngine):
+    """
+    MutationEngine that writes change events to ChangeEventFiles instead of
+    running statements. Commits are transaction boundaries in the files.
+    """
+
+    def __init__(self, sink: ChangeEventFiles, schema="public", table_name="sales",
+                 replica_identity: str = "full", **engine_options):
+        self.sink = sink
+        self.replica_identity = replica_identity
+        self._columns: Tuple[str, ...] = ()
+        # id -> (column layout, values) of every row a mutation may still target
+        self._rows: Dict[str, Tuple[Tuple[str, ...], tuple]] = {}
+        self._txid = 1
+        super().__init__(None, schema=schema, table_name=table_name, **engine_options)
+
+    def update_schema(self, column_types: Dict[str, str]):
+        super().update_schema(column_types)
+        self._columns = tuple(self.column_types)
+        self.sink.set_columns(self.column_types)
+
+    def _current(self, row_id: str) -> tuple:
+        """The row's values in the current column order; dropped columns go, added ones are NULL."""
+        layout, values = self._rows[row_id]
+        if layout == self._columns:
+            return values
+        old = dict(zip(layout, values))
+        return tuple(old.get(name) for name in self._columns)
+
+    def _key_only(self, row_id: str) -> tuple:
+        return tuple(row_id if name == "id" else None for name in self._columns)
+
+    def _write_rows(self, columns: List[str], values: Iterable[Sequence], row_count: int):
+        with registry.timed("insert", row_count, self.table_name):
+            layout = tuple(columns)
+            rows = [tuple(row) for row in values]
+            if self.targeting == "batch":
+                # Only the batch just inserted can be updated or deleted
+                self._rows.clear()
+            id_index = layout.index("id")
+            self._rows.update((row[id_index], (layout, row)) for row in rows)
+            if layout != self._columns:
+                rows = [self._current(row[id_index]) for row in rows]
+            self.sink.append("c", None, rows, self._txid)
+        self._end_operation(row_count, "total_inserts")
+
+    def _apply_updates(self, generator: BatchGenerator, updates_by_column: Dict[str, List[Tuple[str, object]]], row_count: int):
+        with registry.timed("update", row_count, self.table_name):
+            updated_at = self._columns.index("updated_at") if "updated_at" in self._columns else None
+            now = datetime.utcnow()
+            before, after = [], []
+            for col, values in updates_by_column.items():
+                index = self._columns.index(col)
+                for row_id, value in values:
+                    old = self._current(row_id)
+                    new = list(old)
+                    new[index] = value
+                    if updated_at is not None:
+                        new[updated_at] = now
+                    new = tuple(new)
+                    self._rows[row_id] = (self._columns, new)
+                    before.append(old)
+                    after.append(new)
+            # REPLICA IDENTITY DEFAULT logs no old tuple for updates that keep the key
+            self.sink.append("u", before if self.replica_identity == "full" else None, after, self._txid)
+
+    def _apply_delete(self, ids: List[str]):
+        with registry.timed("delete", len(ids), self.table_name):
+            if self.replica_identity == "full":
+                before = [self._current(row_id) for row_id in ids]
+            else:
+                before = [self._key_only(row_id) for row_id in ids]
+            for row_id in ids:
+                self._rows.pop(row_id, None)
+            self.sink.append("d", before, None, self._txid)
+
+    def _commit(self):
+        self.sink.commit()
+        self._txid += 1
+
+    def close(self):
+        self.flush()
+        self.sink.close()
+
+
+class SchemaChangeLog:
+    """Debezium-style schema-change events, one NDJSON line each."""
+
+    def __init__(self, path: str, schema: str, table: str, topic_prefix: str = "cdcraft", database: str = "cdcraft"):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.schema = schema
+        self.table = table
+        self.database = database
+        self.source = {"version": "cdcraft", "connector": "postgresql", "name": topic_prefix,
+                       "db": database, "schema": schema, "table": table}
+        self._fh = open(path, "w", buffering=1)
+
+    def record(self, change_type: str, ddl: str, columns: List[ColumnDefinition], entry: Optional[dict] = None):
+        ts_ms = int(time.time() * 1000)
+        event = {
+            "source": {**self.source, "ts_ms": ts_ms},
+            "ts_ms": ts_ms,
+            "databaseName": self.database,
+            "schemaName": self.schema,
+            "ddl": ddl,
+            "tableChanges": [{
+                "type": change_type,
+                "id": f'"{self.database}"."{self.schema}"."{self.table}"',
+                "table": {
+                    "primaryKeyColumnNames": [col.name for col in columns if "PRIMARY KEY" in col.constraints.upper()],
+                    "columns": [
+                        {"name": col.name, "typeName": col.sql_type, "position": position,
+                         "optional": "NOT NULL" not in col.constraints.upper() and "PRIMARY KEY" not in col.constraints.upper()}
+                        for position, col in enumerate(columns, start=1)
+                    ],
+                },
+            }],
+        }
+        if entry is not None:
+            event["history"] = entry
+        self._fh.write(_encode_json(event) + "\n")
+
+    def close(self):
+        self._fh.close()
+
+
+class OfflineSchemaManager(SchemaManager):
+    """
+    SchemaManager without a database: columns are added and dropped in
+    memory, and every schema_history entry is logged as a schema-change
+    event. Online migrations need a table and are not available.
+    """
+
+    def __init__(self, directory: str, schema="public", table_name="sales", **schema_options):
+        super().__init__(None, schema=schema, table_name=table_name, **schema_options)
+        self.change_log = SchemaChangeLog(
+            os.path.join(directory, f"{table_name}.schema-changes.ndjson"), schema, table_name
+        )
+
+    def _qualified(self) -> str:
+        return f'"{self.schema}"."{self.table_name}"'
+
+    def initialize_table(self):
+        self.change_log.record(
+            "CREATE",
+            f"CREATE TABLE {self._qualified()} ({', '.join(col.ddl() for col in self.active_columns.values())})",
+            list(self.active_columns.values()),
+        )
+
+    def add_random_column(self) -> Optional[str]:
+        col_def = self._take_pool_column()
+        if col_def is None:
+            return None
+        self._record_added(col_def)
+        return col_def.name
+
+    def drop_random_column(self) -> Optional[str]:
+        col_name = self._choose_drop_candidate()
+        if col_name is None:
+            return None
+        self._record_dropped(col_name)
+        return col_name
+
+    def _append_history(self, action: str, column: str, detail: Optional[str] = None):
+        super()._append_history(action, column, detail)
+        if action == "add":
+            col_def = self.active_columns[column]
+            ddl = f'ALTER TABLE {self._qualified()} ADD COLUMN "{column}" {col_def.sql_type} {col_def.constraints}'.rstrip()
+        else:
+            ddl = f'ALTER TABLE {self._qualified()} DROP COLUMN "{column}"'
+        self.change_log.record("ALTER", ddl, list(self.active_columns.values()), self.schema_history[-1])
+
+    def close(self):
+        self.change_log.close()
+
+
+def print_sink_report(sink: ChangeEventFiles, elapsed: float):
+    summary = sink.summary()
+    rate = summary["events"] / elapsed if elapsed > 0 else 0.0
+    print(
+        f"\n🗃️  File sink: {summary['events']} events in {summary['files']} {sink.fmt} files "
+        f"({summary['bytes'] / 1_000_000:.1f} MB) under {sink.directory}, {rate:,.0f} events/s"
+    )
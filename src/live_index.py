@@ -0,0 +1,150 @@
+"""
+Compact index of every live row id, so mutations can reach the whole
+table rather than only the batch that was just inserted.
+
+Ids are packed as raw 16-byte UUIDs in one bytearray, next to a 4-byte
+touch counter per row (20 bytes per row, no per-row Python objects).
+Rows are addressed by slot: an AccessPattern picks slots, and deletes
+swap the last row into the freed slot, so both are O(1) per row. New rows
+are appended, so the tail of the array holds the most recently inserted
+rows (deletes move a few tail ids forward).
+"""
+import heapq
+import uuid
+from array import array
+from typing import Iterable, List, Sequence, Tuple
+
+from psycopg2 import sql
+
+from access_patterns import AccessPattern
+
+_ID_BYTES = 16
+
+# Touch histogram bucket b holds keys touched in [2**(b-1), 2**b) times; bucket 0 is untouched
+_BUCKETS = 33
+
+
+def bucket_label(bucket: int) -> str:
+    if bucket <= 1:
+        return str(bucket)
+    return f"{2 ** (bucket - 1)}-{2 ** bucket - 1}"
+
+
+class LiveKeyIndex:
+    def __init__(self):
+        self._ids = bytearray()
+        self._touches = array("I")
+        # Touch counts of deleted rows, and of rows indexed by other engines (merge_touch_summary)
+        self._retired = [0] * _BUCKETS
+        self._retired_touches = 0
+        self._foreign_hot_touches = 0.0
+        self._foreign_live_touches = 0
+        self._foreign_top: List[Tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._touches)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._ids) + len(self._touches) * self._touches.itemsize
+
+    def add(self, ids: Iterable[str]):
+        packed = b"".join(uuid.UUID(row_id).bytes for row_id in ids)
+        self._ids += packed
+        self._touches.frombytes(bytes(len(packed) // _ID_BYTES * self._touches.itemsize))
+
+    def ids_at(self, slots: Sequence[int]) -> List[str]:
+        ids = self._ids
+        return [str(uuid.UUID(bytes=bytes(ids[s * _ID_BYTES:(s + 1) * _ID_BYTES]))) for s in slots]
+
+    def remove_slots(self, slots: Iterable[int]):
+        """Swap-remove rows by slot. Highest slot first, so no pending slot gets moved."""
+        ids, touches = self._ids, self._touches
+        for slot in sorted(set(slots), reverse=True):
+            self._retired[touches[slot].bit_length()] += 1
+            self._retired_touches += touches[slot]
+            last = len(touches) - 1
+            if slot != last:
+                start = slot * _ID_BYTES
+                ids[start:start + _ID_BYTES] = ids[last * _ID_BYTES:]
+                touches[slot] = touches[last]
+            del ids[last * _ID_BYTES:]
+            touches.pop()
+
+    def remove_ids(self, ids: Iterable[str]) -> int:
+        """
+        Remove rows by id, e.g. the rows of a retired partition. Scans the
+        whole index, so it is meant for rare bulk removals.
+        """
+        wanted = {uuid.UUID(row_id).bytes for row_id in ids}
+        if not wanted:
+            return 0
+        ids_view = memoryview(self._ids)
+        slots = [
+            slot for slot in range(len(self))
+            if ids_view[slot * _ID_BYTES:(slot + 1) * _ID_BYTES].tobytes() in wanted
+        ]
+        ids_view.release()
+        self.remove_slots(slots)
+        return len(slots)
+
+    def load(self, conn, schema: str, table_name: str, key: str = "id"):
+        """Index the ids already in the table, e.g. when resuming against an existing one."""
+        with conn.cursor(name="cdcraft_live_index_load") as cur:
+            cur.itersize = 50_000
+            cur.execute(sql.SQL("SELECT {}::text FROM {}.{}").format(
+                sql.Identifier(key), sql.Identifier(schema), sql.Identifier(table_name)
+            ))
+            for rows in iter(lambda: cur.fetchmany(50_000), []):
+                self.add(row[0] for row in rows)
+        conn.commit()
+
+    def sample(self, k: int, pattern: AccessPattern) -> Tuple[List[str], List[int]]:
+        """Pick up to k distinct live rows with `pattern`, count the touch, and return (ids, slots)."""
+        slots = pattern.sample(len(self), k)
+        touches = self._touches
+        for slot in slots:
+            touches[slot] += 1
+        return self.ids_at(slots), slots
+
+    # ────────── TOUCH REPORTING ────────── #
+
+    def touch_summary(self, top: int = 10) -> dict:
+        """
+        How often keys were updated or deleted: a log2 histogram of touch
+        counts over every key ever indexed, the hottest live keys, and the
+        share of touches absorbed by the hottest 1% of live keys.
+        """
+        histogram = list(self._retired)
+        touches = self._touches
+        for count in touches:
+            histogram[count.bit_length()] += 1
+
+        live_total = sum(touches)
+        hottest = heapq.nlargest(top, range(len(touches)), key=touches.__getitem__)
+        top_keys = [(touches[slot], row_id) for slot, row_id in zip(hottest, self.ids_at(hottest)) if touches[slot]]
+        top_keys = heapq.nlargest(top, top_keys + self._foreign_top)
+
+        one_percent = max(1, len(touches) // 100)
+        hot_touches = sum(heapq.nlargest(one_percent, touches)) + self._foreign_hot_touches
+        live_total += self._foreign_live_touches
+        return {
+            "histogram": {bucket_label(b): keys for b, keys in enumerate(histogram) if keys},
+            "total_touches": live_total + self._retired_touches,
+            "live_touches": live_total,
+            "top_keys": [[row_id, count] for count, row_id in top_keys],
+            "top_1pct_share": round(hot_touches / live_total, 4) if live_total else 0.0,
+        }
+
+    def merge_touch_summary(self, summary: dict):
+        """Fold another index's touch_summary() (e.g. from a worker process) into this one's report."""
+        labels = {bucket_label(b): b for b in range(_BUCKETS)}
+        for label, keys in summary["histogram"].items():
+            self._retired[labels[label]] += keys
+        self._retired_touches += summary["total_touches"] - summary["live_touches"]
+        # Weighted by each index's live touches, so the merged share stays a share
+        self._foreign_live_touches += summary["live_touches"]
+        self._foreign_hot_touches += summary["top_1pct_share"] * summary["live_touches"]
+        self._foreign_top = heapq.nlargest(
+            10, self._foreign_top + [(count, row_id) for row_id, count in summary["top_keys"]]
+        )
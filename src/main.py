@@ -1,26 +1,85 @@
 import os
 import sys
+import time
 import psycopg2
 from schema_manager import SchemaManager, SchemaEvolutionController
 from mutation_engine import MutationEngine
 from prompt_utils import prompt_yes_no
-from runner import run_initial_setup, run_cdc_simulation
+from runner import run_initial_setup, run_cdc_simulation, run_pipelined_cdc_simulation
+from parallel_runner import run_parallel_cdc_simulation
 from cli import handle_interrupt, print_final_report
+from rate_controller import RateController, parse_profile
+from batch_tuner import parse_tuner
+from checkpoint import Checkpointer, CheckpointError, print_resume_summary
+from metrics import JsonLinesReporter, serve_prometheus
+from manifest import ChangeManifest
+from seeding import derive_seed, seed_all
+from column_pool import BASE_COLUMN_DEFINITIONS, PROTECTED_COLUMNS
+from payloads import extra_columns
 
 # ────────── CONFIG ────────── #
 TOTAL_RECORDS = 1_000_000
-BATCH_SIZE = 500
-SNAPSHOT_BATCH_SIZE = 1000
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "500"))  # rows per batch, or the starting size with BATCH_TUNER
+SNAPSHOT_BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", "1000"))
+SNAPSHOT_WORKERS = int(os.getenv("SNAPSHOT_WORKERS", "0"))  # > 0 loads the snapshot with parallel, resumable COPY
+SNAPSHOT_CHUNK_ROWS = int(os.getenv("SNAPSHOT_CHUNK_ROWS", "100000"))
+SNAPSHOT_UNLOGGED = os.getenv("SNAPSHOT_UNLOGGED", "false").lower() == "true"
+SNAPSHOT_DEFER_INDEXES = os.getenv("SNAPSHOT_DEFER_INDEXES", "false").lower() == "true"
 TABLE_NAME = "sales"
 SCHEMA_NAME = os.getenv("PGSCHEMA", "cdcraft_demo")
 SKIP_SETUP = os.getenv("SKIP_SETUP", "false").lower() == "true"
 ENABLE_EVOLUTION = os.getenv("ENABLE_EVOLUTION", "true").lower() == "true"
+INGEST_MODE = os.getenv("INGEST_MODE", "values")  # values | copy_text | copy_binary
+GENERATION_MODE = os.getenv("GENERATION_MODE", "row")  # row | columnar
+WORKERS = int(os.getenv("WORKERS", "1"))
+PIPELINE_DEPTH = int(os.getenv("PIPELINE_DEPTH", "0"))  # > 0 overlaps generation and writes
+TARGET_EPS = float(os.getenv("TARGET_EPS", "0"))  # events/sec, 0 = as fast as possible
+LOAD_PROFILE = os.getenv("LOAD_PROFILE", "constant")  # constant | ramp:... | step:... | sine:... | spike:...
+ENGINE = os.getenv("ENGINE", "sync")  # sync (psycopg2) | async (asyncpg pool)
+ASYNC_STREAMS = int(os.getenv("ASYNC_STREAMS", "4"))
+OPS_PER_COMMIT = int(os.getenv("OPS_PER_COMMIT", "1"))  # insert/update/delete operations per transaction
+LARGE_TXN_PROBABILITY = float(os.getenv("LARGE_TXN_PROBABILITY", "0"))
+LARGE_TXN_OPS = int(os.getenv("LARGE_TXN_OPS", "0"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # > 0 serves Prometheus metrics on localhost
+METRICS_LOG = os.getenv("METRICS_LOG")  # path of a JSON-lines metrics log
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "10"))
+SEED = int(os.environ["SEED"]) if os.getenv("SEED") else None  # makes the run reproducible
+CHANGE_MANIFEST = os.getenv("CHANGE_MANIFEST")  # NDJSON(.gz) path for the expected change events
+VERIFY_TARGET_DSN = os.getenv("VERIFY_TARGET_DSN")  # libpq DSN of a sink database to verify against
+VERIFY_TARGET_TABLE = os.getenv("VERIFY_TARGET_TABLE")  # schema.table on the sink, defaults to the source name
+VERIFY_WAIT = float(os.getenv("VERIFY_WAIT", "60"))  # seconds to wait for the sink to converge
+MUTATION_TARGET = os.getenv("MUTATION_TARGET", "batch")  # batch | uniform | zipf:s=1.1 | hotspot:keys=0.01,share=0.9 | latest:window=100000
+MIGRATION_PROBABILITY = float(os.getenv("MIGRATION_PROBABILITY", "0"))  # share of evolution steps that run an online migration
+MIGRATIONS = os.getenv("MIGRATIONS", "widen,rename,add_default,not_null")
+MIGRATION_STRATEGY = os.getenv("MIGRATION_STRATEGY", "lock_timeout")  # lock_timeout | shadow
+LOCK_TIMEOUT_MS = int(os.getenv("LOCK_TIMEOUT_MS", "2000"))
+LOCK_RETRIES = int(os.getenv("LOCK_RETRIES", "5"))
+BACKFILL_ROWS = int(os.getenv("BACKFILL_ROWS", "5000"))  # rows per shadow backfill step
+PAYLOAD_COLUMNS = os.getenv("PAYLOAD_COLUMNS")  # e.g. text:8192,jsonb:1024-65536,bytea:262144,int_array:500
+WIDE_COLUMNS = int(os.getenv("WIDE_COLUMNS", "0"))  # extra small columns, for wide-row tables
+REPLICATION_CONSUMER = os.getenv("REPLICATION_CONSUMER", "false").lower() == "true"  # built-in pgoutput consumer
+CONSUMER_SLOT = os.getenv("CONSUMER_SLOT")  # existing pgoutput slot to consume, default a temporary one
+CONSUMER_ACK_INTERVAL = float(os.getenv("CONSUMER_ACK_INTERVAL", "1"))  # seconds between flush-LSN acks
+CONSUMER_DRAIN_TIMEOUT = float(os.getenv("CONSUMER_DRAIN_TIMEOUT", "30"))
+SINK = os.getenv("SINK", "postgres")  # postgres | file (Debezium-shaped event files, no database)
+FILE_SINK_DIR = os.getenv("FILE_SINK_DIR", "cdc-events")
+FILE_SINK_FORMAT = os.getenv("FILE_SINK_FORMAT", "ndjson")  # ndjson | avro | parquet
+FILE_SINK_COMPRESSION = os.getenv("FILE_SINK_COMPRESSION", "none")  # none | gzip | snappy | zstd
+FILE_SINK_ROTATE_EVENTS = int(os.getenv("FILE_SINK_ROTATE_EVENTS", "1000000"))
+FILE_SINK_ROTATE_SECONDS = float(os.getenv("FILE_SINK_ROTATE_SECONDS", "0"))  # 0 rotates on event count only
+BATCH_TUNER = os.getenv("BATCH_TUNER")  # throughput[:min=..,max=..,max_ms=..] | latency:ms=200
+BATCH_TUNER_LOG = os.getenv("BATCH_TUNER_LOG")  # JSON-lines log of every tuning decision
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH")  # file for periodic simulator checkpoints, unset disables them
+CHECKPOINT_INTERVAL = float(os.getenv("CHECKPOINT_INTERVAL", "60"))  # seconds between checkpoints
+RESUME = os.getenv("RESUME", "false").lower() == "true"  # continue from CHECKPOINT_PATH instead of setting up
+PARTITIONING = os.getenv("PARTITIONING")  # purchased_at|created_at[:interval=..,premake=..,retain=..,retire=..,default=..]
+WORKLOAD_SPEC = os.getenv("WORKLOAD_SPEC")  # path to a multi-table YAML/JSON workload
 REPLICA_IDENTITY = True
 PUBLICATION_NAME = f"{TABLE_NAME}_pub"
 REPLICATION_SLOT = f"{TABLE_NAME}_slot"
 
-# ────────── SETUP CONNECTION ────────── #
-conn = psycopg2.connect(
+# ────────── CONNECTION SETTINGS ────────── #
+CONN_PARAMS = dict(
     host=os.getenv("PGHOST", "localhost"),
     dbname=os.getenv("PGDATABASE", "postgres"),
     user=os.getenv("PGUSER", "postgres"),
@@ -28,22 +87,208 @@ conn = psycopg2.connect(
     port=int(os.getenv("PGPORT", "5432")),
 )
 
-schema_mgr = SchemaManager(conn, schema=SCHEMA_NAME, table_name=TABLE_NAME)
-mutator = MutationEngine(conn, schema=SCHEMA_NAME, table_name=TABLE_NAME)
-
 SCHEMA_EVOLVER = SchemaEvolutionController(
     evolution_interval=25,
     evolution_probability=0.2,
     add_probability=0.7,
     max_additions=7,
     max_drops=3,
+    migration_probability=MIGRATION_PROBABILITY,
+    migrations=[name.strip() for name in MIGRATIONS.split(",") if name.strip()],
 )
 
-original_schema = {}
 
-if __name__ == "__main__":
+def open_change_manifest():
+    """The run's change manifest; parallel workers write their own next to it."""
+    if not CHANGE_MANIFEST:
+        return None
+    return ChangeManifest(CHANGE_MANIFEST, table=f"{SCHEMA_NAME}.{TABLE_NAME}", seed=SEED)
+
+
+def pacing():
+    """The TARGET_EPS load profile and the BATCH_TUNER, each None when unset."""
+    rate_profile = parse_profile(LOAD_PROFILE, TARGET_EPS) if TARGET_EPS > 0 else None
+    batch_tuner = parse_tuner(BATCH_TUNER, BATCH_SIZE, TABLE_NAME, BATCH_TUNER_LOG) if BATCH_TUNER else None
+    return rate_profile, batch_tuner
+
+
+def run_simulation(schema_mgr, mutator, rate_profile=None, batch_tuner=None, checkpointer=None, sink_options=None):
+    """Run the sync engine across WORKERS processes, pipelined, or sequentially."""
+    if WORKERS > 1:
+        run_parallel_cdc_simulation(
+            schema_mgr=schema_mgr,
+            mutator=mutator,
+            schema_evolver=SCHEMA_EVOLVER,
+            conn_params=CONN_PARAMS,
+            total_records=TOTAL_RECORDS,
+            batch_size=BATCH_SIZE,
+            workers=WORKERS,
+            enable_evolution=ENABLE_EVOLUTION,
+            columnar=GENERATION_MODE == "columnar",
+            rate_profile=rate_profile,
+            seed=SEED,
+            manifest_path=CHANGE_MANIFEST,
+            extra_column_spec=(PAYLOAD_COLUMNS, WIDE_COLUMNS),
+            sink_options=sink_options,
+        )
+    elif PIPELINE_DEPTH > 0:
+        run_pipelined_cdc_simulation(
+            schema_mgr=schema_mgr,
+            mutator=mutator,
+            schema_evolver=SCHEMA_EVOLVER,
+            total_records=TOTAL_RECORDS,
+            batch_size=BATCH_SIZE,
+            enable_evolution=ENABLE_EVOLUTION,
+            columnar=GENERATION_MODE == "columnar",
+            queue_depth=PIPELINE_DEPTH,
+            rate_controller=RateController(rate_profile) if rate_profile else None,
+            batch_tuner=batch_tuner,
+            checkpointer=checkpointer,
+        )
+    else:
+        run_cdc_simulation(
+            schema_mgr=schema_mgr,
+            mutator=mutator,
+            schema_evolver=SCHEMA_EVOLVER,
+            total_records=TOTAL_RECORDS,
+            batch_size=BATCH_SIZE,
+            enable_evolution=ENABLE_EVOLUTION,
+            columnar=GENERATION_MODE == "columnar",
+            rate_controller=RateController(rate_profile) if rate_profile else None,
+            batch_tuner=batch_tuner,
+            checkpointer=checkpointer,
+        )
+
+
+def run_workload_spec():
+    from workload import load_workload, run_workload
+
+    if CHANGE_MANIFEST:
+        sys.exit("❌ Workload runs don't record change events; CHANGE_MANIFEST is not available with WORKLOAD_SPEC.")
+
+    run_workload(
+        load_workload(WORKLOAD_SPEC),
+        conn_params=CONN_PARAMS,
+        ingest_mode=INGEST_MODE,
+        columnar=GENERATION_MODE == "columnar",
+    )
+
+
+def run_file_sink():
+    from file_sink import ChangeEventFiles, FileSinkMutationEngine, OfflineSchemaManager, print_sink_report
+
+    if MIGRATION_PROBABILITY > 0 or ENGINE == "async":
+        sys.exit("❌ SINK=file runs without a database: online migrations and ENGINE=async are not available.")
+    if BATCH_TUNER and WORKERS > 1:
+        sys.exit("❌ BATCH_TUNER tunes one writer; it is not available with WORKERS > 1.")
+    if CHECKPOINT_PATH or RESUME:
+        sys.exit("❌ Checkpoints are reconciled against the live table; they are not available with SINK=file.")
+    if PARTITIONING:
+        sys.exit("❌ PARTITIONING creates and retires partitions in the database; it is not available with SINK=file.")
+
+    extra = extra_columns(PAYLOAD_COLUMNS, WIDE_COLUMNS)
+    schema_mgr = OfflineSchemaManager(
+        FILE_SINK_DIR,
+        schema=SCHEMA_NAME,
+        table_name=TABLE_NAME,
+        base_columns=BASE_COLUMN_DEFINITIONS + extra,
+        protected_columns=PROTECTED_COLUMNS | {col.name for col in extra if col.name.startswith("payload_")},
+    )
+    sink_options = dict(
+        directory=FILE_SINK_DIR,
+        fmt=FILE_SINK_FORMAT,
+        compression=FILE_SINK_COMPRESSION,
+        rotate_events=FILE_SINK_ROTATE_EVENTS,
+        rotate_seconds=FILE_SINK_ROTATE_SECONDS,
+    )
+    manifest = open_change_manifest()
+    mutator = FileSinkMutationEngine(
+        ChangeEventFiles(schema=SCHEMA_NAME, table=TABLE_NAME, **sink_options),
+        schema=SCHEMA_NAME,
+        table_name=TABLE_NAME,
+        replica_identity="full" if REPLICA_IDENTITY else "default",
+        ops_per_commit=OPS_PER_COMMIT,
+        large_txn_probability=LARGE_TXN_PROBABILITY,
+        large_txn_ops=LARGE_TXN_OPS,
+        manifest=manifest,
+        targeting=MUTATION_TARGET,
+    )
+    schema_mgr.initialize_table()
+    original_schema = schema_mgr.get_active_column_definitions()
+    rate_profile, batch_tuner = pacing()
+    started = time.perf_counter()
+
     try:
-        if not SKIP_SETUP:
+        run_simulation(schema_mgr, mutator, rate_profile, batch_tuner, sink_options=sink_options)
+    except KeyboardInterrupt:
+        print("\n\U0001F6D1 Simulation interrupted!")
+
+    finally:
+        mutator.close()
+        schema_mgr.close()
+        if manifest is not None:
+            manifest.close()
+        if batch_tuner is not None:
+            batch_tuner.close()
+
+    print_final_report(schema_mgr, mutator, SCHEMA_EVOLVER, original_schema)
+    print_sink_report(mutator.sink, time.perf_counter() - started)
+
+
+def run_database():
+    if BATCH_TUNER and (WORKERS > 1 or ENGINE == "async"):
+        sys.exit("❌ BATCH_TUNER tunes one writer; it is not available with WORKERS > 1 or ENGINE=async.")
+    if CHECKPOINT_PATH and (WORKERS > 1 or ENGINE == "async"):
+        sys.exit("❌ CHECKPOINT_PATH checkpoints one writer; it is not available with WORKERS > 1 or ENGINE=async.")
+    if RESUME and not CHECKPOINT_PATH:
+        sys.exit("❌ RESUME=true needs CHECKPOINT_PATH pointing at the checkpoint to resume from.")
+    if RESUME and CHANGE_MANIFEST:
+        sys.exit("❌ A change manifest covers one whole run; CHANGE_MANIFEST is not available with RESUME=true.")
+    if CHANGE_MANIFEST and ENGINE == "async":
+        sys.exit("❌ The async engine doesn't record change events; CHANGE_MANIFEST is not available with ENGINE=async.")
+    if CHANGE_MANIFEST and SNAPSHOT_WORKERS > 0 and not SKIP_SETUP:
+        sys.exit("❌ The parallel snapshot loader doesn't record change events; CHANGE_MANIFEST is not available with SNAPSHOT_WORKERS > 0.")
+    if PARTITIONING and (WORKERS > 1 or ENGINE == "async"):
+        sys.exit("❌ PARTITIONING maintains partitions between one writer's batches; it is not available with WORKERS > 1 or ENGINE=async.")
+    if PARTITIONING and SNAPSHOT_UNLOGGED:
+        sys.exit("❌ PostgreSQL ignores SET UNLOGGED on a partitioned table; SNAPSHOT_UNLOGGED is not available with PARTITIONING.")
+
+    # Connect only once main() runs, so worker processes re-importing this
+    # module (spawn start method) don't open connections of their own.
+    conn = psycopg2.connect(**CONN_PARAMS)
+    extra = extra_columns(PAYLOAD_COLUMNS, WIDE_COLUMNS)
+    schema_mgr = SchemaManager(
+        conn,
+        schema=SCHEMA_NAME,
+        table_name=TABLE_NAME,
+        base_columns=BASE_COLUMN_DEFINITIONS + extra,
+        # Evolution may drop wide columns, but the payloads are the point of the run
+        protected_columns=PROTECTED_COLUMNS | {col.name for col in extra if col.name.startswith("payload_")},
+        migration_strategy=MIGRATION_STRATEGY,
+        lock_timeout_ms=LOCK_TIMEOUT_MS,
+        lock_retries=LOCK_RETRIES,
+        backfill_rows=BACKFILL_ROWS,
+        partitioning=PARTITIONING,
+    )
+    # Holds the snapshot and the sequential run
+    manifest = open_change_manifest()
+    mutator = MutationEngine(
+        conn,
+        schema=SCHEMA_NAME,
+        table_name=TABLE_NAME,
+        ingest_mode=INGEST_MODE,
+        ops_per_commit=OPS_PER_COMMIT,
+        large_txn_probability=LARGE_TXN_PROBABILITY,
+        large_txn_ops=LARGE_TXN_OPS,
+        manifest=manifest,
+        targeting=MUTATION_TARGET,
+    )
+    consumer = batch_tuner = checkpointer = verify_conn = None
+    original_schema = {}
+
+    try:
+        # Resuming continues on the existing table
+        if not (SKIP_SETUP or RESUME):
             original_schema = run_initial_setup(
                 schema_mgr=schema_mgr,
                 mutator=mutator,
@@ -51,7 +296,17 @@ if __name__ == "__main__":
                 replica_identity=REPLICA_IDENTITY,
                 publication_name=PUBLICATION_NAME,
                 replication_slot=REPLICATION_SLOT,
-                conn=conn
+                conn=conn,
+                snapshot_options=dict(
+                    conn_params=CONN_PARAMS,
+                    chunk_rows=SNAPSHOT_CHUNK_ROWS,
+                    workers=SNAPSHOT_WORKERS,
+                    ingest_mode="copy_text" if INGEST_MODE == "copy_text" else "copy_binary",
+                    unlogged=SNAPSHOT_UNLOGGED,
+                    defer_indexes=SNAPSHOT_DEFER_INDEXES,
+                    seed=SEED,
+                    extra_column_spec=(PAYLOAD_COLUMNS, WIDE_COLUMNS),
+                ) if SNAPSHOT_WORKERS > 0 else None,
             )
 
             if not prompt_yes_no("▶️  Start CDC simulation now?"):
@@ -59,19 +314,129 @@ if __name__ == "__main__":
                 conn.close()
                 sys.exit(0)
 
-        run_cdc_simulation(
-            schema_mgr=schema_mgr,
-            mutator=mutator,
-            schema_evolver=SCHEMA_EVOLVER,
-            total_records=TOTAL_RECORDS,
-            batch_size=BATCH_SIZE,
-            enable_evolution=ENABLE_EVOLUTION
-        )
+        if (SKIP_SETUP or RESUME) and mutator.live_index is not None and WORKERS <= 1 and ENGINE != "async":
+            # Let whole-table targeting reach rows left by earlier runs
+            mutator.live_index.load(conn, SCHEMA_NAME, TABLE_NAME)
+            print(f"🗂️  Indexed {len(mutator.live_index)} existing rows for mutation targeting.")
+
+        rate_profile, batch_tuner = pacing()
+
+        if CHECKPOINT_PATH:
+            checkpointer = Checkpointer(
+                CHECKPOINT_PATH, schema_mgr, mutator, SCHEMA_EVOLVER,
+                total_records=TOTAL_RECORDS,
+                interval=CHECKPOINT_INTERVAL,
+                original_schema=original_schema,
+                batch_tuner=batch_tuner,
+            )
+        if RESUME:
+            try:
+                notes = checkpointer.resume(conn)
+            except (OSError, CheckpointError) as exc:
+                sys.exit(f"❌ Cannot resume: {exc}")
+            original_schema = checkpointer.original_schema
+            print_resume_summary(checkpointer, notes)
+            if SEED is not None:
+                # Checkpoints don't hold RNG state; reseeding by position keeps the run
+                # reproducible without replaying the keys the first run already inserted
+                seed_all(derive_seed(SEED, "resume", checkpointer.position()[0]))
+        if checkpointer is not None:
+            checkpointer.watch_interrupts()
+
+        if REPLICATION_CONSUMER:
+            from replication_consumer import PgOutputConsumer
+
+            consumer = PgOutputConsumer(
+                CONN_PARAMS, SCHEMA_NAME, TABLE_NAME, PUBLICATION_NAME,
+                slot=CONSUMER_SLOT, ack_interval=CONSUMER_ACK_INTERVAL, lag_interval=METRICS_INTERVAL,
+            ).start()
+            # The async engine starts its own counters from zero
+            written_before = mutator.get_counters() if ENGINE != "async" else {}
+            print(f"🛰️  Replication consumer streaming from slot {consumer.slot}.")
+
+        if ENGINE == "async":
+            from async_engine import AsyncMutationEngine, AsyncSchemaManager, run_async_cdc_simulation
+
+            # Swap in the async engine so the report and interrupt handler see its state
+            schema_mgr = AsyncSchemaManager(
+                schema=SCHEMA_NAME, table_name=TABLE_NAME, base_columns=schema_mgr.base_column_defs,
+                protected_columns=schema_mgr.protected_columns,
+            )
+            mutator = AsyncMutationEngine(schema=SCHEMA_NAME, table_name=TABLE_NAME)
+            run_async_cdc_simulation(
+                schema_mgr=schema_mgr,
+                mutator=mutator,
+                schema_evolver=SCHEMA_EVOLVER,
+                conn_params=CONN_PARAMS,
+                total_records=TOTAL_RECORDS,
+                batch_size=BATCH_SIZE,
+                enable_evolution=ENABLE_EVOLUTION,
+                columnar=GENERATION_MODE == "columnar",
+                streams=ASYNC_STREAMS,
+                rate_controller=RateController(rate_profile) if rate_profile else None
+            )
+        else:
+            run_simulation(schema_mgr, mutator, rate_profile, batch_tuner, checkpointer)
 
         print_final_report(schema_mgr, mutator, SCHEMA_EVOLVER, original_schema)
 
+        if consumer is not None:
+            from replication_consumer import print_consumer_report
+
+            consumer.stop(CONSUMER_DRAIN_TIMEOUT)
+            written = {key: value - written_before.get(key, 0) for key, value in mutator.get_counters().items()}
+            # Backfills only run during the simulation, so the whole total falls in the consumer's span
+            print_consumer_report(consumer.report(written, schema_mgr.migrator.backfilled_total))
+            consumer = None
+
+        if VERIFY_TARGET_DSN:
+            from verifier import ChecksumVerifier, TableSide, print_verification_report
+
+            target_schema, _, target_table = (VERIFY_TARGET_TABLE or f"{SCHEMA_NAME}.{TABLE_NAME}").rpartition(".")
+            verify_conn = psycopg2.connect(VERIFY_TARGET_DSN)
+            verifier = ChecksumVerifier(
+                TableSide(conn, SCHEMA_NAME, TABLE_NAME),
+                TableSide(verify_conn, target_schema or SCHEMA_NAME, target_table),
+                schema_history=schema_mgr.get_schema_history(),
+            )
+            print_verification_report(verifier.verify_until_converged(VERIFY_WAIT))
+
     except KeyboardInterrupt:
-        handle_interrupt(schema_mgr, mutator, SCHEMA_EVOLVER, original_schema, conn)
+        handle_interrupt(schema_mgr, mutator, SCHEMA_EVOLVER, original_schema, conn, checkpointer)
 
     finally:
+        if consumer is not None:
+            consumer.stop(drain_timeout=0)
+        if batch_tuner is not None:
+            batch_tuner.close()
+        if checkpointer is not None:
+            checkpointer.close()
         conn.close()
+        if verify_conn is not None:
+            verify_conn.close()
+        if manifest is not None:
+            manifest.close()
+
+
+def main():
+    if SEED is not None:
+        seed_all(SEED)
+    metrics_server = serve_prometheus(METRICS_PORT) if METRICS_PORT > 0 else None
+    metrics_log = JsonLinesReporter(METRICS_LOG, METRICS_INTERVAL).start() if METRICS_LOG else None
+    try:
+        if WORKLOAD_SPEC:
+            run_workload_spec()
+        elif SINK == "file":
+            run_file_sink()
+        else:
+            run_database()
+    finally:
+        # Also reached through sys.exit() and unhandled errors
+        if metrics_log:
+            metrics_log.stop()
+        if metrics_server:
+            metrics_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Change manifest: a compact NDJSON record of every change event a run is
+expected to produce, so a downstream sink can be checked against it
+without diffing whole tables.
+
+One line per committed operation, in commit order:
+
+    {"op": "schema", "v": 2, "columns": {"id": "UUID", ...}}
+    {"op": "c", "v": 2, "ids": [...]}
+    {"op": "u", "v": 2, "columns": ["region", "updated_at"], "ids": [...]}
+    {"op": "d", "v": 2, "ids": [...]}
+
+`v` is the schema version the rows were written under; it increases by one
+at every column add/drop. Paths ending in .gz are gzip-compressed.
+"""
+import gzip
+import json
+import os
+from typing import Any, Dict, Optional
+
+
+class ChangeManifest:
+    def __init__(self, path: str, table: str, seed: Optional[int] = None, worker: Optional[int] = None):
+        self.path = path
+        self._fh = gzip.open(path, "wt") if path.endswith(".gz") else open(path, "w")
+        self.record({"manifest": 1, "table": table, "seed": seed, "worker": worker})
+
+    def record(self, event: Dict[str, Any]):
+        self._fh.write(json.dumps(event, separators=(",", ":"), default=str) + "\n")
+
+    def close(self):
+        self._fh.close()
+
+
+def worker_manifest_path(path: str, worker_id: int) -> str:
+    """manifest.ndjson.gz -> manifest.w3.ndjson.gz: one file per worker process."""
+    directory, name = os.path.split(path)
+    stem, dot, extension = name.partition(".")
+    return os.path.join(directory, f"{stem}.w{worker_id}{dot}{extension}")
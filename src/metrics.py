@@ -0,0 +1,324 @@
+"""
+Process-wide instrumentation for the simulator.
+
+Every engine records into the shared `registry`: per-phase timings
+(generate, insert, update, delete, commit, ddl) as latency histograms
+plus the rows each phase touched. The registry can be scraped as a
+Prometheus text endpoint on localhost (serve_prometheus) and/or written
+as a periodic JSON-lines log (JsonLinesReporter), so simulator load can be
+lined up with connector lag dashboards.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Histogram upper bounds in seconds: 50us doubling up to ~105s
+BUCKETS: Tuple[float, ...] = tuple(0.00005 * 2 ** i for i in range(22))
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram. Constant memory, cheap to merge across
+    processes, and maps one-to-one onto a Prometheus histogram.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside the bucket that holds it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                estimate = lower + (upper - lower) * (rank - cumulative) / bucket_count
+                return min(estimate, self.max)
+            cumulative += bucket_count
+        return self.max
+
+    def state(self) -> dict:
+        return {"counts": list(self.counts), "count": self.count, "sum": self.sum, "max": self.max}
+
+    def merge(self, state: dict):
+        for i, bucket_count in enumerate(state["counts"]):
+            self.counts[i] += bucket_count
+        self.count += state["count"]
+        self.sum += state["sum"]
+        self.max = max(self.max, state["max"])
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return 0
+        # ru_maxrss is the peak, in KiB on Linux; the best we have elsewhere
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Metrics:
+    """
+    Thread-safe registry of phase histograms and row counters, keyed by
+    (phase, table), plus last-value gauges such as replication slot lag.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.perf_counter()
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.rows: Dict[Tuple[str, str], int] = {}
+        self.gauges: Dict[Tuple[str, str], float] = {}
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.perf_counter()
+            self.histograms.clear()
+            self.rows.clear()
+            self.gauges.clear()
+
+    def set_gauge(self, name: str, value: float, table: str = ""):
+        with self._lock:
+            self.gauges[(name, table)] = value
+
+    def gauge_values(self) -> Dict[str, float]:
+        """Gauges keyed "table.name" (or just "name"), for reports."""
+        with self._lock:
+            return {f"{table}.{name}" if table else name: value for (name, table), value in self.gauges.items()}
+
+    def observe(self, phase: str, seconds: float, rows: int = 0, table: str = ""):
+        key = (phase, table)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+            self.rows[key] = self.rows.get(key, 0) + rows
+
+    @contextmanager
+    def timed(self, phase: str, rows: int = 0, table: str = ""):
+        """Time the enclosed block as one `phase` operation; failed blocks are not recorded."""
+        started = time.perf_counter()
+        yield
+        self.observe(phase, time.perf_counter() - started, rows, table)
+
+    def export_state(self) -> dict:
+        """Picklable copy of the registry, e.g. to ship from a worker process."""
+        with self._lock:
+            return {
+                "histograms": {key: h.state() for key, h in self.histograms.items()},
+                "rows": dict(self.rows),
+            }
+
+    def merge_state(self, state: dict):
+        with self._lock:
+            for key, histogram_state in state["histograms"].items():
+                self.histograms.setdefault(key, Histogram()).merge(histogram_state)
+            for key, rows in state["rows"].items():
+                self.rows[key] = self.rows.get(key, 0) + rows
+
+    def process_stats(self) -> dict:
+        return {
+            "cpu_seconds": round(time.process_time(), 3),
+            "rss_bytes": _rss_bytes(),
+            "threads": threading.active_count(),
+        }
+
+    def phase_summary(self) -> List[dict]:
+        """One entry per (phase, table) with totals and p50/p95/p99 in milliseconds."""
+        elapsed = time.perf_counter() - self.started_at
+        summary = []
+        with self._lock:
+            for (phase, table), histogram in sorted(self.histograms.items()):
+                rows = self.rows.get((phase, table), 0)
+                summary.append({
+                    "phase": phase,
+                    "table": table,
+                    "ops": histogram.count,
+                    "rows": rows,
+                    "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+                    "total_s": round(histogram.sum, 3),
+                    "p50_ms": round(histogram.quantile(0.50) * 1000, 3),
+                    "p95_ms": round(histogram.quantile(0.95) * 1000, 3),
+                    "p99_ms": round(histogram.quantile(0.99) * 1000, 3),
+                    "max_ms": round(histogram.max * 1000, 3),
+                })
+        return summary
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP cdcraft_phase_seconds Duration of simulator operations by phase.",
+            "# TYPE cdcraft_phase_seconds histogram",
+        ]
+        with self._lock:
+            items = sorted((key, h.state()) for key, h in self.histograms.items())
+            rows = sorted(self.rows.items())
+            gauges = sorted(self.gauges.items())
+
+        for (phase, table), state in items:
+            labels = f'phase="{_escape_label(phase)}",table="{_escape_label(table)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, state["counts"]):
+                cumulative += bucket_count
+                lines.append(f'cdcraft_phase_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'cdcraft_phase_seconds_bucket{{{labels},le="+Inf"}} {state["count"]}')
+            lines.append(f"cdcraft_phase_seconds_sum{{{labels}}} {state['sum']:.6f}")
+            lines.append(f"cdcraft_phase_seconds_count{{{labels}}} {state['count']}")
+
+        lines += [
+            "# HELP cdcraft_rows_total Rows generated or written, by phase.",
+            "# TYPE cdcraft_rows_total counter",
+        ]
+        for (phase, table), count in rows:
+            lines.append(
+                f'cdcraft_rows_total{{phase="{_escape_label(phase)}",table="{_escape_label(table)}"}} {count}'
+            )
+
+        for name in sorted({name for (name, _), _ in gauges}):
+            lines.append(f"# TYPE cdcraft_{name} gauge")
+            for (gauge, table), value in gauges:
+                if gauge == name:
+                    lines.append(f'cdcraft_{name}{{table="{_escape_label(table)}"}} {value}')
+
+        stats = self.process_stats()
+        lines += [
+            "# TYPE cdcraft_process_cpu_seconds_total counter",
+            f"cdcraft_process_cpu_seconds_total {stats['cpu_seconds']}",
+            "# TYPE cdcraft_process_resident_memory_bytes gauge",
+            f"cdcraft_process_resident_memory_bytes {stats['rss_bytes']}",
+            "# TYPE cdcraft_process_threads gauge",
+            f"cdcraft_process_threads {stats['threads']}",
+            "# TYPE cdcraft_uptime_seconds gauge",
+            f"cdcraft_uptime_seconds {time.perf_counter() - self.started_at:.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+registry = Metrics()
+
+
+# ────────── EXPORTERS ────────── #
+
+class _PrometheusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep scrapes out of the simulator output
+
+
+def serve_prometheus(port: int, metrics: Metrics = registry, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve `metrics` in Prometheus text format on http://host:port/metrics
+    from a daemon thread. Call .shutdown() on the result to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), _PrometheusHandler)
+    server.daemon_threads = True
+    server.metrics = metrics
+    threading.Thread(target=server.serve_forever, name="cdcraft-metrics-http", daemon=True).start()
+    print(f"📈 Prometheus metrics on http://{host}:{server.server_port}/metrics")
+    return server
+
+
+class JsonLinesReporter:
+    """
+    Append a snapshot of the registry to `path` every `interval` seconds.
+    Each line carries the rows/sec of every phase over the last interval,
+    its latency percentiles so far and the process CPU/memory.
+    """
+
+    def __init__(self, path: str, interval: float = 10.0, metrics: Metrics = registry):
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_rows: Dict[Tuple[str, str], int] = {}
+        self._last_at = time.perf_counter()
+        self._last_cpu = time.process_time()
+
+    def start(self) -> "JsonLinesReporter":
+        self._thread = threading.Thread(target=self._run, name="cdcraft-metrics-log", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the reporter and write one last snapshot."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write_snapshot()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write_snapshot()
+
+    def write_snapshot(self):
+        now = time.perf_counter()
+        span = now - self._last_at
+        self._last_at = now
+
+        phases = self.metrics.phase_summary()
+        for entry in phases:
+            key = (entry["phase"], entry["table"])
+            rows = entry["rows"]
+            entry["interval_rows_per_sec"] = (
+                round((rows - self._last_rows.get(key, 0)) / span, 1) if span > 0 else 0.0
+            )
+            self._last_rows[key] = rows
+
+        process = self.metrics.process_stats()
+        process["cpu_percent"] = (
+            round(100 * (process["cpu_seconds"] - self._last_cpu) / span, 1) if span > 0 else 0.0
+        )
+        self._last_cpu = process["cpu_seconds"]
+
+        line = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "uptime_s": round(now - self.metrics.started_at, 3),
+            "phases": phases,
+            "process": process,
+        }
+        gauges = self.metrics.gauge_values()
+        if gauges:
+            line["gauges"] = gauges
+        with open(self.path, "a") as fh:
+            fh.write(json.dumps(line) + "\n")
@@ -1,44 +1,174 @@
 import random
-from typing import List, Dict, Tuple
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 import psycopg2
 from psycopg2 import sql
 from psycopg2.extras import execute_values
 from batch_generator import BatchGenerator
+from copy_encoder import binary_encoders_for, encode_binary_copy, encode_text_copy
+from access_patterns import parse_pattern
+from live_index import LiveKeyIndex
+from metrics import registry
+
+
+INGEST_MODES = ("values", "copy_text", "copy_binary")
+
+
+def _stochastic_round(value: float) -> int:
+    # Round up with probability equal to the fraction, so small ratios still add up
+    whole = int(value)
+    return whole + (1 if random.random() < value - whole else 0)
 
 
 class MutationEngine:
-    def __init__(self, conn, schema="public", table_name="sales"):
+    def __init__(
+        self,
+        conn,
+        schema="public",
+        table_name="sales",
+        ingest_mode: str = "values",
+        column_types: Optional[Dict[str, str]] = None,
+        ops_per_commit: int = 1,
+        large_txn_probability: float = 0.0,
+        large_txn_ops: int = 0,
+        manifest=None,
+        targeting: str = "batch",
+        live_index: Optional[LiveKeyIndex] = None,
+    ):
+        if ingest_mode not in INGEST_MODES:
+            raise ValueError(f"Unknown ingest mode '{ingest_mode}', expected one of {INGEST_MODES}")
+
         self.conn = conn
         self.schema = schema
         self.table_name = table_name
+        self.ingest_mode = ingest_mode
         self.total_inserts = 0
         self.total_updates = 0
         self.total_deletes = 0
 
+        # "batch" mutates only the batch just inserted; anything else is an
+        # access pattern spec (see access_patterns.parse_pattern) sampled
+        # from an index of every live row
+        self.targeting = targeting
+        self.access_pattern = parse_pattern(targeting) if targeting != "batch" else None
+        self.live_index = live_index
+        if self.access_pattern is not None and live_index is None:
+            self.live_index = LiveKeyIndex()
+
+        # Optional ChangeManifest; events are buffered and written once committed
+        self.manifest = manifest
+        self._manifest_pending: List[dict] = []
+
+        # Column name -> SQL type, kept in step with SchemaManager.active_columns.
+        # schema_version counts the distinct shapes seen, for the manifest.
+        self.column_types: Dict[str, str] = {}
+        self.schema_version = 0
+        self._binary_encoders = None
+        if column_types:
+            self.update_schema(column_types)
+
+        # Transaction shaping: commit every `ops_per_commit` insert/update/delete
+        # operations, occasionally stretching a transaction to `large_txn_ops`.
+        self.ops_per_commit = max(1, ops_per_commit)
+        self.large_txn_probability = large_txn_probability
+        self.large_txn_ops = large_txn_ops
+        self._txn_target = self.ops_per_commit
+        self._txn_ops = 0
+        self._txn_rows = 0
+        # Rows counted since the last commit, per counter, so a rollback can take them back
+        self._txn_counts = dict.fromkeys(("total_inserts", "total_updates", "total_deletes"), 0)
+        self.txn_stats: Dict[str, float] = {
+            "commits": 0,
+            "ops": 0,
+            "rows": 0,
+            "commit_seconds": 0.0,
+            "max_txn_rows": 0,
+            "elapsed_seconds": 0.0,
+        }
+        self._first_op_at: Optional[float] = None
+
+    def update_schema(self, column_types: Dict[str, str]):
+        """
+        Track the active table shape. Call after every add/drop so the COPY
+        column list matches the table the rows are written into.
+        """
+        if dict(column_types) != self.column_types:
+            self.schema_version += 1
+            self._record_event({"op": "schema", "columns": dict(column_types)})
+        self.column_types = dict(column_types)
+        self._binary_encoders = None
+        if self.ingest_mode == "copy_binary":
+            self._binary_encoders = binary_encoders_for(self.column_types)
 
     def insert_batch(self, rows: List[Dict]) -> List[str]:
         if not rows:
             return []
-        
 
         # keep track of the inserted IDs for possible mutations
         inserted_ids = [row["id"] for row in rows]
-        self.total_inserts += len(rows)
 
-        with self.conn.cursor() as cur:
-            # Generate the SQL insert statement
-            columns = rows[0].keys()
-            query = sql.SQL("INSERT INTO {}.{} ({}) VALUES %s").format(
-                sql.Identifier(self.schema),
-                sql.Identifier(self.table_name),
-                sql.SQL(", ").join(map(sql.Identifier, columns))
-            )
-            values = [[row[col] for col in columns] for row in rows]
-            execute_values(cur, query, values)
-            self.conn.commit()
-        
+        columns = self._target_columns(rows[0].keys())
+        self._write_rows(columns, ([row[col] for col in columns] for row in rows), len(rows))
+        self._record_event({"op": "c", "ids": inserted_ids})
+        if self.live_index is not None:
+            self.live_index.add(inserted_ids)
         return inserted_ids
-    
+
+    def insert_columns(self, columns: Dict[str, List]) -> List[str]:
+        """
+        Insert a columnar batch (column name -> list of values), as produced
+        by BatchGenerator.generate_columns, without building per-row dicts.
+        """
+        inserted_ids = list(columns.get("id", []))
+        if not inserted_ids:
+            return []
+
+        names = self._target_columns(columns.keys())
+        self._write_rows(names, zip(*(columns[name] for name in names)), len(inserted_ids))
+        self._record_event({"op": "c", "ids": inserted_ids})
+        if self.live_index is not None:
+            self.live_index.add(inserted_ids)
+        return inserted_ids
+
+    def _target_columns(self, batch_columns) -> List[str]:
+        if self.ingest_mode == "values":
+            return list(batch_columns)
+
+        if not self.column_types:
+            raise RuntimeError("COPY ingest needs the active schema; call update_schema() first")
+        if batch_columns != self.column_types.keys():
+            raise ValueError(
+                f"Batch columns {sorted(batch_columns)} do not match the active schema {sorted(self.column_types)}"
+            )
+        return list(self.column_types)
+
+    def _write_rows(self, columns: List[str], values: Iterable[Sequence], row_count: int):
+        with registry.timed("insert", row_count, self.table_name), self.conn.cursor() as cur:
+            column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+
+            if self.ingest_mode == "values":
+                query = sql.SQL("INSERT INTO {}.{} ({}) VALUES %s").format(
+                    sql.Identifier(self.schema),
+                    sql.Identifier(self.table_name),
+                    column_list
+                )
+                execute_values(cur, query, values)
+            else:
+                if self.ingest_mode == "copy_binary":
+                    buffer = encode_binary_copy(values, self._binary_encoders)
+                    copy_format = sql.SQL("(FORMAT binary)")
+                else:
+                    buffer = encode_text_copy(values)
+                    copy_format = sql.SQL("(FORMAT text)")
+
+                query = sql.SQL("COPY {}.{} ({}) FROM STDIN {}").format(
+                    sql.Identifier(self.schema),
+                    sql.Identifier(self.table_name),
+                    column_list,
+                    copy_format
+                )
+                cur.copy_expert(query.as_string(cur), buffer)
+        self._end_operation(row_count, "total_inserts")
 
     def maybe_mutate_batch(
         self, generator: BatchGenerator, inserted_ids: List[str]
@@ -48,48 +178,207 @@ class MutationEngine:
         
         mutation_type = random.choice(["update", "delete"])
         num_to_change = random.randint(1, max(1, len(inserted_ids) // 2))
-        chosen_ids = random.sample(inserted_ids, num_to_change)
+        chosen_ids, slots = self._choose_targets(inserted_ids, num_to_change)
 
         if mutation_type == "update":
             updated_count = self._update_records(generator, chosen_ids)
-            self.total_updates += updated_count
             return updated_count, 0
         else:
             deleted_count = self._delete_records(chosen_ids)
-            self.total_deletes += deleted_count
+            self._forget(slots)
             return 0, deleted_count
+
+    def _choose_targets(self, inserted_ids: List[str], k: int) -> Tuple[List[str], Optional[List[int]]]:
+        """Ids to mutate, plus their live-index slots when targeting the whole table."""
+        if self.targeting == "batch":
+            return random.sample(inserted_ids, min(k, len(inserted_ids))), None
+        return self.live_index.sample(k, self.access_pattern)
+
+    def _forget(self, slots: Optional[List[int]]):
+        if slots is not None:
+            self.live_index.remove_slots(slots)
     
+    def mutate_mix(
+        self, generator: BatchGenerator, inserted_ids: List[str],
+        update_ratio: float, delete_ratio: float
+    ) -> Tuple[int, int]:
+        """
+        Update and delete a fixed share of a freshly inserted batch, e.g.
+        update_ratio=0.3 updates ~30% of its rows. The two sets never overlap.
+        With whole-table targeting the counts are the same, but the rows are
+        drawn from the live index instead of the batch.
+        """
+        total = len(inserted_ids)
+        num_updates = min(total, _stochastic_round(total * update_ratio))
+        num_deletes = min(total - num_updates, _stochastic_round(total * delete_ratio))
+        chosen_ids, slots = self._choose_targets(inserted_ids, num_updates + num_deletes)
+        # Skewed sampling can come back short; updates get served first
+        num_updates = min(num_updates, len(chosen_ids))
+
+        updated_count = deleted_count = 0
+        if num_updates:
+            updated_count = self._update_records(generator, chosen_ids[:num_updates])
+        if len(chosen_ids) > num_updates:
+            deleted_count = self._delete_records(chosen_ids[num_updates:])
+            self._forget(slots[num_updates:] if slots is not None else None)
+        return updated_count, deleted_count
+
     def _update_records(self, generator: BatchGenerator, ids: List[str]) -> int:
         modifiable_columns = [col for col in generator.schema if col not in ("id", "created_at", "updated_at")]
+        if not modifiable_columns:
+            return 0
+
+        # Every row still gets its own column and freshly generated value,
+        # but rows touching the same column share one UPDATE ... FROM (VALUES ...)
+        updates_by_column: Dict[str, List[Tuple[str, object]]] = {}
+        for row_id in ids:
+            col = random.choice(modifiable_columns)
+            updates_by_column.setdefault(col, []).append((row_id, generator._generate_value(col)))
 
-        with self.conn.cursor() as cur:
-            for row_id in ids:
-                col = random.choice(modifiable_columns)
-                val = generator._generate_value(col)
-                query = sql.SQL("UPDATE {}.{} SET {} = %s, updated_at = now() WHERE id = %s").format(
+        self._apply_updates(generator, updates_by_column, len(ids))
+        for col, values in updates_by_column.items():
+            self._record_event({"op": "u", "columns": [col, "updated_at"], "ids": [row_id for row_id, _ in values]})
+        self._end_operation(len(ids), "total_updates")
+
+        return len(ids)
+
+    def _apply_updates(self, generator: BatchGenerator, updates_by_column: Dict[str, List[Tuple[str, object]]], row_count: int):
+        with registry.timed("update", row_count, self.table_name), self.conn.cursor() as cur:
+            for col, values in updates_by_column.items():
+                query = sql.SQL(
+                    "UPDATE {}.{} AS t SET {} = v.val, updated_at = now() "
+                    "FROM (VALUES %s) AS v(id, val) WHERE t.id = v.id"
+                ).format(
                     sql.Identifier(self.schema),
                     sql.Identifier(self.table_name),
                     sql.Identifier(col)
                 )
-                cur.execute(query, (val, row_id))
-            self.conn.commit()
+                template = sql.SQL("(%s::uuid, %s::{})").format(sql.SQL(generator.schema[col]))
+                execute_values(cur, query, values, template=template.as_string(cur), page_size=len(values))
 
-        return len(ids)
-    
     def _delete_records(self, ids: List[str]) -> int:
-        with self.conn.cursor() as cur:
+        self._apply_delete(ids)
+        self._record_event({"op": "d", "ids": list(ids)})
+        self._end_operation(len(ids), "total_deletes")
+
+        return len(ids)
+
+    def _apply_delete(self, ids: List[str]):
+        with registry.timed("delete", len(ids), self.table_name), self.conn.cursor() as cur:
             query = sql.SQL("DELETE FROM {}.{} WHERE id = ANY(%s::uuid[])").format(
                 sql.Identifier(self.schema),
                 sql.Identifier(self.table_name)
             )
             cur.execute(query, (ids,))
-            self.conn.commit()
 
-        return len(ids)
+    def _record_event(self, event: dict):
+        if self.manifest is not None:
+            event["v"] = self.schema_version
+            self._manifest_pending.append(event)
+
+    def _end_operation(self, rows: int, counter: str):
+        """Count a finished statement's rows in `counter` (e.g. "total_inserts") and commit if the transaction is full."""
+        if self._first_op_at is None:
+            self._first_op_at = time.perf_counter()
+        setattr(self, counter, getattr(self, counter) + rows)
+        self._txn_counts[counter] += rows
+        self._txn_ops += 1
+        self._txn_rows += rows
+        if self._txn_ops >= self._txn_target:
+            self.flush()
+
+    def flush(self):
+        """
+        Commit the open transaction, if any, and write its events to the
+        manifest. Call before DDL on the same connection and at the end of a run.
+        """
+        if self._txn_ops == 0:
+            self._write_manifest()
+            return
+
+        started = time.perf_counter()
+        self._commit()
+        finished = time.perf_counter()
+        registry.observe("commit", finished - started, self._txn_rows, self.table_name)
+
+        stats = self.txn_stats
+        stats["commits"] += 1
+        stats["ops"] += self._txn_ops
+        stats["rows"] += self._txn_rows
+        stats["commit_seconds"] += finished - started
+        stats["max_txn_rows"] = max(stats["max_txn_rows"], self._txn_rows)
+        stats["elapsed_seconds"] = finished - self._first_op_at
+
+        self._write_manifest()
+        self._reset_transaction()
+
+    def _reset_transaction(self):
+        self._txn_ops = 0
+        self._txn_rows = 0
+        self._txn_counts = dict.fromkeys(self._txn_counts, 0)
+        if self.large_txn_ops and random.random() < self.large_txn_probability:
+            self._txn_target = self.large_txn_ops
+        else:
+            self._txn_target = self.ops_per_commit
+
+    def _commit(self):
+        self.conn.commit()
+
+    def rollback(self) -> Dict[str, int]:
+        """
+        Roll back the open transaction and take its rows out of the counters,
+        so they match the table. Returns the rows dropped per counter.
+        """
+        dropped = dict(self._txn_counts)
+        if self.conn is not None:
+            # The async engine commits each statement on its pooled connection
+            self.conn.rollback()
+        for counter, rows in dropped.items():
+            setattr(self, counter, getattr(self, counter) - rows)
+        self._manifest_pending.clear()
+        self._reset_transaction()
+        return dropped
+
+    def _write_manifest(self):
+        if self.manifest is not None:
+            for event in self._manifest_pending:
+                self.manifest.record(event)
+            self._manifest_pending.clear()
+
+    def get_transaction_stats(self) -> Dict[str, float]:
+        stats = self.txn_stats
+        commits = stats["commits"]
+        elapsed = stats["elapsed_seconds"]
+        return {
+            "commits": int(commits),
+            "commits_per_sec": round(commits / elapsed, 2) if elapsed else 0.0,
+            "avg_ops_per_txn": round(stats["ops"] / commits, 2) if commits else 0.0,
+            "avg_rows_per_txn": round(stats["rows"] / commits, 2) if commits else 0.0,
+            "max_rows_per_txn": int(stats["max_txn_rows"]),
+            "avg_commit_ms": round(stats["commit_seconds"] / commits * 1000, 3) if commits else 0.0,
+        }
 
     def get_counters(self) -> Dict[str, int]:
         return {
             "total_inserts": self.total_inserts,
             "total_updates": self.total_updates,
             "total_deletes": self.total_deletes,
-        }
\ No newline at end of file
+        }
+
+    def merge_counters(self, counters: Dict[str, int]):
+        """
+        Fold counters reported by another engine (e.g. a worker process) into this one.
+        """
+        self.total_inserts += counters.get("total_inserts", 0)
+        self.total_updates += counters.get("total_updates", 0)
+        self.total_deletes += counters.get("total_deletes", 0)
+
+    def merge_transaction_stats(self, txn_stats: Dict[str, float]):
+        """
+        Fold raw txn_stats from another engine into this one. Elapsed time is
+        taken as the longest of the two, since workers run side by side.
+        """
+        for key in ("commits", "ops", "rows", "commit_seconds"):
+            self.txn_stats[key] += txn_stats.get(key, 0)
+        for key in ("max_txn_rows", "elapsed_seconds"):
+            self.txn_stats[key] = max(self.txn_stats[key], txn_stats.get(key, 0))
\ No newline at end of file
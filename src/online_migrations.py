@@ -0,0 +1,526 @@
+"""
+Online schema migrations: type widening, rename, add with default and
+nullable → NOT NULL, rolled out the way production teams avoid stalling
+writers on an ACCESS EXCLUSIVE lock.
+
+Two strategies:
+
+- lock_timeout: one ALTER per operation, run under SET LOCAL lock_timeout
+  and retried with backoff when the lock is not granted in time, so DDL
+  never queues every later write behind a long transaction. Type changes
+  and NOT NULL still rewrite or scan the table while holding the lock.
+- shadow: the expensive part is done in small steps between batches. A
+  type change adds a shadow column kept in sync by a trigger, backfills it
+  `backfill_rows` rows at a time in primary-key order and swaps it in with
+  a metadata-only cutover. NOT NULL goes through a NOT VALID check that is
+  validated without blocking writes. The statements that still need a
+  lock use the same lock_timeout retry.
+
+Renames are metadata-only, so both strategies issue a single guarded ALTER.
+
+Every DDL statement is timed as "ddl", every failed lock attempt as
+"lock_wait" and every backfill step as "backfill" in the metrics
+registry; each finished operation as "migrate_<operation>".
+"""
+import random
+import re
+import time
+from typing import Callable, List, Optional
+
+import psycopg2
+from psycopg2 import errors, sql
+
+from column_manager import ColumnDefinition
+from metrics import registry
+
+STRATEGIES = ("lock_timeout", "shadow")
+OPERATIONS = ("widen", "rename", "add_default", "not_null")
+
+# Type changes that keep every existing value representable
+WIDENINGS = {
+    "smallint": "INTEGER",
+    "int2": "INTEGER",
+    "integer": "BIGINT",
+    "int": "BIGINT",
+    "int4": "BIGINT",
+    "real": "DOUBLE PRECISION",
+    "float4": "DOUBLE PRECISION",
+}
+
+_KEYSET_START = "00000000-0000-0000-0000-000000000000"
+
+
+def copy_definition(col_def: ColumnDefinition, **changes) -> ColumnDefinition:
+    """Same generators (and value pool) under a new name, type or constraints."""
+    copied = ColumnDefinition(
+        changes.get("name", col_def.name),
+        changes.get("sql_type", col_def.sql_type),
+        col_def.generator,
+        constraints=changes.get("constraints", col_def.constraints),
+        batch_generator=col_def.batch_generator,
+    )
+    copied.value_pool = col_def.value_pool
+    return copied
+
+
+class Migration:
+    """
+    One operation as a list of steps. advance() runs steps until one is not
+    finished yet (a backfill with rows left, or DDL that lost its lock race);
+    the next call resumes there.
+    """
+
+    operation = ""
+
+    def __init__(self, migrator: "OnlineMigrator", col_def: ColumnDefinition):
+        self.migrator = migrator
+        self.col_def = col_def
+        self.column = col_def.name
+        self.strategy = migrator.strategy
+        self.steps: List[Callable[[], bool]] = self._plan()
+        self.position = 0
+        self.reshaped = False
+        self.lock_failures = 0
+        self.backfilled = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self._cursor = _KEYSET_START
+
+    def _plan(self) -> List[Callable[[], bool]]:
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        return f"{self.operation} {self.column}"
+
+    def abandon(self):
+        """Undo any bookkeeping done before the first step ran."""
+
+    @property
+    def done(self) -> bool:
+        return self.position >= len(self.steps)
+
+    def advance(self):
+        self.reshaped = False
+        while not self.done and self.steps[self.position]():
+            self.position += 1
+        if self.done:
+            self.elapsed = time.perf_counter() - self.started
+
+    # ────────── STEP HELPERS ────────── #
+
+    @property
+    def table(self) -> sql.Composed:
+        mgr = self.migrator.schema_mgr
+        return sql.SQL("{}.{}").format(sql.Identifier(mgr.schema), sql.Identifier(mgr.table_name))
+
+    def _alter(self, clause: str, *args: sql.Composable) -> sql.Composed:
+        return sql.SQL("ALTER TABLE {} " + clause).format(self.table, *args)
+
+    def _backfill(self, assignment: sql.Composable, condition: Optional[sql.Composable] = None) -> bool:
+        """One keyset batch of UPDATEs; True once the whole table has been walked."""
+        query = sql.SQL(
+            "WITH batch AS (SELECT id FROM {table} WHERE id > %s::uuid ORDER BY id LIMIT %s), "
+            "updated AS (UPDATE {table} AS t SET {assignment} FROM batch WHERE t.id = batch.id{condition} RETURNING 1) "
+            "SELECT (SELECT id::text FROM batch ORDER BY id DESC LIMIT 1), "
+            "(SELECT count(*) FROM batch), (SELECT count(*) FROM updated)"
+        ).format(
+            table=self.table,
+            assignment=assignment,
+            condition=sql.SQL(" AND ") + condition if condition is not None else sql.SQL(""),
+        )
+        limit = self.migrator.backfill_rows
+        result = self.migrator.execute([(query, (self._cursor, limit))], self, phase="backfill")
+        if result is None:
+            return False
+        last_id, scanned, updated = result
+        self.backfilled += updated
+        self.migrator.backfilled_total += updated
+        if last_id is not None:
+            self._cursor = last_id
+        return scanned < limit
+
+    def _ddl(self, *statements: sql.Composable) -> bool:
+        return self.migrator.execute([(statement, None) for statement in statements], self) is not None
+
+
+class WidenColumn(Migration):
+    operation = "widen"
+
+    def __init__(self, migrator, col_def):
+        self.new_type = WIDENINGS[col_def.sql_type.lower()]
+        self.not_null = "NOT NULL" in col_def.constraints.upper()
+        mgr = migrator.schema_mgr
+        # Identifiers longer than 63 bytes are truncated by PostgreSQL, the same way on every reference
+        self.shadow = f"{col_def.name}__cdcraft_new"
+        self.trigger = f"cdcraft_{mgr.table_name}_{col_def.name}_sync"
+        self.check = f"{self.shadow}_not_null"
+        super().__init__(migrator, col_def)
+
+    def describe(self) -> str:
+        return f"widen {self.column} {self.col_def.sql_type} → {self.new_type}"
+
+    def _plan(self):
+        if self.strategy == "lock_timeout":
+            return [self._rewrite]
+        steps = [self._add_shadow, self._backfill_shadow]
+        if self.not_null:
+            steps.append(self._validate)
+        return steps + [self._cutover]
+
+    def _rewrite(self) -> bool:
+        done = self._ddl(self._alter(
+            "ALTER COLUMN {} TYPE " + self.new_type, sql.Identifier(self.column)
+        ))
+        if done:
+            self._finish()
+        return done
+
+    @property
+    def _function(self) -> sql.Composed:
+        return sql.SQL("{}.{}").format(sql.Identifier(self.migrator.schema_mgr.schema), sql.Identifier(self.trigger))
+
+    def _add_shadow(self) -> bool:
+        statements = [self._alter("ADD COLUMN {} " + self.new_type, sql.Identifier(self.shadow))]
+        if self.not_null:
+            statements.append(self._alter(
+                "ADD CONSTRAINT {} CHECK ({} IS NOT NULL) NOT VALID",
+                sql.Identifier(self.check), sql.Identifier(self.shadow),
+            ))
+        statements += [
+            sql.SQL(
+                "CREATE OR REPLACE FUNCTION {}() RETURNS trigger LANGUAGE plpgsql AS "
+                "$$ BEGIN NEW.{} := NEW.{}; RETURN NEW; END $$"
+            ).format(self._function, sql.Identifier(self.shadow), sql.Identifier(self.column)),
+            # Every update, not just UPDATE OF the column: an update to any other column of a row
+            # the backfill hasn't reached yet would otherwise fail the shadow's NOT NULL check
+            sql.SQL(
+                "CREATE TRIGGER {} BEFORE INSERT OR UPDATE ON {} FOR EACH ROW EXECUTE FUNCTION {}()"
+            ).format(sql.Identifier(self.trigger), self.table, self._function),
+        ]
+        return self._ddl(*statements)
+
+    def _backfill_shadow(self) -> bool:
+        return self._backfill(sql.SQL("{} = t.{}").format(sql.Identifier(self.shadow), sql.Identifier(self.column)))
+
+    def _validate(self) -> bool:
+        # SHARE UPDATE EXCLUSIVE: scans the table but lets writes through
+        return self._ddl(self._alter("VALIDATE CONSTRAINT {}", sql.Identifier(self.check)))
+
+    def _cutover(self) -> bool:
+        statements = [
+            sql.SQL("DROP TRIGGER {} ON {}").format(sql.Identifier(self.trigger), self.table),
+            self._alter("DROP COLUMN {}", sql.Identifier(self.column)),
+            self._alter("RENAME COLUMN {} TO {}", sql.Identifier(self.shadow), sql.Identifier(self.column)),
+        ]
+        if self.not_null:
+            # The validated check lets SET NOT NULL skip its full-table scan
+            statements += [
+                self._alter("ALTER COLUMN {} SET NOT NULL", sql.Identifier(self.column)),
+                self._alter("DROP CONSTRAINT {}", sql.Identifier(self.check)),
+            ]
+        statements.append(sql.SQL("DROP FUNCTION {}()").format(self._function))
+        done = self._ddl(*statements)
+        if done:
+            self._finish()
+        return done
+
+    def _finish(self):
+        self.reshaped = True
+        self.migrator.schema_mgr._record_migrated(
+            self.column, copy_definition(self.col_def, sql_type=self.new_type), "widen",
+            f"{self.col_def.sql_type} → {self.new_type}",
+        )
+
+
+class RenameColumn(Migration):
+    operation = "rename"
+
+    def __init__(self, migrator, col_def):
+        base, version = re.match(r"(.*?)(?:_v(\d+))?$", col_def.name).groups()
+        self.new_name = f"{base}_v{int(version or 1) + 1}"
+        super().__init__(migrator, col_def)
+
+    def describe(self) -> str:
+        return f"rename {self.column} → {self.new_name}"
+
+    def _plan(self):
+        return [self._rename]
+
+    def _rename(self) -> bool:
+        done = self._ddl(self._alter(
+            "RENAME COLUMN {} TO {}", sql.Identifier(self.column), sql.Identifier(self.new_name)
+        ))
+        if done:
+            self.reshaped = True
+            self.migrator.schema_mgr._record_migrated(
+                self.column, copy_definition(self.col_def, name=self.new_name), "rename", f"from {self.column}"
+            )
+        return done
+
+
+class AddColumnWithDefault(Migration):
+    operation = "add_default"
+
+    def __init__(self, migrator, col_def):
+        self.default = col_def.generate()
+        super().__init__(migrator, col_def)
+
+    def describe(self) -> str:
+        return f"add {self.column} DEFAULT {self.default!r}"
+
+    def abandon(self):
+        self.migrator.schema_mgr.column_pool.insert(0, self.col_def)
+
+    def _plan(self):
+        if self.strategy == "lock_timeout":
+            return [self._add]
+        return [self._add, self._backfill_default]
+
+    def _add(self) -> bool:
+        column_type = sql.SQL(self.col_def.sql_type)
+        if self.strategy == "lock_timeout":
+            # A constant default is stored in the catalog (PostgreSQL 11+), no rewrite
+            statements = [self._alter(
+                "ADD COLUMN {} {} DEFAULT {}", sql.Identifier(self.column), column_type, sql.Literal(self.default)
+            )]
+        else:
+            # The route for volatile defaults: new rows get the default, old rows are backfilled
+            statements = [
+                self._alter("ADD COLUMN {} {}", sql.Identifier(self.column), column_type),
+                self._alter("ALTER COLUMN {} SET DEFAULT {}", sql.Identifier(self.column), sql.Literal(self.default)),
+            ]
+        done = self._ddl(*statements)
+        if done:
+            self.reshaped = True
+            self.migrator.schema_mgr._record_added(self.col_def, detail=f"default {self.default!r}")
+        return done
+
+    def _backfill_default(self) -> bool:
+        return self._backfill(
+            sql.SQL("{} = {}").format(sql.Identifier(self.column), sql.Literal(self.default)),
+            sql.SQL("t.{} IS NULL").format(sql.Identifier(self.column)),
+        )
+
+
+class SetNotNull(Migration):
+    operation = "not_null"
+
+    def __init__(self, migrator, col_def):
+        self.fill = col_def.generate()
+        self.check = f"{col_def.name}_not_null"
+        self.trigger = f"cdcraft_{migrator.schema_mgr.table_name}_{col_def.name}_fill"
+        super().__init__(migrator, col_def)
+
+    def describe(self) -> str:
+        return f"set {self.column} NOT NULL"
+
+    def _plan(self):
+        if self.strategy == "lock_timeout":
+            return [self._fill_and_set]
+        return [self._add_check, self._backfill_nulls, self._validate, self._set_not_null]
+
+    @property
+    def _fill_assignment(self) -> sql.Composed:
+        return sql.SQL("{} = {}").format(sql.Identifier(self.column), sql.Literal(self.fill))
+
+    def _fill_and_set(self) -> bool:
+        done = self._ddl(
+            sql.SQL("UPDATE {} SET {} WHERE {} IS NULL").format(
+                self.table, self._fill_assignment, sql.Identifier(self.column)
+            ),
+            self._alter("ALTER COLUMN {} SET NOT NULL", sql.Identifier(self.column)),
+        )
+        if done:
+            self._finish()
+        return done
+
+    @property
+    def _function(self) -> sql.Composed:
+        return sql.SQL("{}.{}").format(sql.Identifier(self.migrator.schema_mgr.schema), sql.Identifier(self.trigger))
+
+    def _add_check(self) -> bool:
+        # The NOT VALID check still applies to updated rows, so an update to a row the
+        # backfill hasn't reached yet gets its NULL filled by a trigger instead of failing
+        return self._ddl(
+            self._alter(
+                "ADD CONSTRAINT {} CHECK ({} IS NOT NULL) NOT VALID", sql.Identifier(self.check), sql.Identifier(self.column)
+            ),
+            sql.SQL(
+                "CREATE OR REPLACE FUNCTION {}() RETURNS trigger LANGUAGE plpgsql AS "
+                "$$ BEGIN NEW.{} := COALESCE(NEW.{}, {}); RETURN NEW; END $$"
+            ).format(self._function, sql.Identifier(self.column), sql.Identifier(self.column), sql.Literal(self.fill)),
+            sql.SQL(
+                "CREATE TRIGGER {} BEFORE INSERT OR UPDATE ON {} FOR EACH ROW EXECUTE FUNCTION {}()"
+            ).format(sql.Identifier(self.trigger), self.table, self._function),
+        )
+
+    def _backfill_nulls(self) -> bool:
+        return self._backfill(self._fill_assignment, sql.SQL("t.{} IS NULL").format(sql.Identifier(self.column)))
+
+    def _validate(self) -> bool:
+        return self._ddl(self._alter("VALIDATE CONSTRAINT {}", sql.Identifier(self.check)))
+
+    def _set_not_null(self) -> bool:
+        done = self._ddl(
+            self._alter("ALTER COLUMN {} SET NOT NULL", sql.Identifier(self.column)),
+            self._alter("DROP CONSTRAINT {}", sql.Identifier(self.check)),
+            sql.SQL("DROP TRIGGER {} ON {}").format(sql.Identifier(self.trigger), self.table),
+            sql.SQL("DROP FUNCTION {}()").format(self._function),
+        )
+        if done:
+            self._finish()
+        return done
+
+    def _finish(self):
+        constraints = f"{self.col_def.constraints} NOT NULL".strip()
+        self.migrator.schema_mgr._record_migrated(
+            self.column, copy_definition(self.col_def, constraints=constraints), "not_null", f"nulls filled with {self.fill!r}"
+        )
+
+
+class OnlineMigrator:
+    """Runs at most one migration at a time on the SchemaManager's connection."""
+
+    def __init__(
+        self,
+        schema_mgr,
+        strategy: str = "lock_timeout",
+        lock_timeout_ms: int = 2000,
+        lock_retries: int = 5,
+        backfill_rows: int = 5000,
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown migration strategy '{strategy}', expected one of {list(STRATEGIES)}")
+        self.schema_mgr = schema_mgr
+        self.strategy = strategy
+        self.lock_timeout_ms = lock_timeout_ms
+        self.lock_retries = lock_retries
+        self.backfill_rows = backfill_rows
+
+        self.active: Optional[Migration] = None
+        self.history: List[dict] = []
+        # Rows updated by every backfill so far; they reach logical decoding as updates too
+        self.backfilled_total = 0
+
+    # ────────── SCHEDULING ────────── #
+
+    def start(self, operation: str) -> Optional[Migration]:
+        """
+        Begin `operation` on a suitable column and run it as far as it goes
+        without waiting. None when another migration is still running or no
+        column qualifies.
+        """
+        if self.active is not None:
+            return None
+        migration = self._build(operation)
+        if migration is None:
+            return None
+
+        migration.advance()
+        if migration.position == 0:
+            # Never got its first lock; nothing was changed
+            migration.abandon()
+            migration.elapsed = time.perf_counter() - migration.started
+            self._log(migration, "abandoned")
+        elif migration.done:
+            self._log(migration, "done")
+        else:
+            self.active = migration
+        return migration
+
+    def advance(self) -> Optional[Migration]:
+        """Run the active migration's next step(s); returns it, or None when idle."""
+        migration = self.active
+        if migration is None:
+            return None
+        migration.advance()
+        if migration.done:
+            self.active = None
+            self._log(migration, "done")
+        return migration
+
+    @property
+    def busy_column(self) -> Optional[str]:
+        return self.active.column if self.active is not None else None
+
+    def _build(self, operation: str) -> Optional[Migration]:
+        mgr = self.schema_mgr
+        if operation == "add_default":
+            col_def = mgr._take_pool_column()
+            return AddColumnWithDefault(self, col_def) if col_def is not None else None
+
+        candidates = [
+            col_def for name, col_def in mgr.active_columns.items()
+            if name not in mgr.protected_columns and "PRIMARY KEY" not in col_def.constraints.upper()
+        ]
+        if operation == "widen":
+            candidates = [
+                c for c in candidates
+                if c.sql_type.lower() in WIDENINGS and "DEFAULT" not in c.constraints.upper()
+            ]
+            factory = WidenColumn
+        elif operation == "rename":
+            factory = RenameColumn
+        elif operation == "not_null":
+            candidates = [c for c in candidates if "NOT NULL" not in c.constraints.upper()]
+            factory = SetNotNull
+        else:
+            raise ValueError(f"Unknown migration '{operation}', expected one of {list(OPERATIONS)}")
+
+        if not candidates:
+            return None
+        return factory(self, random.choice(candidates))
+
+    def _log(self, migration: Migration, state: str):
+        if state == "done":
+            registry.observe(
+                f"migrate_{migration.operation}", migration.elapsed, migration.backfilled, self.schema_mgr.table_name
+            )
+        self.history.append({
+            "operation": migration.operation,
+            "column": migration.column,
+            "description": migration.describe(),
+            "strategy": migration.strategy,
+            "state": state,
+            "elapsed_s": round(migration.elapsed, 3),
+            "lock_failures": migration.lock_failures,
+            "backfilled_rows": migration.backfilled,
+        })
+
+    def summary(self) -> List[dict]:
+        return list(self.history)
+
+    # ────────── EXECUTION ────────── #
+
+    def execute(self, statements, migration: Migration, phase: str = "ddl") -> Optional[tuple]:
+        """
+        Run statements in one transaction under lock_timeout, retrying with
+        jittered exponential backoff when a lock is not granted. Returns the
+        last statement's first row (or () when it has none), or None once
+        the retries are spent.
+        """
+        conn = self.schema_mgr.conn
+        table = self.schema_mgr.table_name
+        for attempt in range(self.lock_retries + 1):
+            started = time.perf_counter()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SET LOCAL lock_timeout = %s", (f"{self.lock_timeout_ms}ms",))
+                    for statement, params in statements:
+                        cur.execute(statement, params)
+                    result = cur.fetchone() if cur.description else ()
+                conn.commit()
+            except errors.LockNotAvailable:
+                conn.rollback()
+                migration.lock_failures += 1
+                registry.observe("lock_wait", time.perf_counter() - started, table=table)
+                if attempt < self.lock_retries:
+                    time.sleep(min(2.0, 0.05 * 2 ** attempt) * random.uniform(0.5, 1.5))
+                continue
+            except psycopg2.Error:
+                conn.rollback()
+                raise
+            rows = result[2] if phase == "backfill" else 0
+            registry.observe(phase, time.perf_counter() - started, rows, table)
+            return result
+        return None
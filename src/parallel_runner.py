@@ -0,0 +1,268 @@
+import math
+import multiprocessing as mp
+import queue
+import threading
+import traceback
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+from batch_generator import BatchGenerator
+from column_pool import BASE_COLUMN_DEFINITIONS, COLUMN_POOL
+from manifest import ChangeManifest, worker_manifest_path
+from metrics import registry
+from mutation_engine import MutationEngine
+from payloads import extra_columns
+from rate_controller import LoadProfile, RateController, scale_profile
+from runner import evolve_schema
+from seeding import derive_seed, seed_all
+
+
+def _simulation_worker(
+    worker_id: int,
+    workers: int,
+    conn_params: dict,
+    schema: str,
+    table_name: str,
+    column_types: Dict[str, str],
+    total_batches: int,
+    steps: int,
+    sync_steps: List[int],
+    batch_size: int,
+    ingest_mode: str,
+    engine_options: dict,
+    columnar: bool,
+    rate_profile: Optional[LoadProfile],
+    seed: Optional[int],
+    manifest_path: Optional[str],
+    extra_column_spec: Tuple[Optional[str], int],
+    sink_options: Optional[dict],
+    barrier,
+    schema_queue,
+    result_queue,
+):
+    """
+    Worker process: writes every `workers`-th batch over its own connection (or,
+    with sink_options, to its own event files) and meets the coordinator at
+    each evolution step to pick up the new column set.
+    """
+    conn = None
+    manifest = None
+    try:
+        # A forked worker inherits the parent's registry and generator state;
+        # report only its own work and never replay another worker's ids
+        registry.reset()
+        worker_seed = derive_seed(seed, "worker", worker_id) if seed is not None else None
+        seed_all(worker_seed)
+
+        if manifest_path:
+            manifest = ChangeManifest(
+                worker_manifest_path(manifest_path, worker_id),
+                table=f"{schema}.{table_name}", seed=worker_seed, worker=worker_id,
+            )
+        # Payload and wide columns hold closures, so each worker rebuilds them from the spec
+        column_definitions = BASE_COLUMN_DEFINITIONS + COLUMN_POOL + extra_columns(*extra_column_spec)
+        generator = BatchGenerator(column_types, column_definitions, table_name=table_name)
+        if sink_options is not None:
+            from file_sink import ChangeEventFiles, FileSinkMutationEngine
+
+            mutator = FileSinkMutationEngine(
+                ChangeEventFiles(schema=schema, table=table_name, worker=worker_id, **sink_options),
+                schema=schema, table_name=table_name, column_types=column_types, manifest=manifest, **engine_options
+            )
+        else:
+            conn = psycopg2.connect(**conn_params)
+            mutator = MutationEngine(
+                conn, schema=schema, table_name=table_name,
+                ingest_mode=ingest_mode, column_types=column_types, manifest=manifest, **engine_options
+            )
+        sync_points = set(sync_steps)
+
+        # Each worker paces itself to an equal share of the global target
+        rate_controller = None
+        if rate_profile is not None:
+            rate_controller = RateController(scale_profile(rate_profile, 1 / workers))
+            rate_controller.start()
+
+        for step in range(1, steps + 1):
+            if (step - 1) * workers + worker_id < total_batches:
+                if columnar:
+                    inserted_ids = mutator.insert_columns(generator.generate_columns(batch_size))
+                else:
+                    inserted_ids = mutator.insert_batch(generator.generate_batch(batch_size))
+                updated, deleted = mutator.maybe_mutate_batch(generator, inserted_ids)
+                if rate_controller:
+                    rate_controller.throttle(len(inserted_ids) + updated + deleted)
+
+            if step in sync_points:
+                # Nothing may be left uncommitted while the parent alters the table
+                mutator.flush()
+                barrier.wait()
+                new_schema = schema_queue.get()
+                if new_schema is not None:
+                    new_types, aliases = new_schema
+                    generator.update_schema(new_types, aliases)
+                    mutator.update_schema(new_types)
+
+        mutator.flush()
+        sink_summary = None
+        if sink_options is not None:
+            mutator.close()
+            sink_summary = mutator.sink.summary()
+        rate_report = rate_controller.report() if rate_controller else None
+        touch_summary = mutator.live_index.touch_summary() if mutator.live_index is not None else None
+        worker_stats = (mutator.get_counters(), mutator.txn_stats, registry.export_state(), touch_summary, sink_summary)
+        result_queue.put((worker_id, worker_stats, rate_report, None))
+    except BaseException:
+        barrier.abort()
+        result_queue.put((worker_id, None, None, traceback.format_exc()))
+    finally:
+        if manifest is not None:
+            manifest.close()
+        if conn is not None:
+            conn.close()
+
+
+def _collect_results(processes, result_queue) -> Dict[int, tuple]:
+    results = {}
+    while len(results) < len(processes):
+        try:
+            worker_id, worker_stats, rate_report, error = result_queue.get(timeout=1.0)
+            results[worker_id] = (worker_stats, rate_report, error)
+        except queue.Empty:
+            for worker_id, proc in enumerate(processes):
+                if worker_id not in results and proc.exitcode not in (None, 0):
+                    results[worker_id] = (None, None, f"worker exited with code {proc.exitcode}")
+    return results
+
+
+def run_parallel_cdc_simulation(
+    schema_mgr,
+    mutator,
+    schema_evolver,
+    conn_params: dict,
+    total_records: int,
+    batch_size: int,
+    workers: int,
+    enable_evolution: bool = True,
+    columnar: bool = False,
+    rate_profile: Optional[LoadProfile] = None,
+    seed: Optional[int] = None,
+    manifest_path: Optional[str] = None,
+    extra_column_spec: Tuple[Optional[str], int] = (None, 0),
+    sink_options: Optional[dict] = None,
+):
+    """
+    Shard the simulation across worker processes, each with its own connection
+    and BatchGenerator. The parent owns schema evolution: at every evolution
+    step all workers wait at a barrier, the parent applies the DDL through
+    schema_mgr and broadcasts the new column set before anyone writes again.
+    Worker counters are merged into `mutator`, and worker timings into the
+    metrics registry, for the final report.
+
+    With a seed, each worker derives its own from it, so the run replays
+    for the same seed and worker count. With manifest_path, each worker
+    writes its own manifest next to it (see worker_manifest_path).
+    extra_column_spec is the (PAYLOAD_COLUMNS, WIDE_COLUMNS) pair the
+    table's extra columns were built from (see payloads.extra_columns).
+    With sink_options (ChangeEventFiles keyword arguments), workers write
+    change events to files instead of the database, and `mutator` must be
+    a FileSinkMutationEngine.
+    """
+    total_batches = total_records // batch_size
+    steps = math.ceil(total_batches / workers)
+    # Evolution is due every `evolution_interval` batches across all workers, as in a
+    # sequential run; each worker step writes `workers` batches, so several can fall on one step
+    evolution_points: Dict[int, List[int]] = {}
+    if enable_evolution:
+        for batch_no in range(schema_evolver.evolution_interval, total_batches + 1, schema_evolver.evolution_interval):
+            evolution_points.setdefault(math.ceil(batch_no / workers), []).append(batch_no)
+    sync_steps = sorted(evolution_points)
+
+    print(
+        f"\n🚀 Starting parallel CDC Simulation: {total_records} records in "
+        f"{total_batches} batches across {workers} workers\n"
+    )
+    if not enable_evolution:
+        print("🔒 Schema evolution disabled. Only inserts, updates, and deletes will be simulated.")
+
+    ctx = mp.get_context()
+    barrier = ctx.Barrier(workers + 1)
+    result_queue = ctx.Queue()
+    schema_queues = [ctx.Queue() for _ in range(workers)]
+    column_types = schema_mgr.get_active_column_definitions()
+    engine_options = dict(
+        ops_per_commit=mutator.ops_per_commit,
+        large_txn_probability=mutator.large_txn_probability,
+        large_txn_ops=mutator.large_txn_ops,
+        targeting=mutator.targeting,
+    )
+
+    processes = [
+        ctx.Process(
+            target=_simulation_worker,
+            name=f"cdcraft-worker-{worker_id}",
+            args=(
+                worker_id, workers, conn_params, schema_mgr.schema, schema_mgr.table_name,
+                column_types, total_batches, steps, sync_steps, batch_size,
+                mutator.ingest_mode, engine_options, columnar, rate_profile, seed, manifest_path,
+                extra_column_spec, sink_options, barrier, schema_queues[worker_id], result_queue,
+            ),
+        )
+        for worker_id in range(workers)
+    ]
+    for proc in processes:
+        proc.start()
+
+    try:
+        for step in sync_steps:
+            try:
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                # A worker failed and aborted the barrier; its traceback is in the results
+                break
+
+            new_schema: Optional[Tuple[Dict[str, str], Dict[str, str]]] = None
+            changed = False
+            for batch_no in evolution_points[step]:
+                changed = evolve_schema(schema_mgr, schema_evolver, batch_no) or changed
+            if changed:
+                new_schema = (schema_mgr.get_active_column_definitions(), schema_mgr.get_column_aliases())
+            for schema_queue in schema_queues:
+                schema_queue.put(new_schema)
+
+            counts_so_far = min(step * workers, total_batches) * batch_size
+            print(f"[Step {step}] ~{counts_so_far} records inserted across workers")
+
+        results = _collect_results(processes, result_queue)
+    finally:
+        for proc in processes:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+
+    errors = []
+    achieved_eps = target_eps = 0.0
+    for worker_id, (worker_stats, rate_report, error) in sorted(results.items()):
+        if worker_stats is not None:
+            counters, txn_stats, metrics_state, touch_summary, sink_summary = worker_stats
+            mutator.merge_counters(counters)
+            mutator.merge_transaction_stats(txn_stats)
+            registry.merge_state(metrics_state)
+            if touch_summary is not None and mutator.live_index is not None:
+                mutator.live_index.merge_touch_summary(touch_summary)
+            if sink_summary is not None:
+                mutator.sink.merge_summary(sink_summary)
+        if rate_report:
+            achieved_eps += rate_report["achieved_eps"]
+            target_eps += rate_report["target_eps"]
+        if error:
+            errors.append(f"worker {worker_id}:\n{error}")
+
+    if rate_profile is not None and target_eps:
+        print(
+            f"🎯 Rate: {achieved_eps:.1f} ev/s achieved vs {target_eps:.1f} ev/s target "
+            f"({achieved_eps / target_eps:.0%}) across {workers} workers"
+        )
+
+    if errors:
+        raise RuntimeError("Parallel simulation failed:\n" + "\n".join(errors))
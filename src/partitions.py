@@ -0,0 +1,389 @@
+"""
+Range-partitioned tables and partition churn.
+
+With a partitioning spec, SchemaManager creates the table as
+`PARTITION BY RANGE (<key>)` on `purchased_at` or `created_at`. The
+primary key becomes (id, <key>), as PostgreSQL requires it to include the
+partition key. PostgreSQL routes each generated row to its partition:
+
+- `purchased_at` spreads rows over the two years its generator covers;
+- `created_at` appends to the current partition, like most time-series
+  tables do.
+
+PartitionManager keeps a window of partitions around the current time,
+the way pg_partman's maintenance does. The runners call maintain()
+after every batch, next to schema evolution, and it acts whenever the
+clock has crossed a partition boundary:
+
+- create: keeps `premake` partitions ahead of the current one;
+- retire: partitions entirely older than `retain` intervals before the
+  current one are dropped, or detached (optionally CONCURRENTLY) and then
+  dropped. Their rows leave the table without any change events;
+- a DEFAULT partition (on by default) catches rows outside the window.
+  Each partition created later scans it, so that cost grows with it.
+
+Every operation is timed into the `partition_<op>` phases of the metrics
+registry and kept in `history`. row_counts() gives the live rows of every
+partition, for the final report.
+"""
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from psycopg2 import sql
+
+from metrics import registry
+
+KEYS = ("purchased_at", "created_at")
+RETIRE_MODES = ("drop", "detach", "detach_concurrently")
+
+# How far back each key's generator reaches (see column_pool; Faker's '-2y' is 730.48 days)
+_KEY_HISTORY = {"purchased_at": timedelta(days=731), "created_at": timedelta(0)}
+
+_FIXED_UNITS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+_NAME_FORMATS = {"minute": "%Y%m%d_%H%M", "hour": "%Y%m%d_%H", "day": "%Y%m%d", "week": "%Y%m%d", "month": "%Y%m"}
+# Fixed-length intervals are aligned to this Monday
+_EPOCH = datetime(2000, 1, 3)
+_BOUNDS = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def parse_interval(text: str) -> Tuple[int, str]:
+    """'1 month', '15 minutes', 'day' -> (count, unit)."""
+    match = re.fullmatch(r"\s*(\d*)\s*(minute|hour|day|week|month)s?\s*", text.lower())
+    if not match or match.group(1) == "0":
+        raise ValueError(f"Unknown partition interval '{text}', expected e.g. '1 month', '1 day' or '5 minutes'")
+    return int(match.group(1) or 1), match.group(2)
+
+
+class PartitionManager:
+    def __init__(
+        self,
+        schema_mgr,
+        key: str,
+        interval: str = "1 month",
+        premake: int = 2,
+        retain: Optional[int] = None,
+        retire: str = "drop",
+        default_partition: bool = True,
+    ):
+        """
+        key: partition key column, one of KEYS.
+        interval: partition width, e.g. '1 month' or '5 minutes'.
+        premake: partitions kept ready ahead of the current one.
+        retain: full intervals kept before the current one; None never retires.
+        retire: drop, detach (then drop) or detach_concurrently (then drop).
+        """
+        if key not in KEYS:
+            raise ValueError(f"Unknown partition key '{key}', expected one of {KEYS}")
+        if retire not in RETIRE_MODES:
+            raise ValueError(f"Unknown partition retire mode '{retire}', expected one of {RETIRE_MODES}")
+        if retain is not None and retain < 1:
+            # Queued batches and open transactions still carry rows for the previous interval
+            raise ValueError("Partition retain must be at least 1 interval")
+        if retire == "detach_concurrently" and default_partition:
+            raise ValueError("PostgreSQL can't DETACH CONCURRENTLY while a DEFAULT partition exists; add default=false")
+        self.schema_mgr = schema_mgr
+        self.key = key
+        self.count, self.unit = parse_interval(interval)
+        self.premake = premake
+        self.retain = retain
+        self.retire_mode = retire
+        self.default_partition = default_partition
+
+        if _KEY_HISTORY[key] and self.unit in ("minute", "hour"):
+            raise ValueError(f"{key} spans {_KEY_HISTORY[key].days} days; use a partition interval of a day or longer")
+        needed = self._intervals_back(self._floor(datetime.utcnow()))
+        if not default_partition and retain is not None and retain < needed:
+            raise ValueError(
+                f"{key} rows reach back {_KEY_HISTORY[key].days} days, past the {retain} intervals retain keeps; "
+                f"use retain={needed} or more, or default=true"
+            )
+
+        # Partition start -> name, for the range partitions this table has
+        self.partitions: Dict[datetime, str] = {}
+        self.history: List[dict] = []
+        self.retired_rows = 0
+        self._loaded = False
+        self._next_due: Optional[datetime] = None
+
+    def describe(self) -> str:
+        interval = f"{self.count} {self.unit}{'s' if self.count > 1 else ''}"
+        retain = f"retain {self.retain}" if self.retain is not None else "never retire"
+        return f"RANGE ({self.key}) every {interval}, {self.premake} ahead, {retain}, {self.retire_mode}"
+
+    # ────────── BOUNDARIES ────────── #
+
+    def _floor(self, ts: datetime) -> datetime:
+        if self.unit == "month":
+            months = ts.year * 12 + ts.month - 1
+            months -= months % self.count
+            return datetime(months // 12, months % 12 + 1, 1)
+        step = _FIXED_UNITS[self.unit] * self.count
+        return _EPOCH + ((ts - _EPOCH) // step) * step
+
+    def _shift(self, start: datetime, intervals: int) -> datetime:
+        if self.unit == "month":
+            months = start.year * 12 + start.month - 1 + intervals * self.count
+            return datetime(months // 12, months % 12 + 1, 1)
+        return start + _FIXED_UNITS[self.unit] * self.count * intervals
+
+    def _name(self, start: datetime) -> str:
+        return f"{self.schema_mgr.table_name}_p{start.strftime(_NAME_FORMATS[self.unit])}"
+
+    def _intervals_back(self, current: datetime) -> int:
+        """Intervals behind the current one that the key's generated range reaches into."""
+        oldest = datetime.utcnow() - _KEY_HISTORY[self.key]
+        past = 0
+        while self._shift(current, -past) > oldest:
+            past += 1
+        return past
+
+    def _initial_past(self, current: datetime) -> int:
+        """Intervals behind the current one to create up front, covering the key's generated range."""
+        past = self._intervals_back(current)
+        if self.retain is not None:
+            past = min(past, self.retain)
+        return past
+
+    # ────────── DDL ────────── #
+
+    @property
+    def table(self) -> sql.Composed:
+        return sql.SQL("{}.{}").format(sql.Identifier(self.schema_mgr.schema), sql.Identifier(self.schema_mgr.table_name))
+
+    def _partition(self, name: str) -> sql.Composed:
+        return sql.SQL("{}.{}").format(sql.Identifier(self.schema_mgr.schema), sql.Identifier(name))
+
+    def table_ddl(self, columns_ddl: str) -> sql.Composed:
+        """CREATE TABLE for the partitioned parent; the key joins id in the primary key."""
+        return sql.SQL("CREATE TABLE IF NOT EXISTS {} (\n{},\nPRIMARY KEY (id, {})\n) PARTITION BY RANGE ({});").format(
+            self.table, sql.SQL(columns_ddl), sql.Identifier(self.key), sql.Identifier(self.key),
+        )
+
+    def create_initial(self):
+        """Create the DEFAULT partition and the window around now, after the parent table."""
+        conn = self.schema_mgr.conn
+        if self.default_partition:
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} DEFAULT").format(
+                    self._partition(f"{self.schema_mgr.table_name}_default"), self.table,
+                ))
+            conn.commit()
+        self.load()
+        current = self._floor(datetime.utcnow())
+        for offset in range(-self._initial_past(current), self.premake + 1):
+            start = self._shift(current, offset)
+            if start not in self.partitions:
+                self._create(start)
+        self._next_due = self._shift(current, 1)
+        print(f"🧱 Partitioned {self.schema_mgr.schema}.{self.schema_mgr.table_name}: {self.describe()}, "
+              f"{len(self.partitions)} partitions" + (" plus DEFAULT" if self.default_partition else ""))
+
+    def load(self):
+        """Read the existing partitions from the catalog, e.g. when running against an existing table."""
+        with self.schema_mgr.conn.cursor() as cur:
+            cur.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", (self.table.as_string(cur),))
+            if cur.fetchone()[0] != "p":
+                raise ValueError(f"{self.table.as_string(cur)} is not a partitioned table; create it with partitioning set")
+            cur.execute(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass",
+                (self.table.as_string(cur),),
+            )
+            rows = cur.fetchall()
+        self.schema_mgr.conn.commit()
+        self.partitions = {}
+        for name, bound in rows:
+            match = _BOUNDS.search(bound)
+            if match:
+                self.partitions[datetime.fromisoformat(match.group(1))] = name
+        self._loaded = True
+
+    def sync_replica_identity(self):
+        """Give every partition REPLICA IDENTITY FULL, after it was set on the parent table."""
+        conn = self.schema_mgr.conn
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = %s::regclass AND c.relreplident <> 'f'",
+                (self.table.as_string(cur),),
+            )
+            for (name,) in cur.fetchall():
+                cur.execute(sql.SQL("ALTER TABLE {} REPLICA IDENTITY FULL").format(self._partition(name)))
+        conn.commit()
+
+    def _create(self, start: datetime) -> dict:
+        end = self._shift(start, 1)
+        name = self._partition(self._name(start))
+        started = time.perf_counter()
+        with self.schema_mgr.conn.cursor() as cur:
+            cur.execute(
+                sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(name, self.table),
+                (start, end),
+            )
+            # Partitions don't inherit REPLICA IDENTITY FULL, so copy it from the parent
+            cur.execute("SELECT relreplident FROM pg_class WHERE oid = %s::regclass", (self.table.as_string(cur),))
+            if cur.fetchone()[0] == "f":
+                cur.execute(sql.SQL("ALTER TABLE {} REPLICA IDENTITY FULL").format(name))
+        self.schema_mgr.conn.commit()
+        self.partitions[start] = self._name(start)
+        return self._log("create", start, time.perf_counter() - started, 0)
+
+    def _retire(self, start: datetime, mutator=None) -> Tuple[int, List[dict]]:
+        """Detach (per retire mode) and drop a partition; returns its row count and the logged steps."""
+        name = self.partitions[start]
+        partition = self._partition(name)
+        conn = self.schema_mgr.conn
+        live_index = getattr(mutator, "live_index", None)
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("SELECT count(*) FROM {}").format(partition))
+            rows = cur.fetchone()[0]
+            if live_index is not None and rows:
+                # Keep whole-table targeting away from rows that are about to vanish
+                cur.execute(sql.SQL("SELECT id::text FROM {}").format(partition))
+                live_index.remove_ids(row[0] for row in cur.fetchall())
+        conn.commit()
+
+        steps = []
+        if self.retire_mode != "drop":
+            concurrently = self.retire_mode == "detach_concurrently"
+            started = time.perf_counter()
+            # DETACH CONCURRENTLY runs its own two transactions, outside any block
+            conn.autocommit = concurrently
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}" + (" CONCURRENTLY" if concurrently else "")).format(
+                        self.table, partition,
+                    ))
+                conn.commit()
+            finally:
+                conn.autocommit = False
+            steps.append(self._log("detach", start, time.perf_counter() - started, rows))
+
+        started = time.perf_counter()
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("DROP TABLE {}").format(partition))
+        conn.commit()
+        # The rows are attributed to whichever step took the partition out of the table
+        steps.append(self._log("drop", start, time.perf_counter() - started, 0 if steps else rows))
+        del self.partitions[start]
+        self.retired_rows += rows
+        return rows, steps
+
+    def _log(self, operation: str, start: datetime, seconds: float, rows: int) -> dict:
+        registry.observe(f"partition_{operation}", seconds, rows, self.schema_mgr.table_name)
+        entry = {
+            "operation": operation,
+            "partition": self._name(start),
+            "range": f"[{start:%Y-%m-%d %H:%M}, {self._shift(start, 1):%Y-%m-%d %H:%M})",
+            "seconds": round(seconds, 4),
+            "rows": rows,
+        }
+        self.history.append(entry)
+        return entry
+
+    # ────────── MAINTENANCE ────────── #
+
+    def maintain(self, batch_no: int, mutator=None, log_prefix: str = "") -> int:
+        """
+        Create and retire partitions once the clock has crossed a boundary.
+        A mutator sharing the connection gets its open transaction committed
+        first. Returns the number of partitions created or retired.
+        """
+        now = datetime.utcnow()
+        if self._next_due is not None and now < self._next_due:
+            return 0
+        if not self._loaded:
+            self.load()
+        if mutator is not None:
+            mutator.flush()
+
+        current = self._floor(now)
+        done = 0
+        for offset in range(self.premake + 1):
+            start = self._shift(current, offset)
+            if start not in self.partitions:
+                entry = self._create(start)
+                print(f"🧱 [{log_prefix}Batch {batch_no}] Created partition {entry['partition']} {entry['range']} "
+                      f"in {entry['seconds'] * 1000:.1f} ms")
+                done += 1
+        if self.retain is not None:
+            cutoff = self._shift(current, -self.retain)
+            for start in sorted(s for s in self.partitions if self._shift(s, 1) <= cutoff):
+                rows, steps = self._retire(start, mutator)
+                cost = ", ".join(f"{e['operation']} {e['seconds'] * 1000:.1f} ms" for e in steps)
+                print(f"🪓 [{log_prefix}Batch {batch_no}] Retired partition {steps[0]['partition']} "
+                      f"({rows} rows gone without change events; {cost})")
+                done += 1
+        self._next_due = self._shift(current, 1)
+        return done
+
+    # ────────── REPORTING ────────── #
+
+    def row_counts(self) -> List[Tuple[str, int]]:
+        """(partition, live rows) for every partition, oldest first, DEFAULT last."""
+        conn = self.schema_mgr.conn
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("SELECT tableoid::regclass::text, count(*) FROM {} GROUP BY 1").format(self.table))
+            counts = {name.rpartition(".")[2].strip('"'): rows for name, rows in cur.fetchall()}
+        conn.commit()
+        ordered = [self.partitions[start] for start in sorted(self.partitions)]
+        if self.default_partition:
+            ordered.append(f"{self.schema_mgr.table_name}_default")
+        return [(name, counts.get(name, 0)) for name in ordered]
+
+    def summary(self) -> Dict[str, dict]:
+        """Count, mean and max milliseconds per operation."""
+        summary: Dict[str, dict] = {}
+        for entry in self.history:
+            stats = summary.setdefault(entry["operation"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["count"] += 1
+            stats["total_ms"] += entry["seconds"] * 1000
+            stats["max_ms"] = max(stats["max_ms"], entry["seconds"] * 1000)
+        return {
+            operation: {"count": s["count"], "avg_ms": round(s["total_ms"] / s["count"], 2), "max_ms": round(s["max_ms"], 2)}
+            for operation, s in summary.items()
+        }
+
+
+def print_partition_report(partitions: PartitionManager):
+    print(f"\nPartitions ({partitions.describe()}):")
+    counts = partitions.row_counts()
+    total = sum(rows for _, rows in counts) or 1
+    for name, rows in counts:
+        print(f" - {name}: {rows} rows ({rows / total:.1%})")
+    for operation, stats in partitions.summary().items():
+        print(f" - {operation}: {stats['count']} ops, avg {stats['avg_ms']} ms, max {stats['max_ms']} ms")
+    if partitions.retired_rows:
+        print(f" - Retired partitions took {partitions.retired_rows} rows with them, without change events")
+
+
+def parse_partitioning(spec: str, schema_mgr) -> PartitionManager:
+    """
+    Build a PartitionManager from a PARTITIONING string, e.g.
+
+        purchased_at
+        purchased_at:interval=1 month,retain=12
+        created_at:interval=1 minute,premake=2,retain=5,retire=detach_concurrently,default=false
+    """
+    key, _, raw_args = spec.partition(":")
+    args: Dict[str, str] = {}
+    for part in filter(None, raw_args.split(",")):
+        name, _, value = part.partition("=")
+        args[name.strip()] = value.strip()
+
+    return PartitionManager(
+        schema_mgr,
+        key.strip(),
+        interval=args.get("interval", "1 month"),
+        premake=int(args.get("premake", 2)),
+        retain=int(args["retain"]) if args.get("retain") else None,
+        retire=args.get("retire", "drop"),
+        default_partition=args.get("default", "true").lower() == "true",
+    )
@@ -0,0 +1,170 @@
+"""
+Large-value and wide-row columns for stressing WAL, TOAST and connector
+message sizes.
+
+Payload columns draw from pre-built values, not fresh objects per row:
+
+- bytea values are memoryview windows into one shared random buffer. A row
+  costs a view object, and the bytes are copied once, into the COPY or
+  VALUES buffer.
+- text, jsonb and int array values are picked from a small set of variants
+  built once per column. Every row references the same few objects.
+
+Either way, generating a 64 KiB value costs about the same as a 64 byte one.
+
+Payload bytes are random, so pglz barely compresses them. A value over
+the TOAST threshold (about 2 KiB) is stored out of line at close to full
+size and is written to the WAL in full, including REPLICA IDENTITY FULL
+before-images.
+
+Sizes come as a spec, e.g. PAYLOAD_COLUMNS=text:8192,jsonb:1024-65536,bytea:262144,int_array:500.
+A range gives values spread uniformly between the two sizes; int_array
+sizes count elements, the rest count bytes.
+"""
+import json
+import random
+from typing import Any, Callable, List, Optional, Tuple
+
+import vector_generators as vg
+from column_manager import ColumnDefinition
+
+PAYLOAD_TYPES = {
+    "text": "TEXT",
+    "jsonb": "JSONB",
+    "bytea": "BYTEA",
+    "int_array": "INTEGER[]",
+}
+
+# Distinct pre-built values per text/jsonb/int_array column
+DEFAULT_VARIANTS = 64
+
+_BUFFER_MIN = 16 * 1024 * 1024
+_LETTERS = b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 "
+_TO_TEXT = bytes(_LETTERS[i % len(_LETTERS)] for i in range(256))
+
+_buffer = bytearray()
+
+
+def shared_buffer(min_size: int) -> memoryview:
+    """The shared random buffer, grown to at least 2 * min_size (and 16 MiB)."""
+    global _buffer
+    wanted = max(_BUFFER_MIN, 2 * min_size)
+    if len(_buffer) < wanted:
+        # Drawn from `random`, so seeded runs build the same buffer
+        _buffer = bytearray(random.randbytes(wanted))
+    return memoryview(_buffer)
+
+
+def _window(size: int) -> memoryview:
+    buffer = shared_buffer(size)
+    offset = random.randrange(len(buffer) - size + 1)
+    return buffer[offset:offset + size]
+
+
+def _random_text(size: int) -> str:
+    return bytes(_window(size)).translate(_TO_TEXT).decode("ascii")
+
+
+def parse_size(spec: str) -> Tuple[int, int]:
+    low, _, high = spec.partition("-")
+    return int(low), int(high or low)
+
+
+def _sizes(size_range: Tuple[int, int], count: int) -> List[int]:
+    low, high = size_range
+    return [random.randint(low, high) for _ in range(count)]
+
+
+def _variant_generators(values: List[Any]) -> Tuple[Callable[[], Any], Callable[[int], List[Any]]]:
+    return (lambda: random.choice(values)), (lambda n: random.choices(values, k=n))
+
+
+def payload_generators(
+    kind: str, size_range: Tuple[int, int], variants: int = DEFAULT_VARIANTS
+) -> Tuple[Callable[[], Any], Callable[[int], List[Any]]]:
+    """(per-row generator, batch generator) for one payload column."""
+    if kind == "bytea":
+        low, high = size_range
+
+        def generate() -> memoryview:
+            return _window(random.randint(low, high))
+
+        return generate, lambda n: [generate() for _ in range(n)]
+
+    # Built on first use, so seeding and the shared buffer are in place by then
+    values: List[Any] = []
+
+    def build():
+        if kind == "text":
+            values.extend(_random_text(size) for size in _sizes(size_range, variants))
+        elif kind == "jsonb":
+            for seq, size in enumerate(_sizes(size_range, variants)):
+                body = _random_text(max(0, size - 64))
+                values.append(json.dumps({"seq": seq, "size": size, "tags": ["cdcraft", kind], "body": body}))
+        elif kind == "int_array":
+            values.extend(
+                [random.getrandbits(31) for _ in range(size)] for size in _sizes(size_range, variants)
+            )
+        else:
+            raise ValueError(f"Unknown payload kind '{kind}', expected one of {sorted(PAYLOAD_TYPES)}")
+
+    def generate() -> Any:
+        if not values:
+            build()
+        return random.choice(values)
+
+    def generate_column(n: int) -> List[Any]:
+        if not values:
+            build()
+        return random.choices(values, k=n)
+
+    return generate, generate_column
+
+
+def payload_columns(spec: str, variants: int = DEFAULT_VARIANTS) -> List[ColumnDefinition]:
+    """
+    Columns for a PAYLOAD_COLUMNS spec, named payload_<kind> (payload_<kind>_2, ...
+    when a kind repeats).
+    """
+    columns: List[ColumnDefinition] = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        kind, _, size = part.partition(":")
+        kind = kind.strip().lower()
+        if kind not in PAYLOAD_TYPES:
+            raise ValueError(f"Unknown payload kind '{kind}', expected one of {sorted(PAYLOAD_TYPES)}")
+        name = f"payload_{kind}"
+        taken = {col.name for col in columns}
+        suffix = 2
+        while name in taken:
+            name = f"payload_{kind}_{suffix}"
+            suffix += 1
+        generator, batch_generator = payload_generators(kind, parse_size(size or "4096"), variants)
+        columns.append(ColumnDefinition(name, PAYLOAD_TYPES[kind], generator, batch_generator=batch_generator))
+    return columns
+
+
+def wide_columns(count: int) -> List[ColumnDefinition]:
+    """`count` small nullable columns attr_001, attr_002, ... cycling through four cheap types."""
+    columns = []
+    for i in range(1, count + 1):
+        name = f"attr_{i:03d}"
+        kind = i % 4
+        if kind == 0:
+            col = ColumnDefinition(name, "INTEGER", lambda: random.randint(0, 1_000_000),
+                                   batch_generator=vg.random_ints(0, 1_000_000))
+        elif kind == 1:
+            col = ColumnDefinition(name, "FLOAT", lambda: round(random.uniform(0, 1000), 2),
+                                   batch_generator=vg.uniform_floats(0, 1000))
+        elif kind == 2:
+            col = ColumnDefinition(name, "TEXT", lambda: "".join(random.choices("ABCDEFGHIJ", k=8)),
+                                   batch_generator=vg.uppercase_strings(8))
+        else:
+            col = ColumnDefinition(name, "BOOLEAN", lambda: random.random() < 0.5,
+                                   batch_generator=vg.random_bools())
+        columns.append(col)
+    return columns
+
+
+def extra_columns(payload_spec: Optional[str] = None, wide: int = 0) -> List[ColumnDefinition]:
+    """Payload then wide columns; rebuilt the same way by every worker process."""
+    return (payload_columns(payload_spec) if payload_spec else []) + wide_columns(wide)
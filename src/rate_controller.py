@@ -0,0 +1,264 @@
+import asyncio
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class LoadProfile:
+    """
+    Target events/sec as a function of seconds since the run started.
+    """
+
+    def rate_at(self, elapsed: float) -> float:
+        raise NotImplementedError
+
+
+class ConstantProfile(LoadProfile):
+    def __init__(self, rate: float):
+        self.rate = rate
+
+    def rate_at(self, elapsed: float) -> float:
+        return self.rate
+
+
+class RampProfile(LoadProfile):
+    """Linear ramp from start_rate to end_rate over `duration` seconds, then hold."""
+
+    def __init__(self, start_rate: float, end_rate: float, duration: float):
+        self.start_rate = start_rate
+        self.end_rate = end_rate
+        self.duration = duration
+
+    def rate_at(self, elapsed: float) -> float:
+        if elapsed >= self.duration:
+            return self.end_rate
+        return self.start_rate + (self.end_rate - self.start_rate) * elapsed / self.duration
+
+
+class StepProfile(LoadProfile):
+    """Cycle through `rates`, holding each for `every` seconds."""
+
+    def __init__(self, rates: List[float], every: float):
+        if every <= 0:
+            raise ValueError(f"Step profile needs every > 0, got {every}")
+        self.rates = rates
+        self.every = every
+
+    def rate_at(self, elapsed: float) -> float:
+        return self.rates[int(elapsed // self.every) % len(self.rates)]
+
+
+class SineProfile(LoadProfile):
+    """Diurnal-style wave: base_rate * (1 + amplitude * sin(2*pi*t / period))."""
+
+    def __init__(self, base_rate: float, amplitude: float, period: float):
+        if period <= 0:
+            raise ValueError(f"Sine profile needs period > 0, got {period}")
+        self.base_rate = base_rate
+        self.amplitude = amplitude
+        self.period = period
+
+    def rate_at(self, elapsed: float) -> float:
+        return self.base_rate * (1 + self.amplitude * math.sin(2 * math.pi * elapsed / self.period))
+
+
+class SpikeProfile(LoadProfile):
+    """base_rate, jumping to base_rate * multiplier for `duration` seconds every `every` seconds."""
+
+    def __init__(self, base_rate: float, multiplier: float, every: float, duration: float):
+        if every <= 0:
+            raise ValueError(f"Spike profile needs every > 0, got {every}")
+        if not 0 <= duration <= every:
+            raise ValueError(f"Spike profile needs 0 <= duration <= every, got duration={duration}, every={every}")
+        self.base_rate = base_rate
+        self.multiplier = multiplier
+        self.every = every
+        self.duration = duration
+
+    def rate_at(self, elapsed: float) -> float:
+        if elapsed % self.every < self.duration:
+            return self.base_rate * self.multiplier
+        return self.base_rate
+
+
+def parse_profile(spec: str, base_rate: float) -> LoadProfile:
+    """
+    Build a profile from a LOAD_PROFILE string, e.g.
+
+        constant
+        ramp:start=100,end=5000,duration=600
+        step:rates=1000/5000/2000,every=60
+        sine:amplitude=0.5,period=600
+        spike:multiplier=10,every=300,duration=15
+
+    Rates not given explicitly default to `base_rate`.
+    """
+    kind, _, raw_args = spec.partition(":")
+    args: Dict[str, str] = {}
+    for part in filter(None, raw_args.split(",")):
+        key, _, value = part.partition("=")
+        args[key.strip()] = value.strip()
+
+    kind = kind.strip().lower()
+    if kind == "constant":
+        return ConstantProfile(float(args.get("rate", base_rate)))
+    if kind == "ramp":
+        return RampProfile(
+            float(args.get("start", 0)),
+            float(args.get("end", base_rate)),
+            float(args.get("duration", 300)),
+        )
+    if kind == "step":
+        rates = [float(r) for r in args.get("rates", str(base_rate)).split("/")]
+        return StepProfile(rates, float(args.get("every", 60)))
+    if kind == "sine":
+        return SineProfile(
+            float(args.get("rate", base_rate)),
+            float(args.get("amplitude", 0.5)),
+            float(args.get("period", 600)),
+        )
+    if kind == "spike":
+        return SpikeProfile(
+            float(args.get("rate", base_rate)),
+            float(args.get("multiplier", 5)),
+            float(args.get("every", 300)),
+            float(args.get("duration", 10)),
+        )
+    raise ValueError(f"Unknown load profile '{kind}'")
+
+
+def scale_profile(profile: LoadProfile, factor: float) -> LoadProfile:
+    """Scale a profile's rate, e.g. to split a global target across workers."""
+    return _ScaledProfile(profile, factor)
+
+
+class _ScaledProfile(LoadProfile):
+    def __init__(self, inner: LoadProfile, factor: float):
+        self.inner = inner
+        self.factor = factor
+
+    def rate_at(self, elapsed: float) -> float:
+        return self.inner.rate_at(elapsed) * self.factor
+
+
+class RateController:
+    """
+    Token bucket that paces the simulator to a LoadProfile.
+
+    The loop calls throttle() once per batch with the number of change
+    events it just produced. Tokens are refilled at the profile's current
+    rate; when the balance goes negative the caller sleeps off the deficit
+    in one go, so pacing costs one sleep per batch rather than per event.
+    Deficits shorter than `min_sleep` are carried over instead of slept.
+    """
+
+    def __init__(self, profile: LoadProfile, burst_seconds: float = 1.0,
+                 min_sleep: float = 0.005, max_sleep: float = 0.25,
+                 window_seconds: float = 10.0):
+        self.profile = profile
+        self.burst_seconds = burst_seconds
+        self.min_sleep = min_sleep
+        self.max_sleep = max_sleep
+        self.window_seconds = window_seconds
+
+        self.started_at: Optional[float] = None
+        self.last_refill = 0.0
+        self.tokens = 0.0
+        self.total_events = 0
+        self.target_events = 0.0
+        self.total_sleep = 0.0
+
+        # (elapsed, target eps, achieved eps) per completed window
+        self.windows: List[Tuple[float, float, float]] = []
+        self._window_start = 0.0
+        self._window_events = 0
+        self._window_target = 0.0
+
+    def start(self):
+        now = time.perf_counter()
+        self.started_at = now
+        self.last_refill = now
+        self._window_start = now
+
+    def _refill(self, now: float):
+        elapsed = now - self.started_at
+        rate = max(self.profile.rate_at(elapsed), 0.0)
+        earned = rate * (now - self.last_refill)
+        self.last_refill = now
+        self.target_events += earned
+        self._window_target += earned
+        self.tokens = min(self.tokens + earned, rate * self.burst_seconds)
+        return rate
+
+    def throttle(self, events: int):
+        rate = self._charge(events)
+        delay = self._next_delay(rate)
+        while delay is not None:
+            time.sleep(delay)
+            self.total_sleep += delay
+            delay = self._next_delay(self._refill(time.perf_counter()))
+        self._roll_window(time.perf_counter())
+
+    async def athrottle(self, events: int):
+        """throttle() for asyncio callers: yields to the event loop instead of blocking it."""
+        rate = self._charge(events)
+        delay = self._next_delay(rate)
+        while delay is not None:
+            await asyncio.sleep(delay)
+            self.total_sleep += delay
+            delay = self._next_delay(self._refill(time.perf_counter()))
+        self._roll_window(time.perf_counter())
+
+    def _charge(self, events: int) -> float:
+        if self.started_at is None:
+            self.start()
+        rate = self._refill(time.perf_counter())
+        self.tokens -= events
+        self.total_events += events
+        self._window_events += events
+        return rate
+
+    def _next_delay(self, rate: float) -> Optional[float]:
+        if self.tokens >= 0:
+            return None
+        # Sleep in bounded slices so a changing profile (e.g. the start of
+        # a ramp, where the rate is near zero) is re-read as it moves
+        delay = -self.tokens / rate if rate > 0 else self.max_sleep
+        if delay < self.min_sleep:
+            return None
+        return min(delay, self.max_sleep)
+
+    def _roll_window(self, now: float):
+        span = now - self._window_start
+        if span < self.window_seconds:
+            return
+        self.windows.append((
+            now - self.started_at,
+            self._window_target / span,
+            self._window_events / span,
+        ))
+        self._window_start = now
+        self._window_events = 0
+        self._window_target = 0.0
+
+    def report(self) -> Dict[str, float]:
+        if self.started_at is None:
+            return {"elapsed_s": 0.0, "events": 0, "achieved_eps": 0.0, "target_eps": 0.0, "ratio": 0.0, "sleep_s": 0.0}
+        elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+        achieved = self.total_events / elapsed
+        target = self.target_events / elapsed
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "events": self.total_events,
+            "achieved_eps": round(achieved, 1),
+            "target_eps": round(target, 1),
+            "ratio": round(achieved / target, 3) if target else 0.0,
+            "sleep_s": round(self.total_sleep, 2),
+        }
+
+    def summary_line(self) -> str:
+        report = self.report()
+        return (
+            f"🎯 Rate: {report['achieved_eps']} ev/s achieved vs {report['target_eps']} ev/s target "
+            f"({report['ratio']:.0%}) over {report['elapsed_s']}s"
+        )
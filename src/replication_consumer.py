@@ -0,0 +1,331 @@
+"""
+Built-in logical replication consumer for measuring commit-to-capture
+latency without a Kafka/Debezium stack.
+
+PgOutputConsumer streams a pgoutput slot over psycopg2's
+LogicalReplicationConnection on a background thread and decodes the
+protocol messages it needs:
+
+- Relation, to map relation ids to the simulator's table;
+- Begin and Commit, for commit timestamps and LSNs;
+- Insert, Update, Delete and Truncate headers, to count events per table.
+
+Row tuples are not decoded, so decoding keeps up with the writers.
+
+- Latency is capture time minus the commit timestamp the server put in the
+  Commit message. It is recorded per transaction as the "capture" phase in
+  the metrics registry. The server and the simulator need synced clocks.
+- Slot lag (WAL bytes not yet confirmed, and WAL held back by the slot) is
+  sampled from pg_replication_slots into the slot_lag_bytes and
+  slot_retained_bytes gauges.
+- The flush LSN is acknowledged in batches, every `ack_interval` seconds,
+  rather than after each message.
+
+By default the consumer creates a TEMPORARY slot, so it never competes
+with a Debezium connector for the setup slot and releases its WAL when
+it disconnects. A missing publication is created for the table and
+dropped again on stop().
+"""
+import select
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import LogicalReplicationConnection
+
+from metrics import registry
+
+# pgoutput timestamps are microseconds since 2000-01-01 UTC
+_PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc).timestamp()
+
+_BEGIN = struct.Struct("!QqI")  # final LSN, commit timestamp, xid
+_COMMIT = struct.Struct("!BQQq")  # flags, commit LSN, end LSN, commit timestamp
+_RELID = struct.Struct("!I")
+
+_CHANGE_OPS = {ord("I"): "inserts", ord("U"): "updates", ord("D"): "deletes"}
+
+
+def lsn_to_int(lsn: str) -> int:
+    high, _, low = lsn.partition("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+def _read_cstring(payload: bytes, offset: int):
+    end = payload.index(b"\0", offset)
+    return payload[offset:end].decode(), end + 1
+
+
+class PgOutputConsumer:
+    def __init__(
+        self,
+        conn_params: dict,
+        schema: str,
+        table: str,
+        publication: str,
+        slot: Optional[str] = None,
+        ack_interval: float = 1.0,
+        lag_interval: float = 5.0,
+    ):
+        """
+        slot: an existing pgoutput slot to consume; None creates a temporary one.
+        ack_interval: seconds between flush-LSN acknowledgements.
+        lag_interval: seconds between slot lag samples.
+        """
+        self.conn_params = conn_params
+        self.schema = schema
+        self.table = table
+        self.publication = publication
+        self.slot = slot or f"cdcraft_consumer_{int(time.time())}"
+        self.temporary = slot is None
+        self.ack_interval = ack_interval
+        self.lag_interval = lag_interval
+
+        self.counts: Dict[str, int] = {"inserts": 0, "updates": 0, "deletes": 0, "truncates": 0, "transactions": 0}
+        self.other_tables = 0
+        self.acks = 0
+        self.max_slot_lag = 0
+        self.last_slot_lag = 0
+        self.max_apply_lag = 0.0
+
+        self._relations: Dict[int, tuple] = {}
+        self._txn_commit_ts: Optional[float] = None
+        self._txn_rows = 0
+        self._flushed_lsn = 0
+        self._pending_lsn = 0
+        self._stop = threading.Event()
+        self._drain_target: Optional[int] = None
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        self._created_publication = False
+        self._started_at = 0.0
+        self._finished_at = 0.0
+
+    # ────────── LIFECYCLE ────────── #
+
+    def start(self) -> "PgOutputConsumer":
+        """Set up publication and slot, then stream on a daemon thread until stop()."""
+        self._ensure_publication()
+        self._thread = threading.Thread(target=self._run, name="cdcraft-replication", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=30)
+        if self._error is not None:
+            raise RuntimeError("Replication consumer failed to start") from self._error
+        return self
+
+    def stop(self, drain_timeout: float = 30.0):
+        """
+        Keep consuming until everything committed so far has been captured
+        (or drain_timeout passes), then disconnect.
+        """
+        if self._thread is None:
+            return
+        with psycopg2.connect(**self.conn_params) as conn, conn.cursor() as cur:
+            cur.execute("SELECT pg_current_wal_lsn()::text")
+            self._drain_target = lsn_to_int(cur.fetchone()[0])
+        self._thread.join(timeout=drain_timeout)
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if self._created_publication:
+            with psycopg2.connect(**self.conn_params) as conn, conn.cursor() as cur:
+                cur.execute(sql.SQL("DROP PUBLICATION IF EXISTS {}").format(sql.Identifier(self.publication)))
+        if self._error is not None:
+            raise RuntimeError("Replication consumer failed") from self._error
+
+    def _ensure_publication(self):
+        with psycopg2.connect(**self.conn_params) as conn, conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM pg_publication WHERE pubname = %s", (self.publication,))
+            if cur.fetchone() is None:
+                cur.execute(
+                    "SELECT relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+                    "WHERE n.nspname = %s AND c.relname = %s",
+                    (self.schema, self.table),
+                )
+                row = cur.fetchone()
+                # Changes to a partitioned table's partitions arrive under the table's own name
+                options = " WITH (publish_via_partition_root = true)" if row and row[0] == "p" else ""
+                cur.execute(sql.SQL("CREATE PUBLICATION {} FOR TABLE {}.{}" + options).format(
+                    sql.Identifier(self.publication), sql.Identifier(self.schema), sql.Identifier(self.table)
+                ))
+                self._created_publication = True
+
+    # ────────── STREAMING ────────── #
+
+    def _run(self):
+        conn = lag_conn = None
+        try:
+            conn = psycopg2.connect(connection_factory=LogicalReplicationConnection, **self.conn_params)
+            lag_conn = psycopg2.connect(**self.conn_params)
+            lag_conn.autocommit = True
+            cur = conn.cursor()
+            if self.temporary:
+                cur.execute(f"CREATE_REPLICATION_SLOT {self.slot} TEMPORARY LOGICAL pgoutput")
+            cur.start_replication(
+                slot_name=self.slot,
+                decode=False,
+                options={"proto_version": "1", "publication_names": self.publication},
+            )
+            self._started_at = time.perf_counter()
+            self._ready.set()
+
+            next_ack = time.monotonic() + self.ack_interval
+            next_lag = time.monotonic()
+            while not self._stop.is_set():
+                msg = cur.read_message()
+                if msg is not None:
+                    self._handle(msg.payload)
+                    if time.monotonic() < next_ack:
+                        continue
+
+                now = time.monotonic()
+                if now >= next_ack:
+                    self._acknowledge(cur)
+                    next_ack = now + self.ack_interval
+                if now >= next_lag:
+                    self._sample_lag(lag_conn)
+                    next_lag = now + self.lag_interval
+                if self._drained(cur):
+                    break
+                if msg is None:
+                    select.select([cur], [], [], min(self.ack_interval, 0.5))
+
+            self._acknowledge(cur)
+            self._sample_lag(lag_conn)
+        except BaseException as exc:
+            self._error = exc
+            self._ready.set()
+        finally:
+            self._finished_at = time.perf_counter()
+            for c in (conn, lag_conn):
+                if c is not None:
+                    c.close()
+
+    def _drained(self, cur) -> bool:
+        if self._drain_target is None or self._txn_commit_ts is not None:
+            return False
+        # wal_end follows the server's keepalives; ask for one so an idle stream still moves
+        if max(cur.wal_end, self._pending_lsn) >= self._drain_target:
+            return True
+        cur.send_feedback(reply=True, force=True)
+        return False
+
+    def _handle(self, payload: bytes):
+        kind = payload[0]
+        op = _CHANGE_OPS.get(kind)
+        if op is not None:
+            if self._relations.get(_RELID.unpack_from(payload, 1)[0]) == (self.schema, self.table):
+                self.counts[op] += 1
+                self._txn_rows += 1
+            else:
+                self.other_tables += 1
+        elif kind == ord("B"):
+            _, commit_ts, _ = _BEGIN.unpack_from(payload, 1)
+            self._txn_commit_ts = _PG_EPOCH + commit_ts / 1_000_000
+            self._txn_rows = 0
+        elif kind == ord("C"):
+            _, _, end_lsn, commit_ts = _COMMIT.unpack_from(payload, 1)
+            if self._txn_rows:
+                latency = time.time() - (_PG_EPOCH + commit_ts / 1_000_000)
+                self.counts["transactions"] += 1
+                self.max_apply_lag = max(self.max_apply_lag, latency)
+                registry.observe("capture", max(latency, 0.0), self._txn_rows, self.table)
+            self._txn_commit_ts = None
+            self._pending_lsn = max(self._pending_lsn, end_lsn)
+        elif kind == ord("R"):
+            relid = _RELID.unpack_from(payload, 1)[0]
+            namespace, offset = _read_cstring(payload, 5)
+            name, _ = _read_cstring(payload, offset)
+            self._relations[relid] = (namespace, name)
+        elif kind == ord("T"):
+            # Truncate: relation count, option flags, then the relation ids
+            count = _RELID.unpack_from(payload, 1)[0]
+            relids = struct.unpack_from(f"!{count}I", payload, 6)
+            self.counts["truncates"] += sum(1 for r in relids if self._relations.get(r) == (self.schema, self.table))
+
+    def _acknowledge(self, cur):
+        if self._pending_lsn > self._flushed_lsn:
+            cur.send_feedback(flush_lsn=self._pending_lsn, force=True)
+            self._flushed_lsn = self._pending_lsn
+            self.acks += 1
+
+    def _sample_lag(self, conn):
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), confirmed_flush_lsn)::bigint, "
+                "pg_wal_lsn_diff(pg_current_wal_lsn(), restart_lsn)::bigint "
+                "FROM pg_replication_slots WHERE slot_name = %s",
+                (self.slot,),
+            )
+            row = cur.fetchone()
+        if row is None or row[0] is None:
+            return
+        lag, retained = row
+        self.last_slot_lag = lag
+        self.max_slot_lag = max(self.max_slot_lag, lag)
+        registry.set_gauge("slot_lag_bytes", lag, self.table)
+        registry.set_gauge("slot_retained_bytes", retained, self.table)
+
+    # ────────── REPORTING ────────── #
+
+    def report(self, written: Optional[Dict[str, int]] = None, backfilled: int = 0) -> dict:
+        """
+        Captured events and latency. With `written` (MutationEngine.get_counters()
+        deltas since start()), also how they compare to what the simulator committed.
+        `backfilled` rows updated by online-migration backfills in the same span
+        are expected as captured updates on top of the written ones.
+        """
+        capture = next(
+            (entry for entry in registry.phase_summary() if entry["phase"] == "capture" and entry["table"] == self.table),
+            None,
+        )
+        elapsed = (self._finished_at or time.perf_counter()) - self._started_at
+        events = self.counts["inserts"] + self.counts["updates"] + self.counts["deletes"]
+        report = {
+            "slot": self.slot,
+            "captured": dict(self.counts),
+            "events_per_sec": round(events / elapsed, 1) if elapsed > 0 else 0.0,
+            "other_table_events": self.other_tables,
+            "latency_ms": {key: capture[key] for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")} if capture else {},
+            "slot_lag_bytes": {"last": self.last_slot_lag, "max": self.max_slot_lag},
+            "flush_acks": self.acks,
+        }
+        if written is not None:
+            expected = {op: written[f"total_{op}"] for op in ("inserts", "updates", "deletes")}
+            expected["updates"] += backfilled
+            report["backfilled_updates"] = backfilled
+            report["missing"] = {op: count - self.counts[op] for op, count in expected.items()}
+        return report
+
+
+def print_consumer_report(report: dict):
+    captured = report["captured"]
+    print(f"\n🛰️  Replication consumer ({report['slot']}):")
+    print(
+        f" - Captured {captured['inserts']} inserts, {captured['updates']} updates, {captured['deletes']} deletes "
+        f"in {captured['transactions']} transactions ({report['events_per_sec']} ev/s)"
+    )
+    latency = report["latency_ms"]
+    if latency:
+        print(
+            f" - Commit-to-capture latency: p50 {latency['p50_ms']} ms, p95 {latency['p95_ms']} ms, "
+            f"p99 {latency['p99_ms']} ms, max {latency['max_ms']} ms"
+        )
+    lag = report["slot_lag_bytes"]
+    print(f" - Slot lag: {lag['last']} bytes at last sample, {lag['max']} bytes max; {report['flush_acks']} flush acks")
+    missing = report.get("missing")
+    if missing:
+        if report.get("backfilled_updates"):
+            print(f" - Expected {report['backfilled_updates']} updates from online-migration backfills")
+        gaps = {op: count for op, count in missing.items() if count > 0}
+        extra = {op: -count for op, count in missing.items() if count < 0}
+        if gaps:
+            print(" - Written but not captured: " + ", ".join(f"{op} {count}" for op, count in gaps.items()))
+        if extra:
+            print(" - Captured but not written: " + ", ".join(f"{op} {count}" for op, count in extra.items()))
+        if not gaps and not extra:
+            print(" - Every committed change was captured ✅")
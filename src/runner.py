@@ -1,3 +1,6 @@
+import queue
+import threading
+import time
 import psycopg2
 from psycopg2 import sql
 from batch_generator import BatchGenerator
@@ -11,8 +14,15 @@ def run_initial_setup(
     replica_identity,
     publication_name,
     replication_slot,
-    conn
+    conn,
+    snapshot_options=None,
 ) -> dict:
+    """
+    Walk through table creation, the snapshot load, publication and slot.
+    With snapshot_options (SnapshotLoader keyword arguments), the snapshot
+    of `snapshot_batch_size` rows is a parallel, resumable COPY load
+    instead of a single batch through the mutator.
+    """
     print("\n🛠️  Starting Interactive Setup...\n")
 
     original_schema = {}
@@ -36,20 +46,45 @@ def run_initial_setup(
                     sql.Identifier(schema_mgr.table_name)
                 ))
                 conn.commit()
+            if schema_mgr.partitions is not None:
+                # Partitions don't inherit it; new ones copy it from the table
+                schema_mgr.partitions.sync_replica_identity()
             print("✅ Replica identity set to FULL.")
 
     if prompt_yes_no(f"📦 Perform snapshot load (initial {snapshot_batch_size} rows)?"):
-        generator = BatchGenerator(schema_mgr.get_active_column_definitions())
-        rows = generator.generate_batch(snapshot_batch_size)
-        mutator.insert_batch(rows)
-        print(f"✅ Inserted {snapshot_batch_size} rows for snapshotting.")
+        if snapshot_options is not None:
+            from snapshot_loader import SnapshotLoader, print_snapshot_report
+
+            loader = SnapshotLoader(
+                schema=schema_mgr.schema,
+                table=schema_mgr.table_name,
+                column_types=schema_mgr.get_active_column_definitions(),
+                total_rows=snapshot_batch_size,
+                **snapshot_options,
+            )
+            print_snapshot_report(loader.run())
+            if mutator.live_index is not None:
+                # Let whole-table targeting reach the snapshot rows
+                mutator.live_index.load(conn, schema_mgr.schema, schema_mgr.table_name)
+        else:
+            generator = BatchGenerator(
+                schema_mgr.get_active_column_definitions(), schema_mgr.get_column_definitions(),
+                table_name=schema_mgr.table_name,
+            )
+            mutator.update_schema(schema_mgr.get_active_column_definitions())
+            rows = generator.generate_batch(snapshot_batch_size)
+            mutator.insert_batch(rows)
+            mutator.flush()
+            print(f"✅ Inserted {snapshot_batch_size} rows for snapshotting.")
 
     if prompt_yes_no(f"📣 Create publication '{publication_name}' for table '{schema_mgr.schema}.{schema_mgr.table_name}'?"):
         with conn.cursor() as cur:
-            cur.execute(sql.SQL("CREATE PUBLICATION {} FOR TABLE {}.{};").format(
+            cur.execute(sql.SQL("CREATE PUBLICATION {} FOR TABLE {}.{}{};").format(
                 sql.Identifier(publication_name),
                 sql.Identifier(schema_mgr.schema),
-                sql.Identifier(schema_mgr.table_name)
+                sql.Identifier(schema_mgr.table_name),
+                # Publish partition changes under the table's own name
+                sql.SQL(" WITH (publish_via_partition_root = true)" if schema_mgr.partitions is not None else "")
             ))
             conn.commit()
         print(f"✅ Publication '{publication_name}' created.")
@@ -74,31 +109,131 @@ def run_initial_setup(
     return original_schema
 
 
-def run_cdc_simulation(schema_mgr, mutator, schema_evolver, total_records, batch_size, enable_evolution=True):
-    generator = BatchGenerator(schema_mgr.get_active_column_definitions())
-    total_batches = total_records // batch_size
-
-    print(f"\n🚀 Starting CDC Simulation: {total_records} records in {total_batches} batches\n")
-
-    for batch_no in range(1, total_batches + 1):
-        batch = generator.generate_batch(batch_size)
-        inserted_ids = mutator.insert_batch(batch)
-        mutator.maybe_mutate_batch(generator, inserted_ids)
-
-        if enable_evolution and schema_evolver.should_evolve(batch_no):
-            action = schema_evolver.choose_action()
-            if action == "add":
-                added = schema_mgr.add_random_column()
-                if added:
-                    schema_evolver.record_action("add")
-                    print(f"📦 [Batch {batch_no}] Added column '{added}'")
-                    generator.update_schema(schema_mgr.get_active_column_definitions())
-            elif action == "drop":
-                dropped = schema_mgr.drop_random_column()
-                if dropped:
-                    schema_evolver.record_action("drop")
-                    print(f"🗑️ [Batch {batch_no}] Dropped column '{dropped}'")
-                    generator.update_schema(schema_mgr.get_active_column_definitions())
+def evolve_schema(schema_mgr, schema_evolver, batch_no, log_prefix="", mutator=None) -> bool:
+    """
+    Let the evolution controller decide whether to add or drop a column (or
+    start an online migration) at this batch, and move a running migration
+    one step further. Returns True when the table shape changed. When a
+    mutator sharing the connection is given, its open transaction is
+    committed before any DDL or backfill runs.
+    """
+    migrator = schema_mgr.migrator
+    changed = False
+    if migrator.active is not None:
+        if mutator is not None:
+            mutator.flush()
+        migration = migrator.advance()
+        changed = migration.reshaped
+        if migration.done:
+            print(
+                f"🔧 [{log_prefix}Batch {batch_no}] Finished {migration.describe()} "
+                f"({migration.backfilled} rows backfilled, {migration.elapsed:.2f}s)"
+            )
+
+    if not schema_evolver.should_evolve(batch_no):
+        return changed
+
+    if mutator is not None:
+        mutator.flush()
+
+    action = schema_evolver.choose_action()
+    if action in schema_evolver.migrations:
+        migration = migrator.start(action)
+        if migration is None:
+            return changed
+        schema_evolver.record_action(action)
+        state = "done" if migration.done else ("abandoned" if migration.position == 0 else "started")
+        print(
+            f"🔧 [{log_prefix}Batch {batch_no}] {migration.describe()} via {migration.strategy}: {state}"
+            + (f" after {migration.lock_failures} lock timeouts" if migration.lock_failures else "")
+        )
+        return changed or migration.reshaped
+    if action == "add":
+        added = schema_mgr.add_random_column()
+        if added:
+            schema_evolver.record_action("add")
+            print(f"📦 [{log_prefix}Batch {batch_no}] Added column '{added}'")
+            return True
+    elif action == "drop":
+        dropped = schema_mgr.drop_random_column()
+        if dropped:
+            schema_evolver.record_action("drop")
+            print(f"🗑️ [{log_prefix}Batch {batch_no}] Dropped column '{dropped}'")
+            return True
+    return changed
+
+
+def _planned_records(total_records, batch_size, batch_tuner) -> int:
+    # Fixed-size runs write whole batches only; a tuned run writes total_records
+    return total_records if batch_tuner else (total_records // batch_size) * batch_size
+
+
+def _observe_batch(batch_tuner, rows, events, seconds):
+    decision = batch_tuner.observe(rows, events, seconds)
+    if decision is not None and decision["to"] != decision["from"]:
+        print(batch_tuner.describe(decision))
+
+
+def _head(batch, rows):
+    """The first `rows` rows of a row-wise or columnar batch."""
+    if isinstance(batch, dict):
+        return {column: values[:rows] for column, values in batch.items()}
+    return batch[:rows]
+
+
+def run_cdc_simulation(schema_mgr, mutator, schema_evolver, total_records, batch_size, enable_evolution=True, columnar=False,
+                       rate_controller=None, batch_tuner=None, checkpointer=None):
+    """
+    With a batch_tuner (see batch_tuner.BatchSizeTuner), each batch takes
+    the tuner's current size, and its write time (insert plus mutations,
+    without generation or pacing) is fed back to the tuner.
+
+    With a checkpointer (see checkpoint.Checkpointer), the run continues
+    from its position and offers it a checkpoint after every batch.
+    """
+    generator = BatchGenerator(
+        schema_mgr.get_active_column_definitions(), schema_mgr.get_column_definitions(),
+        table_name=schema_mgr.table_name,
+    )
+    # A resumed run may start with renamed columns
+    generator.update_schema(schema_mgr.get_active_column_definitions(), schema_mgr.get_column_aliases())
+    mutator.update_schema(schema_mgr.get_active_column_definitions())
+    planned = _planned_records(total_records, batch_size, batch_tuner)
+
+    if batch_tuner:
+        print(f"\n🚀 Starting CDC Simulation: {planned} records in batches tuned from {batch_tuner.size} rows\n")
+    else:
+        print(f"\n🚀 Starting CDC Simulation: {total_records} records in {planned // batch_size} batches\n")
+    if rate_controller:
+        rate_controller.start()
+
+    batch_no, written = checkpointer.position() if checkpointer else (0, 0)
+    if written:
+        print(f"⏯️  Continuing after batch {batch_no} with {written} records already written\n")
+    while written < planned:
+        batch_no += 1
+        size = min(batch_tuner.size if batch_tuner else batch_size, planned - written)
+        if columnar:
+            batch = generator.generate_columns(size)
+        else:
+            batch = generator.generate_batch(size)
+        started = time.perf_counter()
+        inserted_ids = mutator.insert_columns(batch) if columnar else mutator.insert_batch(batch)
+        updated, deleted = mutator.maybe_mutate_batch(generator, inserted_ids)
+        written += size
+
+        if batch_tuner:
+            _observe_batch(batch_tuner, size, len(inserted_ids) + updated + deleted, time.perf_counter() - started)
+        if rate_controller:
+            rate_controller.throttle(len(inserted_ids) + updated + deleted)
+
+        if enable_evolution and evolve_schema(schema_mgr, schema_evolver, batch_no, mutator=mutator):
+            generator.update_schema(schema_mgr.get_active_column_definitions(), schema_mgr.get_column_aliases())
+            mutator.update_schema(schema_mgr.get_active_column_definitions())
+            if batch_tuner:
+                batch_tuner.reset(f"schema changed at batch {batch_no}")
+        if schema_mgr.partitions is not None:
+            schema_mgr.partitions.maintain(batch_no, mutator=mutator)
 
         if batch_no == 1 and not enable_evolution:
             print("🔒 Schema evolution disabled. Only inserts, updates, and deletes will be simulated.")
@@ -108,4 +243,187 @@ def run_cdc_simulation(schema_mgr, mutator, schema_evolver, total_records, batch
             print(
                 f"[Batch {batch_no}] Inserts: {counts['total_inserts']}, "
                 f"Updates: {counts['total_updates']}, Deletes: {counts['total_deletes']}"
-            )
\ No newline at end of file
+                + (f", Rate: {rate_controller.report()['achieved_eps']} ev/s" if rate_controller else "")
+            )
+        if checkpointer:
+            checkpointer.after_batch(batch_no)
+
+    mutator.flush()
+    if checkpointer:
+        checkpointer.save(finished=True)
+    if rate_controller:
+        print(rate_controller.summary_line())
+    if batch_tuner:
+        print(batch_tuner.summary_line())
+    if checkpointer:
+        print(checkpointer.summary_line())
+
+
+def run_pipelined_cdc_simulation(
+    schema_mgr,
+    mutator,
+    schema_evolver,
+    total_records,
+    batch_size,
+    enable_evolution=True,
+    columnar=False,
+    queue_depth=4,
+    rate_controller=None,
+    batch_tuner=None,
+    checkpointer=None,
+):
+    """
+    Overlap generation and writing: a producer thread keeps up to
+    `queue_depth` batches ready while this thread inserts and mutates.
+    With a batch_tuner, the producer generates batches of the tuner's
+    current size; batches already queued at the old size are written but
+    not measured. With a checkpointer, the run continues from its position
+    and offers it a checkpoint after every batch.
+
+    Every queued batch is tagged with the schema version it was generated
+    under. After an add/drop the version is bumped, the producer switches to
+    the new column set, and the writer discards any batch still tagged with
+    the old version, so nothing generated for the old table shape is written.
+    """
+    planned = _planned_records(total_records, batch_size, batch_tuner)
+    batches: queue.Queue = queue.Queue(maxsize=queue_depth)
+    stop = threading.Event()
+    schema_lock = threading.Lock()
+    schema_state = {
+        "version": 0,
+        "columns": schema_mgr.get_active_column_definitions(),
+        "aliases": schema_mgr.get_column_aliases(),
+    }
+    stats = {"discarded": 0, "writer_wait": 0.0, "producer_wait": 0.0}
+
+    def produce():
+        try:
+            with schema_lock:
+                version, columns, aliases = schema_state["version"], schema_state["columns"], schema_state["aliases"]
+            generator = BatchGenerator(columns, schema_mgr.get_column_definitions(), table_name=schema_mgr.table_name)
+            generator.update_schema(columns, aliases)
+
+            while not stop.is_set():
+                with schema_lock:
+                    if schema_state["version"] != version:
+                        version, columns = schema_state["version"], schema_state["columns"]
+                        generator.update_schema(columns, schema_state["aliases"])
+
+                size = batch_tuner.size if batch_tuner else batch_size
+                if columnar:
+                    batch = generator.generate_columns(size)
+                else:
+                    batch = generator.generate_batch(size)
+
+                # Blocking put is the backpressure; wake up periodically to notice stop
+                started = time.perf_counter()
+                while not stop.is_set():
+                    try:
+                        batches.put((version, batch), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                stats["producer_wait"] += time.perf_counter() - started
+        except BaseException as exc:
+            batches.put((None, exc))
+
+    # The writer keeps its own generator for update values
+    generator = BatchGenerator(
+        schema_mgr.get_active_column_definitions(), schema_mgr.get_column_definitions(),
+        table_name=schema_mgr.table_name,
+    )
+    generator.update_schema(schema_state["columns"], schema_state["aliases"])
+    mutator.update_schema(schema_mgr.get_active_column_definitions())
+    producer = threading.Thread(target=produce, name="cdcraft-producer", daemon=True)
+
+    batches_desc = f"batches tuned from {batch_tuner.size} rows" if batch_tuner else f"{planned // batch_size} batches"
+    print(
+        f"\n🚀 Starting pipelined CDC Simulation: {planned} records in "
+        f"{batches_desc} (queue depth {queue_depth})\n"
+    )
+    if not enable_evolution:
+        print("🔒 Schema evolution disabled. Only inserts, updates, and deletes will be simulated.")
+
+    producer.start()
+    if rate_controller:
+        rate_controller.start()
+    try:
+        batch_no, written = checkpointer.position() if checkpointer else (0, 0)
+        if written:
+            print(f"⏯️  Continuing after batch {batch_no} with {written} records already written\n")
+        while written < planned:
+            started = time.perf_counter()
+            version, batch = batches.get()
+            stats["writer_wait"] += time.perf_counter() - started
+
+            if version is None:
+                raise RuntimeError("Batch producer failed") from batch
+            if version != schema_state["version"]:
+                stats["discarded"] += 1
+                continue
+
+            batch_no += 1
+            size = len(next(iter(batch.values()))) if columnar else len(batch)
+            if size > planned - written:
+                size = planned - written
+                batch = _head(batch, size)
+            started = time.perf_counter()
+            if columnar:
+                inserted_ids = mutator.insert_columns(batch)
+            else:
+                inserted_ids = mutator.insert_batch(batch)
+            updated, deleted = mutator.maybe_mutate_batch(generator, inserted_ids)
+            written += size
+
+            if batch_tuner:
+                _observe_batch(batch_tuner, size, len(inserted_ids) + updated + deleted, time.perf_counter() - started)
+            if rate_controller:
+                rate_controller.throttle(len(inserted_ids) + updated + deleted)
+
+            if enable_evolution and evolve_schema(schema_mgr, schema_evolver, batch_no, mutator=mutator):
+                columns = schema_mgr.get_active_column_definitions()
+                aliases = schema_mgr.get_column_aliases()
+                with schema_lock:
+                    schema_state["version"] += 1
+                    schema_state["columns"] = columns
+                    schema_state["aliases"] = aliases
+                generator.update_schema(columns, aliases)
+                mutator.update_schema(columns)
+                if batch_tuner:
+                    batch_tuner.reset(f"schema changed at batch {batch_no}")
+            if schema_mgr.partitions is not None:
+                schema_mgr.partitions.maintain(batch_no, mutator=mutator)
+
+            if batch_no % 10 == 0:
+                counts = mutator.get_counters()
+                print(
+                    f"[Batch {batch_no}] Inserts: {counts['total_inserts']}, "
+                    f"Updates: {counts['total_updates']}, Deletes: {counts['total_deletes']}"
+                    + (f", Rate: {rate_controller.report()['achieved_eps']} ev/s" if rate_controller else "")
+                )
+            if checkpointer:
+                checkpointer.after_batch(batch_no)
+        mutator.flush()
+        if checkpointer:
+            checkpointer.save(finished=True)
+    finally:
+        stop.set()
+        # Unblock a producer stuck on a full queue
+        try:
+            while True:
+                batches.get_nowait()
+        except queue.Empty:
+            pass
+        producer.join(timeout=5)
+
+    print(
+        f"\n🧵 Pipeline: writer waited {stats['writer_wait']:.2f}s for batches, "
+        f"producer waited {stats['producer_wait']:.2f}s on a full queue, "
+        f"{stats['discarded']} stale batches discarded after schema changes"
+    )
+    if rate_controller:
+        print(rate_controller.summary_line())
+    if batch_tuner:
+        print(batch_tuner.summary_line())
+    if checkpointer:
+        print(checkpointer.summary_line())
@@ -1,19 +1,41 @@
 import psycopg2
 from psycopg2 import sql
 import random
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional
 from column_manager import ColumnDefinition
 from column_pool import BASE_COLUMN_DEFINITIONS, COLUMN_POOL, PROTECTED_COLUMNS
+from metrics import registry
+from online_migrations import OPERATIONS, OnlineMigrator
+from partitions import parse_partitioning
 
 class SchemaManager:
-    def __init__(self, conn, schema="public", table_name="sales"):
+    def __init__(
+        self,
+        conn,
+        schema="public",
+        table_name="sales",
+        base_columns: Optional[List[ColumnDefinition]] = None,
+        column_pool: Optional[List[ColumnDefinition]] = None,
+        protected_columns: Optional[Iterable[str]] = None,
+        migration_strategy: str = "lock_timeout",
+        lock_timeout_ms: int = 2000,
+        lock_retries: int = 5,
+        backfill_rows: int = 5000,
+        partitioning: Optional[str] = None,
+    ):
         self.conn = conn
         self.schema = schema
         self.table_name = table_name
 
-        self.base_column_defs: List[ColumnDefinition] = BASE_COLUMN_DEFINITIONS
-        self.column_pool: List[ColumnDefinition] = COLUMN_POOL.copy()
+        self.base_column_defs: List[ColumnDefinition] = (
+            base_columns if base_columns is not None else BASE_COLUMN_DEFINITIONS
+        )
+        self.column_pool: List[ColumnDefinition] = list(
+            column_pool if column_pool is not None else COLUMN_POOL
+        )
         random.shuffle(self.column_pool) # Shuffle the column pool for randomness
+        self.known_column_defs: List[ColumnDefinition] = list(self.base_column_defs) + list(self.column_pool)
+        self.protected_columns = set(protected_columns if protected_columns is not None else PROTECTED_COLUMNS)
 
         # Active column definitions (dict of name: ColumnDefinition)
         self.active_columns: Dict[str, ColumnDefinition] = {
@@ -22,30 +44,53 @@ class SchemaManager:
 
         # History of schema changes
         self.schema_history: List[Dict[str, Optional[str]]] = []
+
+        # Renamed column -> name of the definition that generates its values
+        self.column_aliases: Dict[str, str] = {}
+
+        # Widen / rename / add-with-default / NOT NULL operations (see online_migrations)
+        self.migrator = OnlineMigrator(
+            self, strategy=migration_strategy, lock_timeout_ms=lock_timeout_ms,
+            lock_retries=lock_retries, backfill_rows=backfill_rows,
+        )
+
+        # Range partitioning and partition churn (see partitions.parse_partitioning)
+        self.partitions = parse_partitioning(partitioning, self) if partitioning else None
+        if self.partitions is not None:
+            # PostgreSQL can't drop, retype or rename its way around a partition key
+            self.protected_columns.add(self.partitions.key)
     
     def initialize_table(self):
         with self.conn.cursor() as cur:
             cur.execute('CREATE EXTENSION IF NOT EXISTS "uuid-ossp";')
-            columns_ddl = ",\n".join(
-                col.ddl() for col in self.base_column_defs
-            )
-            ddl = sql.SQL("CREATE TABLE IF NOT EXISTS {}.{} (\n{}\n);").format(
-                sql.Identifier(self.schema),
-                sql.Identifier(self.table_name),
-                sql.SQL(columns_ddl)
-            )
+            if self.partitions is not None:
+                # The primary key is declared for the table, as (id, partition key)
+                columns_ddl = ",\n".join(
+                    col.ddl().replace("PRIMARY KEY ", "") for col in self.base_column_defs
+                )
+                ddl = self.partitions.table_ddl(columns_ddl)
+            else:
+                columns_ddl = ",\n".join(
+                    col.ddl() for col in self.base_column_defs
+                )
+                ddl = sql.SQL("CREATE TABLE IF NOT EXISTS {}.{} (\n{}\n);").format(
+                    sql.Identifier(self.schema),
+                    sql.Identifier(self.table_name),
+                    sql.SQL(columns_ddl)
+                )
             cur.execute(ddl)
             self.conn.commit()
+        if self.partitions is not None:
+            self.partitions.create_initial()
     
     def get_current_columns(self) -> List[str]:
         return list(self.active_columns.keys())
     
     def add_random_column(self) -> Optional[str]:
-        if not self.column_pool:
+        col_def = self._take_pool_column()
+        if col_def is None:
             return None
 
-        col_def = self.column_pool.pop(0)
-
         alter_stmt = sql.SQL("ALTER TABLE {}.{} ADD COLUMN {} {} {}").format(
             sql.Identifier(self.schema),
             sql.Identifier(self.table_name),
@@ -54,45 +99,91 @@ class SchemaManager:
             sql.SQL(col_def.constraints or "")
         )
 
-        with self.conn.cursor() as cur:
+        with registry.timed("ddl", table=self.table_name), self.conn.cursor() as cur:
             cur.execute(alter_stmt)
             self.conn.commit()
 
-        self.active_columns[col_def.name] = col_def
-        self.schema_history.append({"action": "add", "column": col_def.name})
+        self._record_added(col_def)
         return col_def.name
     
     def drop_random_column(self) -> Optional[str]:
-        candidate_columns = [
-            name for name in self.active_columns
-            if name not in PROTECTED_COLUMNS 
-        ]
-        if not candidate_columns:
+        col_name = self._choose_drop_candidate()
+        if col_name is None:
             return None
 
-        random.shuffle(candidate_columns)
-        col_name = candidate_columns[0]
-
         alter_stmt = sql.SQL("ALTER TABLE {}.{} DROP COLUMN {}").format(
             sql.Identifier(self.schema),
             sql.Identifier(self.table_name),
             sql.Identifier(col_name),
         )
 
-        with self.conn.cursor() as cur:
+        with registry.timed("ddl", table=self.table_name), self.conn.cursor() as cur:
             cur.execute(alter_stmt)
             self.conn.commit()
 
-        self.active_columns.pop(col_name)
-        self.schema_history.append({"action": "drop", "column": col_name})
+        self._record_dropped(col_name)
         return col_name
+
+    # The helpers below hold the evolution bookkeeping so other engines
+    # (e.g. the asyncpg one) can reuse it around their own DDL execution.
+
+    def _take_pool_column(self) -> Optional[ColumnDefinition]:
+        if not self.column_pool:
+            return None
+        return self.column_pool.pop(0)
+
+    def _record_added(self, col_def: ColumnDefinition, detail: Optional[str] = None):
+        self.active_columns[col_def.name] = col_def
+        self._append_history("add", col_def.name, detail)
+
+    def _record_migrated(self, old_name: str, col_def: ColumnDefinition, action: str, detail: str):
+        """Swap in the definition an online migration left behind, keeping the column order."""
+        self.active_columns = {
+            (col_def.name if name == old_name else name): (col_def if name == old_name else existing)
+            for name, existing in self.active_columns.items()
+        }
+        if col_def.name != old_name:
+            self.column_aliases[col_def.name] = self.column_aliases.pop(old_name, old_name)
+        self._append_history(action, col_def.name, detail)
+
+    def _append_history(self, action: str, column: str, detail: Optional[str] = None):
+        entry = {"action": action, "column": column}
+        if detail:
+            entry["detail"] = detail
+        self.schema_history.append(entry)
+
+    def _choose_drop_candidate(self) -> Optional[str]:
+        candidate_columns = [
+            name for name in self.active_columns
+            if name not in self.protected_columns and name != self.migrator.busy_column
+        ]
+        if not candidate_columns:
+            return None
+
+        random.shuffle(candidate_columns)
+        return candidate_columns[0]
+
+    def _record_dropped(self, col_name: str):
+        self.active_columns.pop(col_name)
+        self.column_aliases.pop(col_name, None)
+        self._append_history("drop", col_name)
     
     def get_schema_history(self) -> List[Dict[str, str]]:
         return self.schema_history
 
+    def get_column_aliases(self) -> Dict[str, str]:
+        return dict(self.column_aliases)
+
     def get_active_column_definitions(self) -> Dict[str, str]:
         return {name: col_def.sql_type for name, col_def in self.active_columns.items()}
-    
+
+    def get_column_definitions(self) -> List[ColumnDefinition]:
+        """
+        Every definition this table can use (base columns plus the pool), for
+        building a BatchGenerator over a non-default column set.
+        """
+        return list(self.known_column_defs)
+
 
 class SchemaEvolutionController:
     def __init__(
@@ -101,23 +192,37 @@ class SchemaEvolutionController:
         evolution_probability: float = 0.2, # 20% chance of evolution
         add_probability: float = 0.7, # 70% chance of adding a column, 30% of dropping
         max_additions: int = 7,
-        max_drops: int = 3
+        max_drops: int = 3,
+        migration_probability: float = 0.0, # share of evolution steps that start an online migration
+        migrations: Iterable[str] = OPERATIONS
     ):
         self.evolution_interval = evolution_interval
         self.evolution_probability = evolution_probability
         self.add_probability = add_probability
         self.max_additions = max_additions
         self.max_drops = max_drops
+        self.migration_probability = migration_probability
+        self.migrations = list(migrations)
+        unknown = set(self.migrations) - set(OPERATIONS)
+        if unknown:
+            raise ValueError(f"Unknown migrations {sorted(unknown)}, expected some of {list(OPERATIONS)}")
 
         self.num_additions = 0
         self.num_drops = 0
+        self.num_migrations = 0
     
     def should_evolve(self, batch_number: int) -> bool:
         if batch_number % self.evolution_interval != 0:
             return False
         return random.random() < self.evolution_probability
     
-    def choose_action(self) -> str:
+    def choose_action(self, allow_migrations: bool = True) -> str:
+        if (
+            allow_migrations and self.migrations and self.migration_probability
+            and random.random() < self.migration_probability
+        ):
+            return random.choice(self.migrations)
+
         can_add = self.num_additions < self.max_additions
         can_drop = self.num_drops < self.max_drops
 
@@ -136,11 +241,16 @@ class SchemaEvolutionController:
             self.num_additions += 1
         elif action == "drop":
             self.num_drops += 1
+        elif action in OPERATIONS:
+            self.num_migrations += 1
     
     def summary(self):
-        return {
+        summary = {
             "total_adds": self.num_additions,
             "total_drops": self.num_drops,
             "max_adds": self.max_additions,
             "max_drops": self.max_drops
-        }
\ No newline at end of file
+        }
+        if self.migration_probability:
+            summary["total_migrations"] = self.num_migrations
+        return summary
\ No newline at end of file
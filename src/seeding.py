@@ -0,0 +1,33 @@
+"""
+Seeding for reproducible runs.
+
+A run is reproducible when every source of randomness is seeded: the
+global `random` module (mutation choices, evolution decisions, column
+order, UUIDs), the shared Faker instance and the NumPy generator behind
+the columnar generators. Seeded runs also refill value pools inline
+rather than on a background thread, so pooled values come out in the
+same order every run. Worker processes derive their own seed from the
+run seed and their worker id, so a parallel run replays identically for
+the same seed and worker count.
+"""
+import hashlib
+import random
+from typing import Optional
+
+import value_pool
+import vector_generators as vg
+from column_pool import fake
+
+
+def seed_all(seed: Optional[int]):
+    """Seed every generator; None re-seeds them from OS entropy."""
+    random.seed(seed)
+    fake.seed_instance(seed)
+    vg.seed(seed)
+    value_pool.background_refill = seed is None
+
+
+def derive_seed(seed: int, *labels) -> int:
+    """Stable per-component seed, e.g. derive_seed(run_seed, "worker", 3)."""
+    digest = hashlib.sha256(":".join(map(str, (seed, *labels))).encode()).digest()
+    return int.from_bytes(digest[:8], "big")
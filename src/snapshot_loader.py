@@ -0,0 +1,487 @@
+"""
+Parallel, resumable snapshot loads.
+
+The setup's snapshot step inserts one batch, but testing a Debezium initial
+snapshot needs the table prefilled with hundreds of millions of rows.
+SnapshotLoader splits `total_rows` into chunks of `chunk_rows`. Worker
+processes, each with its own connection and BatchGenerator, take chunks
+from a queue, then generate and COPY them (binary by default).
+
+Progress is checkpointed in the database. A chunk's COPY and its row in
+cdcraft_snapshot_chunks commit in one transaction, so a chunk is either
+loaded and recorded or neither. Running the same load again (same table,
+row count and chunk size) skips the chunks already recorded. With a seed,
+each chunk reseeds the generators from (seed, chunk), so a resumed chunk
+gets the ids and random values it would have had the first time (values
+drawn from pools depend on what the worker generated before).
+
+Two options speed up very large loads, at the cost of work at the end:
+
+- unlogged: the table is switched to UNLOGGED for the load, so COPY
+  writes no WAL, and back to LOGGED afterwards. That rewrite WAL-logs
+  the table in one go. Logical decoding sees none of it as changes,
+  which suits an initial snapshot. PostgreSQL refuses this for tables
+  that are already in a publication.
+- defer_indexes: the primary key and other indexes are dropped before the
+  load and rebuilt after it. An index backing REPLICA IDENTITY USING
+  INDEX is kept.
+
+Both are recorded with the load in cdcraft_snapshot_loads, so an
+interrupted load resumes with the table still switched, and the last run
+restores it once every chunk is in.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2 import sql
+
+from batch_generator import BatchGenerator
+from column_pool import BASE_COLUMN_DEFINITIONS, COLUMN_POOL
+from copy_encoder import binary_encoders_for, encode_binary_copy, encode_text_copy
+from metrics import registry
+from payloads import extra_columns
+from seeding import derive_seed, seed_all
+
+LOADS_TABLE = "cdcraft_snapshot_loads"
+CHUNKS_TABLE = "cdcraft_snapshot_chunks"
+COPY_MODES = ("copy_binary", "copy_text")
+
+# Rows generated and encoded per COPY statement within a chunk, to bound memory
+_COPY_ROWS = 20_000
+
+
+def _ensure_progress_tables(conn, schema: str):
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("""
+            CREATE TABLE IF NOT EXISTS {schema}.{loads} (
+                load_id TEXT PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                total_rows BIGINT NOT NULL,
+                chunk_rows INTEGER NOT NULL,
+                seed NUMERIC,
+                unlogged BOOLEAN NOT NULL,
+                restore_ddl TEXT[] NOT NULL,
+                started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                finished_at TIMESTAMPTZ
+            );
+            CREATE TABLE IF NOT EXISTS {schema}.{chunks} (
+                load_id TEXT NOT NULL REFERENCES {schema}.{loads} ON DELETE CASCADE,
+                chunk INTEGER NOT NULL,
+                rows INTEGER NOT NULL,
+                worker INTEGER NOT NULL,
+                seconds DOUBLE PRECISION NOT NULL,
+                loaded_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                PRIMARY KEY (load_id, chunk)
+            );
+        """).format(schema=sql.Identifier(schema), loads=sql.Identifier(LOADS_TABLE), chunks=sql.Identifier(CHUNKS_TABLE)))
+    conn.commit()
+
+
+def _deferrable_indexes(cur, table: sql.Composable, relid: int) -> Tuple[List[sql.Composable], List[str]]:
+    """DROP statements for the table's indexes and constraint indexes, and the DDL that restores them."""
+    drops, restores = [], []
+    cur.execute(
+        "SELECT c.conname, pg_get_constraintdef(c.oid) FROM pg_constraint c "
+        "JOIN pg_index i ON i.indexrelid = c.conindid "
+        "WHERE c.conrelid = %s AND c.contype IN ('p', 'u', 'x') AND NOT i.indisreplident",
+        (relid,),
+    )
+    for name, definition in cur.fetchall():
+        drops.append(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(table, sql.Identifier(name)))
+        restores.append(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} ").format(table, sql.Identifier(name)).as_string(cur) + definition)
+    cur.execute(
+        "SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid) FROM pg_index i "
+        "WHERE i.indrelid = %s AND NOT i.indisreplident "
+        "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)",
+        (relid,),
+    )
+    for name, definition in cur.fetchall():
+        drops.append(sql.SQL("DROP INDEX {}").format(sql.SQL(name)))
+        restores.append(definition)
+    return drops, restores
+
+
+def _load_worker(
+    worker_id: int,
+    conn_params: dict,
+    schema: str,
+    table: str,
+    load_id: str,
+    column_types: Dict[str, str],
+    chunk_rows: int,
+    total_rows: int,
+    ingest_mode: str,
+    seed: Optional[int],
+    extra_column_spec: Tuple[Optional[str], int],
+    task_queue,
+    result_queue,
+):
+    """Worker process: loads chunks from task_queue until it gets None, reporting each one."""
+    conn = None
+    try:
+        registry.reset()
+        seed_all(derive_seed(seed, "snapshot", "worker", worker_id) if seed is not None else None)
+        conn = psycopg2.connect(**conn_params)
+        # Payload and wide columns hold closures, so each worker rebuilds them from the spec
+        column_definitions = BASE_COLUMN_DEFINITIONS + COLUMN_POOL + extra_columns(*extra_column_spec)
+        generator = BatchGenerator(column_types, column_definitions, table_name=table)
+        names = list(column_types)
+        encoders = binary_encoders_for(column_types) if ingest_mode == "copy_binary" else None
+        copy = sql.SQL("COPY {}.{} ({}) FROM STDIN {}").format(
+            sql.Identifier(schema), sql.Identifier(table),
+            sql.SQL(", ").join(map(sql.Identifier, names)),
+            sql.SQL("(FORMAT binary)" if encoders else "(FORMAT text)"),
+        )
+        record = sql.SQL("INSERT INTO {}.{} (load_id, chunk, rows, worker, seconds) VALUES (%s, %s, %s, %s, %s)").format(
+            sql.Identifier(schema), sql.Identifier(CHUNKS_TABLE)
+        )
+
+        while True:
+            chunk = task_queue.get()
+            if chunk is None:
+                break
+            if seed is not None:
+                seed_all(derive_seed(seed, "snapshot", chunk))
+            rows = min(chunk_rows, total_rows - chunk * chunk_rows)
+            started = time.perf_counter()
+            with conn.cursor() as cur:
+                for offset in range(0, rows, _COPY_ROWS):
+                    columns = generator.generate_columns(min(_COPY_ROWS, rows - offset))
+                    values = zip(*(columns[name] for name in names))
+                    with registry.timed("snapshot", len(columns[names[0]]), table):
+                        buffer = encode_binary_copy(values, encoders) if encoders else encode_text_copy(values)
+                        cur.copy_expert(copy.as_string(cur), buffer)
+                seconds = time.perf_counter() - started
+                cur.execute(record, (load_id, chunk, rows, worker_id, seconds))
+            conn.commit()
+            result_queue.put((worker_id, chunk, rows, seconds, None))
+        result_queue.put((worker_id, None, 0, 0.0, registry.export_state()))
+    except BaseException:
+        result_queue.put((worker_id, None, 0, 0.0, traceback.format_exc()))
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+class SnapshotLoader:
+    def __init__(
+        self,
+        conn_params: dict,
+        schema: str,
+        table: str,
+        column_types: Dict[str, str],
+        total_rows: int,
+        chunk_rows: int = 100_000,
+        workers: int = 4,
+        ingest_mode: str = "copy_binary",
+        unlogged: bool = False,
+        defer_indexes: bool = False,
+        seed: Optional[int] = None,
+        extra_column_spec: Tuple[Optional[str], int] = (None, 0),
+        progress_interval: float = 5.0,
+    ):
+        """
+        column_types: name -> SQL type of the columns to fill; the table's
+        other columns take their defaults.
+        extra_column_spec: the (PAYLOAD_COLUMNS, WIDE_COLUMNS) pair, so
+        workers can rebuild the generators of extra columns.
+        """
+        if ingest_mode not in COPY_MODES:
+            raise ValueError(f"Snapshot loads use COPY; ingest mode must be one of {COPY_MODES}")
+        self.conn_params = conn_params
+        self.schema = schema
+        self.table = table
+        self.column_types = dict(column_types)
+        self.total_rows = total_rows
+        self.chunk_rows = chunk_rows
+        self.workers = max(1, workers)
+        self.ingest_mode = ingest_mode
+        self.unlogged = unlogged
+        self.defer_indexes = defer_indexes
+        self.seed = seed
+        self.extra_column_spec = extra_column_spec
+        self.progress_interval = progress_interval
+        self.chunks = -(-total_rows // chunk_rows)
+        self._table = sql.SQL("{}.{}").format(sql.Identifier(schema), sql.Identifier(table))
+
+    # ────────── PREPARE / FINISH ────────── #
+
+    def _begin(self, conn) -> Tuple[str, dict]:
+        """Find or register the load; on registration, switch the table to its load state."""
+        with conn.cursor() as cur:
+            cur.execute("SELECT %s::regclass::oid", (self._table.as_string(cur),))
+            relid = cur.fetchone()[0]
+            # The table's oid tells a recreated table from the one a recorded load was filling
+            load_id = f"{self.schema}.{self.table}@{relid}/{self.total_rows}x{self.chunk_rows}"
+            cur.execute(
+                sql.SQL("SELECT unlogged, restore_ddl, finished_at, seed FROM {}.{} WHERE load_id = %s").format(
+                    sql.Identifier(self.schema), sql.Identifier(LOADS_TABLE)
+                ),
+                (load_id,),
+            )
+            row = cur.fetchone()
+            if row is not None:
+                conn.commit()
+                unlogged, restore_ddl, finished_at, seed = row
+                if seed is not None and self.seed != int(seed):
+                    print(f"⚠️  Resuming snapshot load {load_id} with seed {self.seed}; it started with {int(seed)}.")
+                return load_id, {"unlogged": unlogged, "restore_ddl": restore_ddl, "finished": finished_at is not None}
+
+            switch = False
+            if self.unlogged:
+                cur.execute(
+                    "SELECT p.pubname FROM pg_publication_rel r JOIN pg_publication p ON p.oid = r.prpubid "
+                    "WHERE r.prrelid = %s",
+                    (relid,),
+                )
+                publications = [name for (name,) in cur.fetchall()]
+                if publications:
+                    raise RuntimeError(
+                        f"{self.schema}.{self.table} is in publication(s) {', '.join(publications)} and cannot be made "
+                        f"UNLOGGED; load before creating the publication or without the unlogged option."
+                    )
+                cur.execute("SELECT relpersistence <> 'u' FROM pg_class WHERE oid = %s", (relid,))
+                switch = cur.fetchone()[0]
+            restore: List[str] = []
+            if self.defer_indexes:
+                drops, restore = _deferrable_indexes(cur, self._table, relid)
+                for statement in drops:
+                    cur.execute(statement)
+            if switch:
+                cur.execute(sql.SQL("ALTER TABLE {} SET UNLOGGED").format(self._table))
+            cur.execute(
+                sql.SQL(
+                    "INSERT INTO {}.{} (load_id, table_name, total_rows, chunk_rows, seed, unlogged, restore_ddl) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s)"
+                ).format(sql.Identifier(self.schema), sql.Identifier(LOADS_TABLE)),
+                (load_id, f"{self.schema}.{self.table}", self.total_rows, self.chunk_rows, self.seed, switch, restore),
+            )
+        conn.commit()
+        if restore:
+            print(f"🗂️  Deferred {len(restore)} index(es) until the snapshot load finishes.")
+        if switch:
+            print(f"📝 {self.schema}.{self.table} is UNLOGGED until the snapshot load finishes.")
+        return load_id, {"unlogged": switch, "restore_ddl": restore, "finished": False}
+
+    def _done_chunks(self, conn, load_id: str) -> set:
+        with conn.cursor() as cur:
+            cur.execute(
+                sql.SQL("SELECT chunk FROM {}.{} WHERE load_id = %s").format(
+                    sql.Identifier(self.schema), sql.Identifier(CHUNKS_TABLE)
+                ),
+                (load_id,),
+            )
+            done = {chunk for (chunk,) in cur.fetchall()}
+        conn.commit()
+        return done
+
+    def _finish(self, conn, load_id: str, state: dict) -> Dict[str, float]:
+        """Switch the table back to LOGGED, rebuild deferred indexes and mark the load finished."""
+        timings: Dict[str, float] = {}
+        with conn.cursor() as cur:
+            if state["unlogged"]:
+                print("📝 Switching the table back to LOGGED (rewrites it into the WAL)...")
+                started = time.perf_counter()
+                cur.execute(sql.SQL("ALTER TABLE {} SET LOGGED").format(self._table))
+                timings["set_logged_s"] = round(time.perf_counter() - started, 2)
+            if state["restore_ddl"]:
+                print(f"🗂️  Rebuilding {len(state['restore_ddl'])} deferred index(es)...")
+                started = time.perf_counter()
+                for statement in state["restore_ddl"]:
+                    cur.execute(statement)
+                timings["index_build_s"] = round(time.perf_counter() - started, 2)
+            started = time.perf_counter()
+            cur.execute(sql.SQL("ANALYZE {}").format(self._table))
+            timings["analyze_s"] = round(time.perf_counter() - started, 2)
+            cur.execute(
+                sql.SQL("UPDATE {}.{} SET finished_at = now() WHERE load_id = %s").format(
+                    sql.Identifier(self.schema), sql.Identifier(LOADS_TABLE)
+                ),
+                (load_id,),
+            )
+        conn.commit()
+        return timings
+
+    # ────────── LOAD ────────── #
+
+    def run(self) -> dict:
+        """Load every chunk not yet recorded, then restore the table. Ctrl+C leaves a resumable load."""
+        conn = psycopg2.connect(**self.conn_params)
+        try:
+            _ensure_progress_tables(conn, self.schema)
+            load_id, state = self._begin(conn)
+            done = self._done_chunks(conn, load_id)
+            pending = [chunk for chunk in range(self.chunks) if chunk not in done]
+            report = {
+                "load_id": load_id,
+                "total_rows": self.total_rows,
+                "chunks": self.chunks,
+                "resumed_chunks": len(done),
+                "loaded_rows": 0,
+                "rows_per_sec": 0.0,
+                "elapsed_s": 0.0,
+                "finish": {},
+            }
+            if state["finished"]:
+                print(f"✅ Snapshot load {load_id} already finished.")
+                return report
+            if done:
+                print(f"⏩ Resuming snapshot load {load_id}: {len(done)}/{self.chunks} chunks already loaded.")
+
+            started = time.perf_counter()
+            loaded_rows = self._load(load_id, pending)
+            elapsed = time.perf_counter() - started
+            report.update(
+                loaded_rows=loaded_rows,
+                elapsed_s=round(elapsed, 2),
+                rows_per_sec=round(loaded_rows / elapsed, 1) if elapsed > 0 else 0.0,
+            )
+            report["finish"] = self._finish(conn, load_id, state)
+            return report
+        finally:
+            conn.close()
+
+    def _load(self, load_id: str, pending: List[int]) -> int:
+        if not pending:
+            return 0
+        workers = min(self.workers, len(pending))
+        ctx = mp.get_context()
+        task_queue = ctx.Queue()
+        result_queue = ctx.Queue()
+        for chunk in pending:
+            task_queue.put(chunk)
+        for _ in range(workers):
+            task_queue.put(None)
+
+        print(
+            f"\n📦 Snapshot load: {len(pending)} chunks of up to {self.chunk_rows} rows "
+            f"into {self.schema}.{self.table} across {workers} workers\n"
+        )
+        processes = [
+            ctx.Process(
+                target=_load_worker,
+                name=f"cdcraft-snapshot-{worker_id}",
+                args=(
+                    worker_id, self.conn_params, self.schema, self.table, load_id, self.column_types,
+                    self.chunk_rows, self.total_rows, self.ingest_mode, self.seed, self.extra_column_spec,
+                    task_queue, result_queue,
+                ),
+            )
+            for worker_id in range(workers)
+        ]
+        for proc in processes:
+            proc.start()
+
+        loaded_rows = chunks_done = 0
+        finished: set = set()
+        errors = []
+        started = next_progress = time.perf_counter()
+        try:
+            while len(finished) < workers:
+                try:
+                    worker_id, chunk, rows, _, payload = result_queue.get(timeout=1.0)
+                except queue.Empty:
+                    for worker_id, proc in enumerate(processes):
+                        if worker_id not in finished and proc.exitcode not in (None, 0):
+                            finished.add(worker_id)
+                            errors.append(f"worker {worker_id} exited with code {proc.exitcode}")
+                    continue
+                if chunk is not None:
+                    loaded_rows += rows
+                    chunks_done += 1
+                elif isinstance(payload, dict):
+                    registry.merge_state(payload)
+                    finished.add(worker_id)
+                else:
+                    finished.add(worker_id)
+                    errors.append(f"worker {worker_id}:\n{payload}")
+
+                now = time.perf_counter()
+                if now >= next_progress and loaded_rows:
+                    rate = loaded_rows / (now - started)
+                    remaining = sum(min(self.chunk_rows, self.total_rows - c * self.chunk_rows) for c in pending) - loaded_rows
+                    print(
+                        f"[Snapshot] {chunks_done}/{len(pending)} chunks, {loaded_rows:,} rows, "
+                        f"{rate:,.0f} rows/s, ~{remaining / rate:.0f}s left"
+                    )
+                    next_progress = now + self.progress_interval
+        except KeyboardInterrupt:
+            for proc in processes:
+                proc.terminate()
+            print(f"\n⏸️  Snapshot load interrupted after {chunks_done} chunks; run it again to resume.")
+            raise
+        finally:
+            for proc in processes:
+                proc.join(timeout=5)
+                if proc.is_alive():
+                    proc.terminate()
+
+        if errors:
+            raise RuntimeError("Snapshot load failed (finished chunks are kept for a resume):\n" + "\n".join(errors))
+        return loaded_rows
+
+
+def print_snapshot_report(report: dict):
+    print(f"\n📦 Snapshot load {report['load_id']}:")
+    print(
+        f" - {report['loaded_rows']:,} rows loaded in {report['elapsed_s']}s ({report['rows_per_sec']:,.0f} rows/s); "
+        f"{report['resumed_chunks']}/{report['chunks']} chunks were already in from an earlier run"
+    )
+    finish = report["finish"]
+    if finish:
+        print(" - Finishing: " + ", ".join(f"{key[:-2].replace('_', ' ')} {value}s" for key, value in finish.items()))
+
+
+def _catalog_column_types(conn, schema: str, table: str) -> Dict[str, str]:
+    """Column name -> SQL type of the table's columns, in table order."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT a.attname, format_type(a.atttypid, a.atttypmod) FROM pg_attribute a "
+            "WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped ORDER BY a.attnum",
+            (sql.SQL("{}.{}").format(sql.Identifier(schema), sql.Identifier(table)).as_string(cur),),
+        )
+        columns = dict(cur.fetchall())
+    conn.commit()
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefill a CDCraft table with a parallel, resumable snapshot load.")
+    parser.add_argument("--dsn", default="", help="libpq DSN; PG* environment variables fill the gaps")
+    parser.add_argument("--schema", default=os.getenv("PGSCHEMA", "cdcraft_demo"))
+    parser.add_argument("--table", default="sales")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ingest-mode", choices=COPY_MODES, default="copy_binary")
+    parser.add_argument("--unlogged", action="store_true", help="load into an UNLOGGED table, then SET LOGGED")
+    parser.add_argument("--defer-indexes", action="store_true", help="drop indexes for the load and rebuild them after")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--payload-columns", default=os.getenv("PAYLOAD_COLUMNS"))
+    parser.add_argument("--wide-columns", type=int, default=int(os.getenv("WIDE_COLUMNS", "0")))
+    args = parser.parse_args()
+
+    conn_params = {"dsn": args.dsn}
+    with psycopg2.connect(**conn_params) as conn:
+        column_types = _catalog_column_types(conn, args.schema, args.table)
+    conn.close()
+    loader = SnapshotLoader(
+        conn_params, args.schema, args.table, column_types, args.rows,
+        chunk_rows=args.chunk_rows, workers=args.workers, ingest_mode=args.ingest_mode,
+        unlogged=args.unlogged, defer_indexes=args.defer_indexes, seed=args.seed,
+        extra_column_spec=(args.payload_columns, args.wide_columns),
+    )
+    try:
+        print_snapshot_report(loader.run())
+    except KeyboardInterrupt:
+        raise SystemExit(130)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Pre-generated value pools for expensive per-row generators.
+
+A ValuePool sits in front of a generator such as fake.name and serves
+values from a buffer filled ahead of time, so each draw costs a list
+index instead of a trip through Faker's provider machinery.
+
+- With `cardinality`, the generator is called only that many times. The
+  pool deals values uniformly from that fixed set, which also gives the
+  realistic repetition of e.g. a customer base. Each slot of the set is
+  generated the first time a draw lands on it, so early values are not
+  overrepresented. Until the set is complete, buffers hold only
+  GROWTH_BUFFER draws, so a large cardinality does not stall the first draw.
+- Without it, every value is fresh. A standby buffer is refilled on a
+  background thread while the active one is consumed, so generation
+  overlaps the simulator's database round trips.
+
+Background refill uses the shared random state from another thread, so
+seeded runs (see seeding.seed_all) switch it off and refill inline.
+"""
+import random
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_POOL_SIZE = 65_536
+
+# Draws per buffer while a cardinality pool is still generating its set
+GROWTH_BUFFER = 4096
+
+# Turned off by seeding.seed_all() so seeded runs draw in a fixed order
+background_refill = True
+
+
+class ValuePool:
+    def __init__(
+        self,
+        provider: Callable[[], Any],
+        size: int = DEFAULT_POOL_SIZE,
+        cardinality: Optional[int] = None,
+    ):
+        self.provider = provider
+        self.size = size
+        self.cardinality = cardinality
+
+        self._lock = threading.Lock()
+        # Slot of the distinct set -> its value, for the slots drawn so far
+        self._distinct: Dict[int, Any] = {}
+        self._buffer: List[Any] = []
+        self._pos = 0
+        self._standby: Optional[List[Any]] = None
+        self._refill_thread: Optional[threading.Thread] = None
+
+    @property
+    def saturated(self) -> bool:
+        """True once a cardinality pool holds all of its distinct values."""
+        return bool(self.cardinality) and len(self._distinct) >= self.cardinality
+
+    # ────────── DRAWING ────────── #
+
+    def next(self) -> Any:
+        with self._lock:
+            if self._pos >= len(self._buffer):
+                self._rotate()
+            value = self._buffer[self._pos]
+            self._pos += 1
+            return value
+
+    def take(self, n: int) -> List[Any]:
+        values: List[Any] = []
+        with self._lock:
+            while len(values) < n:
+                if self._pos >= len(self._buffer):
+                    self._rotate()
+                end = min(len(self._buffer), self._pos + n - len(values))
+                values.extend(self._buffer[self._pos:end])
+                self._pos = end
+        return values
+
+    # ────────── REFILLING ────────── #
+
+    def _generate(self) -> List[Any]:
+        if self.cardinality:
+            distinct = self._distinct
+            values = []
+            size = self.size if self.saturated else min(self.size, GROWTH_BUFFER)
+            for slot in random.choices(range(self.cardinality), k=size):
+                if slot not in distinct:
+                    distinct[slot] = self.provider()
+                values.append(distinct[slot])
+            return values
+        return [self.provider() for _ in range(self.size)]
+
+    def _rotate(self):
+        """Swap in the standby buffer (waiting for it if needed) and start the next refill."""
+        if self._refill_thread is not None:
+            self._refill_thread.join()
+            self._refill_thread = None
+
+        self._buffer = self._standby if self._standby is not None else self._generate()
+        self._standby = None
+        self._pos = 0
+
+        # Dealing from a complete set is cheap; only new values are worth a thread
+        if background_refill and not self.saturated:
+            self._refill_thread = threading.Thread(target=self._refill, name="cdcraft-value-pool", daemon=True)
+            self._refill_thread.start()
+
+    def _refill(self):
+        self._standby = self._generate()
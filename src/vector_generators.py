@@ -0,0 +1,110 @@
+"""
+Column-at-a-time generators for BatchGenerator.generate_columns().
+
+Each factory returns a callable taking a row count and returning a list with
+one value per row. The factories return None when NumPy is not installed, in
+which case ColumnDefinition falls back to calling its per-row generator.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; columnar mode degrades to per-row generation
+    np = None
+
+BatchFn = Callable[[int], List[Any]]
+
+_rng = np.random.default_rng() if np is not None else None
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+def rng():
+    """The shared generator, for callers that draw from it directly (e.g. access_patterns)."""
+    return _rng
+
+
+def seed(value: Optional[int]):
+    """Re-seed the shared generator; every factory below draws from it."""
+    global _rng
+    if np is not None:
+        _rng = np.random.default_rng(value)
+
+
+def random_ints(low: int, high: int) -> Optional[BatchFn]:
+    """Integers in [low, high], inclusive like random.randint."""
+    if np is None:
+        return None
+    return lambda n: _rng.integers(low, high + 1, size=n).tolist()
+
+
+def uniform_floats(low: float, high: float, decimals: int = 2) -> Optional[BatchFn]:
+    if np is None:
+        return None
+    return lambda n: _rng.uniform(low, high, size=n).round(decimals).tolist()
+
+
+def random_bools() -> Optional[BatchFn]:
+    if np is None:
+        return None
+    return lambda n: (_rng.random(n) < 0.5).tolist()
+
+
+def random_choices(options: Sequence[Any]) -> Optional[BatchFn]:
+    if np is None:
+        return None
+    pool = np.array(options, dtype=object)
+    return lambda n: pool[_rng.integers(0, len(pool), size=n)].tolist()
+
+
+def uppercase_strings(length: int) -> Optional[BatchFn]:
+    if np is None:
+        return None
+
+    def generate(n: int) -> List[str]:
+        raw = _rng.integers(ord("A"), ord("Z") + 1, size=n * length, dtype=np.uint8).tobytes().decode("ascii")
+        return [raw[i:i + length] for i in range(0, n * length, length)]
+
+    return generate
+
+
+def uuid4_strings() -> Optional[BatchFn]:
+    if np is None:
+        return None
+
+    def generate(n: int) -> List[str]:
+        raw = np.frombuffer(_rng.bytes(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+        raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+        raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+        hexed = raw.tobytes().hex()
+        return [
+            f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+            for h in (hexed[i:i + 32] for i in range(0, 32 * n, 32))
+        ]
+
+    return generate
+
+
+def timestamps_between(start_ago: timedelta, end_ago: timedelta = timedelta(0)) -> Optional[BatchFn]:
+    """Uniform timestamps between now - start_ago and now - end_ago."""
+    if np is None:
+        return None
+    span_us = int((start_ago - end_ago) / timedelta(microseconds=1))
+    end_us = int(end_ago / timedelta(microseconds=1))
+
+    def generate(n: int) -> List[datetime]:
+        now = np.datetime64(datetime.utcnow(), "us")
+        offsets = _rng.integers(end_us, end_us + span_us + 1, size=n).astype("timedelta64[us]")
+        return (now - offsets).tolist()
+
+    return generate
+
+
+def current_timestamps() -> Optional[BatchFn]:
+    if np is None:
+        return None
+    return lambda n: [datetime.utcnow()] * n
+
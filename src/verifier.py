@@ -0,0 +1,363 @@
+"""
+Source/sink convergence check using hash-bucketed checksums over UUID
+primary-key ranges.
+
+Both tables are summarised server-side: every row is hashed (md5 of the
+compared columns), rows are grouped into buckets by the next hex digits of
+their id, and only (bucket, count, sum of hashes) comes back. Buckets that
+differ are split again on a narrower id range, merkle-tree style, until
+they are small enough to diff id by id. Nothing is loaded into memory
+beyond one leaf range at a time, and each level is an index range scan on
+the primary key.
+
+The target is any PostgreSQL table fed by the pipeline (e.g. a JDBC sink
+or a replica). Columns are compared by name: columns the simulator dropped
+(see SchemaManager.get_schema_history) usually linger on the sink and are
+ignored, as is anything present on only one side.
+
+Sinks often store a column under a different type than the source (a uuid
+key as text, numeric as double precision, timestamptz as a UTC timestamp,
+json as jsonb). The key is cast to uuid on a side that stores it otherwise,
+which costs that side its index range scan. A column whose type differs
+between the sides is hashed through a canonical form of its type family
+(see canonical_expression); same-typed columns are hashed as they are.
+
+    python src/verifier.py --target-dsn "host=sink dbname=dw" --table sales
+"""
+import argparse
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import psycopg2
+from psycopg2 import sql
+
+KEY_SPACE = 1 << 128
+
+# information_schema data_type families that compare by value across types
+EXACT_NUMERIC = {"smallint", "integer", "bigint", "numeric"}
+FLOAT = {"real", "double precision"}
+TIMESTAMP = {"timestamp with time zone", "timestamp without time zone"}
+JSON = {"json", "jsonb"}
+
+
+def _uuid_bound(value: int) -> Optional[str]:
+    return str(uuid.UUID(int=value)) if value < KEY_SPACE else None
+
+
+class KeyRange:
+    """Ids whose first `depth` hex digits equal `prefix`."""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+
+    @property
+    def depth(self) -> int:
+        return len(self.prefix)
+
+    @property
+    def bounds(self) -> Tuple[Optional[str], Optional[str]]:
+        if not self.prefix:
+            return None, None
+        shift = 4 * (32 - self.depth)
+        start = int(self.prefix, 16) << shift
+        return _uuid_bound(start), _uuid_bound(start + (1 << shift))
+
+    def __repr__(self):
+        low, high = self.bounds
+        return f"[{low or 'min'}, {high or 'max'})"
+
+
+def canonical_expression(column: str, own_type: str, other_type: str) -> sql.Composable:
+    """
+    `column` on a side of type `own_type`, rendered so that it hashes like the
+    same value on a side of type `other_type`.
+
+    - Integers and numerics: trailing zeros trimmed (numeric(10,2) 2.00 == 2).
+      Against a float, both sides go through double precision.
+    - Timestamps: with time zone is read as UTC, without is taken as UTC.
+    - json/jsonb: jsonb, which normalises whitespace and key order.
+    - Anything else: its text form (uuid vs text, varchar vs text).
+    """
+    ident = sql.Identifier(column)
+    types = {own_type, other_type}
+    if own_type == other_type:
+        return ident
+    if types <= EXACT_NUMERIC | FLOAT:
+        if types & FLOAT:
+            return sql.SQL("{}::float8").format(ident)
+        return sql.SQL("trim_scale({}::numeric)").format(ident)
+    if types <= TIMESTAMP:
+        if own_type == "timestamp with time zone":
+            return sql.SQL("({} AT TIME ZONE 'UTC')").format(ident)
+        return ident
+    if types <= JSON:
+        return sql.SQL("{}::jsonb").format(ident)
+    return sql.SQL("{}::text").format(ident)
+
+
+class TableSide:
+    def __init__(self, conn, schema: str, table: str, key: str = "id"):
+        self.conn = conn
+        self.schema = schema
+        self.table = table
+        self.key = key
+        # Set by ChecksumVerifier.resolve_columns() from both sides' catalogs
+        self.key_type = "uuid"
+        self.expressions: Dict[str, sql.Composable] = {}
+
+    @property
+    def key_expression(self) -> sql.Composable:
+        """The key as uuid, so both sides bucket and order ids the same way."""
+        if self.key_type == "uuid":
+            return sql.Identifier(self.key)
+        return sql.SQL("{}::uuid").format(sql.Identifier(self.key))
+
+    @property
+    def qualified(self) -> sql.Composed:
+        return sql.SQL("{}.{}").format(sql.Identifier(self.schema), sql.Identifier(self.table))
+
+    def columns(self) -> Dict[str, str]:
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "SELECT column_name, data_type FROM information_schema.columns "
+                "WHERE table_schema = %s AND table_name = %s ORDER BY ordinal_position",
+                (self.schema, self.table),
+            )
+            columns = dict(cur.fetchall())
+        self.conn.rollback()
+        if not columns:
+            raise ValueError(f"Table {self.schema}.{self.table} does not exist")
+        return columns
+
+    def _range_filter(self, key_range: KeyRange) -> Tuple[sql.Composable, list]:
+        low, high = key_range.bounds
+        clauses, params = [], []
+        if low is not None:
+            clauses.append(sql.SQL("{} >= %s::uuid").format(self.key_expression))
+            params.append(low)
+        if high is not None:
+            clauses.append(sql.SQL("{} < %s::uuid").format(self.key_expression))
+            params.append(high)
+        where = sql.SQL(" WHERE ") + sql.SQL(" AND ").join(clauses) if clauses else sql.SQL("")
+        return where, params
+
+    def _row_hash(self, columns: List[str]) -> sql.Composable:
+        expressions = [self.expressions.get(name, sql.Identifier(name)) for name in columns]
+        return sql.SQL("md5(ROW({})::text)").format(sql.SQL(", ").join(expressions))
+
+    def bucket_checksums(self, key_range: KeyRange, digits: int, columns: List[str]) -> Dict[str, Tuple[int, int]]:
+        """bucket (next `digits` hex digits of the id) -> (row count, sum of 60-bit row hashes)."""
+        where, params = self._range_filter(key_range)
+        query = sql.SQL(
+            "SELECT substr(replace({key}::text, '-', ''), {start}, {digits}) AS bucket, count(*), "
+            "sum(('x' || substr({row_hash}, 1, 15))::bit(60)::bigint) "
+            "FROM {table}{where} GROUP BY 1"
+        ).format(
+            key=self.key_expression,
+            start=sql.Literal(key_range.depth + 1),
+            digits=sql.Literal(digits),
+            row_hash=self._row_hash(columns),
+            table=self.qualified,
+            where=where,
+        )
+        with self.conn.cursor() as cur:
+            cur.execute(query, params)
+            result = {bucket: (count, int(total)) for bucket, count, total in cur}
+        self.conn.rollback()
+        return result
+
+    def row_hashes(self, key_range: KeyRange, columns: List[str]) -> Iterator[Tuple[str, str]]:
+        """(id, row hash) for every row in the range, in id order, streamed via a named cursor."""
+        where, params = self._range_filter(key_range)
+        query = sql.SQL("SELECT {key}::text, {row_hash} FROM {table}{where} ORDER BY {key}").format(
+            key=self.key_expression,
+            row_hash=self._row_hash(columns),
+            table=self.qualified,
+            where=where,
+        )
+        with self.conn.cursor(name=f"cdcraft_verify_{uuid.uuid4().hex[:8]}") as cur:
+            cur.itersize = 5000
+            cur.execute(query, params)
+            yield from cur
+        self.conn.rollback()
+
+
+class ChecksumVerifier:
+    def __init__(
+        self,
+        source: TableSide,
+        target: TableSide,
+        columns: Optional[List[str]] = None,
+        schema_history: Optional[List[Dict[str, str]]] = None,
+        digits: int = 2,
+        leaf_rows: int = 2000,
+        max_ids: int = 100,
+    ):
+        """
+        digits: hex digits consumed per level (16**digits buckets per split).
+        leaf_rows: ranges at or below this size are diffed id by id.
+        max_ids: cap on the ids listed per divergence kind in the report.
+        """
+        self.source = source
+        self.target = target
+        self.requested_columns = columns
+        self.schema_history = schema_history or []
+        self.digits = digits
+        self.leaf_rows = leaf_rows
+        self.max_ids = max_ids
+        self._pool = ThreadPoolExecutor(max_workers=2)
+
+    def resolve_columns(self) -> Tuple[List[str], Dict[str, str]]:
+        """Columns to compare, plus the ignored ones with the reason."""
+        source_cols = self.source.columns()
+        target_cols = self.target.columns()
+        dropped = {entry["column"] for entry in self.schema_history if entry["action"] == "drop"}
+        wanted = self.requested_columns or list(source_cols)
+
+        compared, ignored = [], {}
+        for name in wanted:
+            if name not in source_cols:
+                ignored[name] = "not in source"
+            elif name not in target_cols:
+                ignored[name] = "not in target"
+            else:
+                compared.append(name)
+        for name in target_cols:
+            if name not in source_cols and name not in ignored:
+                ignored[name] = "dropped during simulation" if name in dropped else "only in target"
+        if self.source.key not in compared:
+            raise ValueError(f"Key column '{self.source.key}' must be present on both sides")
+
+        for side, own, other in ((self.source, source_cols, target_cols), (self.target, target_cols, source_cols)):
+            side.key_type = own[side.key]
+            side.expressions = {name: canonical_expression(name, own[name], other[name]) for name in compared}
+        return compared, ignored
+
+    def _both(self, fn_name: str, *args):
+        futures = [self._pool.submit(getattr(side, fn_name), *args) for side in (self.source, self.target)]
+        return [future.result() for future in futures]
+
+    def _diff_leaf(self, key_range: KeyRange, columns: List[str], report: dict):
+        source_rows = self.source.row_hashes(key_range, columns)
+        target_rows = self.target.row_hashes(key_range, columns)
+        src, tgt = next(source_rows, None), next(target_rows, None)
+        while src is not None or tgt is not None:
+            if tgt is None or (src is not None and src[0] < tgt[0]):
+                self._note(report, "missing_in_target", src[0])
+                src = next(source_rows, None)
+            elif src is None or tgt[0] < src[0]:
+                self._note(report, "extra_in_target", tgt[0])
+                tgt = next(target_rows, None)
+            else:
+                if src[1] != tgt[1]:
+                    self._note(report, "mismatched", src[0])
+                src, tgt = next(source_rows, None), next(target_rows, None)
+
+    def _note(self, report: dict, kind: str, key: str):
+        report["counts"][kind] += 1
+        if len(report[kind]) < self.max_ids:
+            report[kind].append(key)
+
+    def _check(self, key_range: KeyRange, columns: List[str], report: dict):
+        report["queries"] += 2
+        source_buckets, target_buckets = self._both("bucket_checksums", key_range, self.digits, columns)
+        for bucket in sorted(source_buckets.keys() | target_buckets.keys()):
+            src = source_buckets.get(bucket, (0, 0))
+            tgt = target_buckets.get(bucket, (0, 0))
+            if src == tgt:
+                continue
+            child = KeyRange(key_range.prefix + bucket)
+            if max(src[0], tgt[0]) <= self.leaf_rows or child.depth + self.digits > 32:
+                report["divergent_ranges"].append({
+                    "range": repr(child), "source_rows": src[0], "target_rows": tgt[0],
+                })
+                report["queries"] += 2
+                self._diff_leaf(child, columns, report)
+            else:
+                self._check(child, columns, report)
+
+    def verify(self) -> dict:
+        started = time.perf_counter()
+        columns, ignored = self.resolve_columns()
+        report = {
+            "source": f"{self.source.schema}.{self.source.table}",
+            "target": f"{self.target.schema}.{self.target.table}",
+            "compared_columns": columns,
+            "ignored_columns": ignored,
+            "divergent_ranges": [],
+            "missing_in_target": [],
+            "extra_in_target": [],
+            "mismatched": [],
+            "counts": {"missing_in_target": 0, "extra_in_target": 0, "mismatched": 0},
+            "queries": 0,
+        }
+        self._check(KeyRange(), columns, report)
+        report["converged"] = not report["divergent_ranges"]
+        report["elapsed_s"] = round(time.perf_counter() - started, 2)
+        return report
+
+    def verify_until_converged(self, timeout: float, interval: float = 5.0) -> dict:
+        """Re-run verify() until the sink has caught up or `timeout` seconds pass."""
+        deadline = time.monotonic() + timeout
+        report = self.verify()
+        while not report["converged"] and time.monotonic() + interval < deadline:
+            time.sleep(interval)
+            report = self.verify()
+        return report
+
+
+def print_verification_report(report: dict):
+    status = "✅ converged" if report["converged"] else "❌ diverged"
+    print(f"\n🔎 Verification {report['source']} → {report['target']}: {status} "
+          f"({report['queries']} queries, {report['elapsed_s']}s)")
+    print(f" - Compared columns: {', '.join(report['compared_columns'])}")
+    for name, reason in report["ignored_columns"].items():
+        print(f" - Ignored column {name}: {reason}")
+    if report["converged"]:
+        return
+    counts = report["counts"]
+    print(f" - Missing in target: {counts['missing_in_target']}, extra in target: "
+          f"{counts['extra_in_target']}, mismatched: {counts['mismatched']}")
+    for entry in report["divergent_ranges"][:20]:
+        print(f"   • {entry['range']}: source {entry['source_rows']} rows, target {entry['target_rows']} rows")
+    if len(report["divergent_ranges"]) > 20:
+        print(f"   … {len(report['divergent_ranges']) - 20} more ranges")
+    for kind in ("missing_in_target", "extra_in_target", "mismatched"):
+        if report[kind]:
+            print(f" - {kind} (first {len(report[kind])}): {', '.join(report[kind][:5])}"
+                  + (" …" if len(report[kind]) > 5 else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that a sink table converged with the CDCraft source table.")
+    parser.add_argument("--source-dsn", default="", help="libpq DSN; PG* environment variables fill the gaps")
+    parser.add_argument("--target-dsn", required=True)
+    parser.add_argument("--schema", default=os.getenv("PGSCHEMA", "cdcraft_demo"))
+    parser.add_argument("--table", default="sales")
+    parser.add_argument("--target-schema", help="defaults to --schema")
+    parser.add_argument("--target-table", help="defaults to --table")
+    parser.add_argument("--columns", help="comma-separated subset to compare (default: all shared columns)")
+    parser.add_argument("--digits", type=int, default=2, help="hex digits per split (16**digits buckets)")
+    parser.add_argument("--leaf-rows", type=int, default=2000)
+    parser.add_argument("--wait", type=float, default=0.0, help="seconds to keep re-checking until the sink converges")
+    args = parser.parse_args()
+
+    source = TableSide(psycopg2.connect(args.source_dsn), args.schema, args.table)
+    target = TableSide(
+        psycopg2.connect(args.target_dsn), args.target_schema or args.schema, args.target_table or args.table
+    )
+    verifier = ChecksumVerifier(
+        source, target,
+        columns=args.columns.split(",") if args.columns else None,
+        digits=args.digits, leaf_rows=args.leaf_rows,
+    )
+    report = verifier.verify_until_converged(args.wait) if args.wait else verifier.verify()
+    print_verification_report(report)
+    raise SystemExit(0 if report["converged"] else 1)
+
+
+if __name__ == "__main__":
+    main()
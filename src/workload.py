@@ -0,0 +1,367 @@
+"""
+Declarative multi-table workloads.
+
+A workload spec (YAML or JSON) describes any number of tables, their
+columns, insert/update/delete mix and evolution policy. run_workload()
+drives every table at once, one thread and connection per table, so a
+single CDCraft run can fan changes into many connector topics.
+
+Example (see example/workloads/retail.yaml for a complete one):
+
+    schema: cdcraft_load
+    publication: cdcraft_load_pub
+    tables:
+      - name: orders
+        total_records: 200000
+        batch_size: 500
+        rate: 2000                 # events/sec, optional
+        mix: {update: 0.3, delete: 0.05, target: zipf}   # target: batch, uniform, zipf:s=1.2, hotspot:..., latest:...
+        transaction: {ops_per_commit: 4}   # optional, also large_probability / large_ops
+        columns:
+          - {name: customer, type: TEXT, generator: name, cardinality: 20000}
+          - {name: amount, type: FLOAT, generator: float, min: 1, max: 500}
+          - {name: status, type: TEXT, generator: choice, options: [new, paid, shipped]}
+        column_pool:
+          - {name: coupon, type: TEXT, generator: string, length: 6}
+        evolution: {interval: 25, probability: 0.2, max_additions: 3, max_drops: 1,
+                    migration_probability: 0.3, migration_strategy: shadow}   # also migrations, lock_timeout_ms, lock_retries, backfill_rows
+"""
+import json
+import random
+import string
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2 import sql
+
+import vector_generators as vg
+from batch_generator import BatchGenerator
+from column_manager import ColumnDefinition
+from column_pool import BASE_COLUMN_DEFINITIONS, PROTECTED_COLUMNS, fake
+from mutation_engine import MutationEngine
+from online_migrations import OPERATIONS
+from payloads import DEFAULT_VARIANTS, parse_size, payload_generators
+from rate_controller import ConstantProfile, RateController
+from runner import evolve_schema
+from schema_manager import SchemaEvolutionController, SchemaManager
+
+# Columns every workload table gets so the mutation engine can address rows
+_IMPLICIT_COLUMNS = {col.name: col for col in BASE_COLUMN_DEFINITIONS if col.name in PROTECTED_COLUMNS}
+
+
+# ────────── COLUMN GENERATORS ────────── #
+
+def _int_gen(spec: Dict[str, Any]):
+    low, high = int(spec.get("min", 1)), int(spec.get("max", 10_000))
+    return lambda: random.randint(low, high), vg.random_ints(low, high)
+
+
+def _float_gen(spec: Dict[str, Any]):
+    low, high = float(spec.get("min", 0)), float(spec.get("max", 1000))
+    decimals = int(spec.get("decimals", 2))
+    return lambda: round(random.uniform(low, high), decimals), vg.uniform_floats(low, high, decimals)
+
+
+def _bool_gen(spec: Dict[str, Any]):
+    return lambda: random.choice([True, False]), vg.random_bools()
+
+
+def _choice_gen(spec: Dict[str, Any]):
+    options = list(spec["options"])
+    return lambda: random.choice(options), vg.random_choices(options)
+
+
+def _string_gen(spec: Dict[str, Any]):
+    length = int(spec.get("length", 8))
+    return lambda: "".join(random.choices(string.ascii_uppercase, k=length)), vg.uppercase_strings(length)
+
+
+def _timestamp_gen(spec: Dict[str, Any]):
+    days_back = int(spec.get("days_back", 730))
+    return (
+        lambda: datetime.utcnow() - timedelta(seconds=random.randint(0, days_back * 86400)),
+        vg.timestamps_between(timedelta(days=days_back)),
+    )
+
+
+def _now_gen(spec: Dict[str, Any]):
+    return lambda: datetime.utcnow(), vg.current_timestamps()
+
+
+def _faker_gen(provider: Callable[[], Any]):
+    # Served from a ValuePool (see column_from_spec) rather than a NumPy batch generator
+    def build(spec: Dict[str, Any]):
+        return provider, None
+    return build
+
+
+def _payload_gen(kind: str):
+    def build(spec: Dict[str, Any]):
+        size = parse_size(str(spec.get("size", 4096)))
+        return payload_generators(kind, size, int(spec.get("variants", DEFAULT_VARIANTS)))
+    return build
+
+
+GENERATORS: Dict[str, Callable[[Dict[str, Any]], Tuple[Callable[[], Any], Any]]] = {
+    "int": _int_gen,
+    "float": _float_gen,
+    "bool": _bool_gen,
+    "choice": _choice_gen,
+    "string": _string_gen,
+    "timestamp": _timestamp_gen,
+    "now": _now_gen,
+    "name": _faker_gen(fake.name),
+    "email": _faker_gen(fake.email),
+    "city": _faker_gen(fake.city),
+    "sentence": _faker_gen(fake.sentence),
+    # Large values for WAL/TOAST stress; size in bytes (elements for int_array), or a min-max range
+    "text_blob": _payload_gen("text"),
+    "jsonb": _payload_gen("jsonb"),
+    "bytea": _payload_gen("bytea"),
+    "int_array": _payload_gen("int_array"),
+}
+
+_FAKER_KINDS = {"name", "email", "city", "sentence"}
+
+
+def column_from_spec(spec: Dict[str, Any]) -> ColumnDefinition:
+    kind = spec.get("generator")
+    if kind not in GENERATORS:
+        raise ValueError(
+            f"Column '{spec.get('name')}' has unknown generator '{kind}', "
+            f"expected one of {sorted(GENERATORS)}"
+        )
+    generator, batch_generator = GENERATORS[kind](spec)
+    # Faker-backed columns are pooled by default; `cardinality` caps the distinct values
+    # (`pool_size` is its older name). Any other generator can opt in with `cardinality`.
+    cardinality = spec.get("cardinality", spec.get("pool_size"))
+    if cardinality is None and kind in _FAKER_KINDS:
+        cardinality = 10_000
+    return ColumnDefinition(
+        spec["name"],
+        spec["type"],
+        generator,
+        constraints=spec.get("constraints"),
+        batch_generator=batch_generator,
+        cardinality=int(cardinality) if cardinality else None,
+    )
+
+
+# ────────── SPEC ────────── #
+
+class TableWorkload:
+    def __init__(self, spec: Dict[str, Any], defaults: Dict[str, Any]):
+        merged = {**defaults, **spec}
+        self.name: str = merged["name"]
+        self.total_records = int(merged.get("total_records", 100_000))
+        self.batch_size = int(merged.get("batch_size", 500))
+        self.rate: Optional[float] = float(merged["rate"]) if merged.get("rate") else None
+
+        txn = merged.get("transaction", {})
+        self.txn_options = dict(
+            ops_per_commit=int(txn.get("ops_per_commit", 1)),
+            large_txn_probability=float(txn.get("large_probability", 0.0)),
+            large_txn_ops=int(txn.get("large_ops", 0)),
+        )
+
+        mix = merged.get("mix", {})
+        self.update_ratio = float(mix.get("update", 0.25))
+        self.delete_ratio = float(mix.get("delete", 0.1))
+        self.targeting = mix.get("target", "batch")
+
+        declared = [column_from_spec(col) for col in merged.get("columns", [])]
+        declared_names = {col.name for col in declared}
+        self.base_columns: List[ColumnDefinition] = (
+            ([_IMPLICIT_COLUMNS["id"]] if "id" not in declared_names else [])
+            + declared
+            + [col for name, col in _IMPLICIT_COLUMNS.items() if name != "id" and name not in declared_names]
+        )
+        self.column_pool = [column_from_spec(col) for col in merged.get("column_pool", [])]
+
+        evolution = merged.get("evolution") or {}
+        self.enable_evolution = bool(evolution) and bool(self.column_pool or evolution.get("max_drops"))
+        self.evolution = SchemaEvolutionController(
+            evolution_interval=int(evolution.get("interval", 25)),
+            evolution_probability=float(evolution.get("probability", 0.2)),
+            add_probability=float(evolution.get("add_probability", 0.7)),
+            max_additions=int(evolution.get("max_additions", len(self.column_pool))),
+            max_drops=int(evolution.get("max_drops", 0)),
+            migration_probability=float(evolution.get("migration_probability", 0.0)),
+            migrations=evolution.get("migrations", OPERATIONS),
+        )
+        self.migration_options = dict(
+            migration_strategy=evolution.get("migration_strategy", "lock_timeout"),
+            lock_timeout_ms=int(evolution.get("lock_timeout_ms", 2000)),
+            lock_retries=int(evolution.get("lock_retries", 5)),
+            backfill_rows=int(evolution.get("backfill_rows", 5000)),
+        )
+        self.enable_evolution = self.enable_evolution or bool(self.evolution.migration_probability)
+
+        modifiable = [col for col in self.base_columns if col.name not in PROTECTED_COLUMNS]
+        if self.update_ratio > 0 and len(modifiable) <= (self.evolution.max_drops if self.enable_evolution else 0):
+            raise ValueError(
+                f"Table '{self.name}' updates {self.update_ratio:.0%} of its rows but has "
+                f"{len(modifiable)} updatable column(s) and max_drops {self.evolution.max_drops}; "
+                f"declare more columns than max_drops, or set mix.update to 0"
+            )
+
+
+class WorkloadSpec:
+    def __init__(self, spec: Dict[str, Any]):
+        self.schema: str = spec.get("schema", "cdcraft_load")
+        self.publication: Optional[str] = spec.get("publication")
+        defaults = spec.get("defaults", {})
+        self.tables = [TableWorkload(table, defaults) for table in spec.get("tables", [])]
+        if not self.tables:
+            raise ValueError("Workload spec defines no tables")
+
+        names = [table.name for table in self.tables]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate table names in workload spec: {names}")
+
+
+def load_workload(path: str) -> WorkloadSpec:
+    with open(path) as fh:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError as exc:
+                raise RuntimeError("YAML workload specs require PyYAML (pip install pyyaml)") from exc
+            raw = yaml.safe_load(fh)
+        else:
+            raw = json.load(fh)
+    return WorkloadSpec(raw)
+
+
+# ────────── SCHEDULER ────────── #
+
+def _run_table(table: TableWorkload, schema: str, conn_params: dict, ingest_mode: str,
+               columnar: bool, results: Dict[str, Any]):
+    conn = psycopg2.connect(**conn_params)
+    try:
+        schema_mgr = SchemaManager(
+            conn, schema=schema, table_name=table.name,
+            base_columns=table.base_columns, column_pool=table.column_pool, **table.migration_options,
+        )
+        mutator = MutationEngine(
+            conn, schema=schema, table_name=table.name,
+            ingest_mode=ingest_mode, column_types=schema_mgr.get_active_column_definitions(),
+            targeting=table.targeting, **table.txn_options,
+        )
+        generator = BatchGenerator(
+            schema_mgr.get_active_column_definitions(), schema_mgr.get_column_definitions(), table_name=table.name
+        )
+        rate_controller = RateController(ConstantProfile(table.rate)) if table.rate else None
+        if rate_controller:
+            rate_controller.start()
+
+        started = time.perf_counter()
+        total_batches = table.total_records // table.batch_size
+        for batch_no in range(1, total_batches + 1):
+            if columnar:
+                inserted_ids = mutator.insert_columns(generator.generate_columns(table.batch_size))
+            else:
+                inserted_ids = mutator.insert_batch(generator.generate_batch(table.batch_size))
+            updated, deleted = mutator.mutate_mix(generator, inserted_ids, table.update_ratio, table.delete_ratio)
+
+            if rate_controller:
+                rate_controller.throttle(len(inserted_ids) + updated + deleted)
+
+            if table.enable_evolution and evolve_schema(
+                schema_mgr, table.evolution, batch_no, log_prefix=f"{table.name} ", mutator=mutator
+            ):
+                generator.update_schema(schema_mgr.get_active_column_definitions(), schema_mgr.get_column_aliases())
+                mutator.update_schema(schema_mgr.get_active_column_definitions())
+
+        mutator.flush()
+        results[table.name] = {
+            **mutator.get_counters(),
+            "commits": mutator.get_transaction_stats()["commits"],
+            "elapsed_s": round(time.perf_counter() - started, 2),
+            "schema_changes": len(schema_mgr.get_schema_history()),
+        }
+    except Exception:
+        results[table.name] = {"error": traceback.format_exc()}
+    finally:
+        conn.close()
+
+
+def _prepare(spec: WorkloadSpec, conn_params: dict):
+    conn = psycopg2.connect(**conn_params)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {};").format(sql.Identifier(spec.schema)))
+            cur.execute('CREATE EXTENSION IF NOT EXISTS "uuid-ossp";')
+            conn.commit()
+
+        # Tables are created up front so the publication can list them all
+        for table in spec.tables:
+            SchemaManager(
+                conn, schema=spec.schema, table_name=table.name,
+                base_columns=table.base_columns, column_pool=[],
+            ).initialize_table()
+
+        if spec.publication:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1 FROM pg_publication WHERE pubname = %s", (spec.publication,))
+                if cur.fetchone() is None:
+                    cur.execute(sql.SQL("CREATE PUBLICATION {} FOR TABLE {};").format(
+                        sql.Identifier(spec.publication),
+                        sql.SQL(", ").join(
+                            sql.SQL("{}.{}").format(sql.Identifier(spec.schema), sql.Identifier(table.name))
+                            for table in spec.tables
+                        ),
+                    ))
+                    print(f"✅ Publication '{spec.publication}' created for {len(spec.tables)} tables.")
+                conn.commit()
+    finally:
+        conn.close()
+
+
+def run_workload(spec: WorkloadSpec, conn_params: dict, ingest_mode: str = "values",
+                 columnar: bool = False) -> Dict[str, Any]:
+    """
+    Drive every table in the spec concurrently and return per-table counters.
+    """
+    _prepare(spec, conn_params)
+
+    print(f"\n🚀 Starting workload: {len(spec.tables)} tables in schema '{spec.schema}'\n")
+    results: Dict[str, Any] = {}
+    threads = [
+        threading.Thread(
+            target=_run_table,
+            args=(table, spec.schema, conn_params, ingest_mode, columnar, results),
+            name=f"cdcraft-{table.name}",
+            daemon=True,
+        )
+        for table in spec.tables
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print_workload_report(results)
+    return results
+
+
+def print_workload_report(results: Dict[str, Any]):
+    print("\n📊 Workload Complete!\n")
+    totals = {"total_inserts": 0, "total_updates": 0, "total_deletes": 0}
+    for table, result in sorted(results.items()):
+        if "error" in result:
+            print(f" - {table}: FAILED\n{result['error']}")
+            continue
+        for key in totals:
+            totals[key] += result[key]
+        print(
+            f" - {table}: {result['total_inserts']} inserts, {result['total_updates']} updates, "
+            f"{result['total_deletes']} deletes, {result['commits']} commits, "
+            f"{result['schema_changes']} schema changes "
+            f"in {result['elapsed_s']}s"
+        )
+    print(f"\nTotals: {totals}")
@@ -0,0 +1,105 @@
+import io
+import json
+import zlib
+
+import pytest
+
+from avro_encoder import MAGIC, ContainerWriter, encode_long, encode_map, encode_string, value_encoder
+
+
+def read_long(data: bytes, offset: int):
+    """Decode one zig-zag varint; returns (value, next offset)."""
+    shift = raw = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        raw |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return (raw >> 1) ^ -(raw & 1), offset
+
+
+def read_bytes(data: bytes, offset: int):
+    length, offset = read_long(data, offset)
+    return data[offset:offset + length], offset + length
+
+
+def read_container(data: bytes):
+    """(metadata, [(record count, block payload)]) of an object container file."""
+    assert data[:4] == MAGIC
+    offset = 4
+    meta = {}
+    while True:
+        count, offset = read_long(data, offset)
+        if count == 0:
+            break
+        for _ in range(count):
+            key, offset = read_bytes(data, offset)
+            meta[key.decode()], offset = read_bytes(data, offset)
+    sync = data[offset:offset + 16]
+    offset += 16
+    blocks = []
+    while offset < len(data):
+        records, offset = read_long(data, offset)
+        payload, offset = read_bytes(data, offset)
+        assert data[offset:offset + 16] == sync, "block not followed by the file's sync marker"
+        offset += 16
+        blocks.append((records, payload))
+    return meta, blocks
+
+
+@pytest.mark.parametrize("value, encoded", [
+    (0, b"\x00"),
+    (-1, b"\x01"),
+    (1, b"\x02"),
+    (-2, b"\x03"),
+    (63, b"\x7e"),
+    (-64, b"\x7f"),
+    (64, b"\x80\x01"),
+    (-65, b"\x81\x01"),
+    (2**31 - 1, b"\xfe\xff\xff\xff\x0f"),
+    (-(2**31), b"\xff\xff\xff\xff\x0f"),
+    (2**63 - 1, b"\xfe" + b"\xff" * 8 + b"\x01"),
+    (-(2**63), b"\xff" * 9 + b"\x01"),
+])
+def test_encode_long_zigzag(value, encoded):
+    assert encode_long(value) == encoded
+    assert read_long(encoded, 0) == (value, len(encoded))
+
+
+def test_table_and_computed_longs_agree():
+    encode = value_encoder("long")
+    for value in (-70_000, -1, 0, 1, 16_383, 16_384, 10**12):
+        assert encode(value) == encode_long(value)
+
+
+def test_strings_arrays_and_maps():
+    assert encode_string("hé") == b"\x06h\xc3\xa9"
+    assert value_encoder({"type": "array", "items": "long"})([1, -1]) == b"\x04\x02\x01\x00"
+    assert value_encoder({"type": "array", "items": "long"})([]) == b"\x00"
+    assert encode_map({}) == b"\x00"
+    assert encode_map({"k": b"v"}) == b"\x02\x02k\x02v\x00"
+
+
+@pytest.mark.parametrize("codec", ["null", "deflate"])
+def test_container_blocks(codec):
+    fh = io.BytesIO()
+    fh.close = lambda: None  # keep the buffer readable after ContainerWriter.close()
+    schema = {"type": "record", "name": "Row", "fields": [{"name": "n", "type": "long"}]}
+    writer = ContainerWriter(fh, schema, codec=codec)
+    writer.write_block([encode_long(1), encode_long(-2)])
+    writer.write_block([])
+    writer.write_block([encode_long(300)])
+    writer.close()
+
+    meta, blocks = read_container(fh.getvalue())
+    assert json.loads(meta["avro.schema"]) == schema
+    assert meta["avro.codec"] == codec.encode()
+    assert [records for records, _ in blocks] == [2, 1]
+    payloads = [zlib.decompress(payload, -15) if codec == "deflate" else payload for _, payload in blocks]
+    assert payloads == [b"\x02\x03", encode_long(300)]
+
+
+def test_container_rejects_unknown_codec():
+    with pytest.raises(ValueError, match="codec"):
+        ContainerWriter(io.BytesIO(), {"type": "long"}, codec="lz4")
@@ -0,0 +1,115 @@
+import os
+import struct
+from types import SimpleNamespace
+
+import pytest
+
+from checkpoint import CheckpointError, Checkpointer, read_checkpoint, write_checkpoint
+from schema_manager import SchemaEvolutionController, SchemaManager
+
+STATE = {
+    "table": "cdcraft_demo.sales",
+    "position": {"batch": 12, "written": 6000},
+    "counters": {"total_inserts": 6000, "total_updates": 410, "total_deletes": 377},
+    "schema": {"active": [["id", "UUID", "PRIMARY KEY", "id"]], "aliases": {"qty": "quantity"}},
+    "batch_size": None,
+}
+
+
+def catalog_type(sql_type: str) -> str:
+    """How format_type() reports a column definition's type."""
+    sql_type = sql_type.lower()
+    return "double precision" if sql_type == "float" else sql_type
+
+
+@pytest.fixture
+def checkpoint_path(tmp_path):
+    path = str(tmp_path / "sales.ckpt")
+    write_checkpoint(path, STATE)
+    return path
+
+
+def test_round_trip(checkpoint_path):
+    assert read_checkpoint(checkpoint_path) == STATE
+    assert not os.path.exists(f"{checkpoint_path}.tmp")
+
+
+def test_save_replaces_previous_checkpoint(checkpoint_path):
+    write_checkpoint(checkpoint_path, {**STATE, "position": {"batch": 13, "written": 6500}})
+    assert read_checkpoint(checkpoint_path)["position"] == {"batch": 13, "written": 6500}
+
+
+def _rewrite(path, transform):
+    with open(path, "rb") as fh:
+        data = fh.read()
+    with open(path, "wb") as fh:
+        fh.write(transform(data))
+
+
+@pytest.mark.parametrize("transform, message", [
+    (lambda data: data[:-5], "truncated or corrupted"),
+    (lambda data: data[:-1] + bytes([data[-1] ^ 0xFF]), "truncated or corrupted"),
+    (lambda data: data + b"\x00", "truncated or corrupted"),
+    (lambda data: data[:6], "too short"),
+    (lambda data: b"XXXX" + data[4:], "not a CDCraft checkpoint"),
+    (lambda data: data[:4] + struct.pack("!H", 99) + data[6:], "format 99"),
+])
+def test_damaged_checkpoint_is_rejected(checkpoint_path, transform, message):
+    _rewrite(checkpoint_path, transform)
+    with pytest.raises(CheckpointError, match=message):
+        read_checkpoint(checkpoint_path)
+
+
+def test_reconcile_with_catalog(tmp_path):
+    schema_mgr = SchemaManager(None, schema="cdcraft_demo", table_name="sales")
+    evolver = SchemaEvolutionController()
+    checkpointer = Checkpointer(
+        str(tmp_path / "sales.ckpt"), schema_mgr, SimpleNamespace(total_inserts=0), evolver, total_records=1000,
+    )
+    added = schema_mgr.column_pool[0]
+    catalog = {name: catalog_type(col_def.sql_type) for name, col_def in schema_mgr.active_columns.items()}
+    del catalog["customer_name"]
+    catalog["quantity"] = "bigint"
+    catalog[added.name] = catalog_type(added.sql_type)
+    catalog["total_amount_cdcraft_new"] = "numeric"
+
+    notes = checkpointer._reconcile(catalog)
+
+    assert "customer_name" not in schema_mgr.active_columns
+    assert evolver.num_drops == 1
+    assert schema_mgr.active_columns["quantity"].sql_type == "BIGINT"
+    assert schema_mgr.active_columns[added.name] is added
+    assert added not in schema_mgr.column_pool
+    assert evolver.num_additions == 1
+    assert "total_amount_cdcraft_new" not in schema_mgr.active_columns
+    assert [entry["action"] for entry in schema_mgr.get_schema_history()] == ["drop", "add"]
+    assert len(notes) == 4
+    assert any("total_amount_cdcraft_new" in note and "left alone" in note for note in notes)
+
+
+def test_reconcile_matching_catalog_changes_nothing(tmp_path):
+    schema_mgr = SchemaManager(None, schema="cdcraft_demo", table_name="sales")
+    evolver = SchemaEvolutionController()
+    checkpointer = Checkpointer(
+        str(tmp_path / "sales.ckpt"), schema_mgr, SimpleNamespace(total_inserts=0), evolver, total_records=1000,
+    )
+    before = dict(schema_mgr.active_columns)
+    catalog = {name: catalog_type(col_def.sql_type) for name, col_def in before.items()}
+
+    assert checkpointer._reconcile(catalog) == []
+    assert schema_mgr.active_columns == before
+    assert (evolver.num_additions, evolver.num_drops) == (0, 0)
+
+
+def test_reconcile_rows_counts_commits_after_the_checkpoint(tmp_path):
+    mutator = SimpleNamespace(total_inserts=6000)
+    checkpointer = Checkpointer(
+        str(tmp_path / "sales.ckpt"), SchemaManager(None), mutator, SchemaEvolutionController(), total_records=1000,
+    )
+
+    assert checkpointer._reconcile_rows(0) == []
+    assert len(checkpointer._reconcile_rows(-25)) == 1
+    assert mutator.total_inserts == 6000
+    (note,) = checkpointer._reconcile_rows(500)
+    assert "500 more rows" in note
+    assert mutator.total_inserts == 6500
@@ -0,0 +1,91 @@
+import struct
+import uuid
+from datetime import datetime
+
+import pytest
+
+from copy_encoder import binary_encoders_for, encode_binary_copy, encode_text_copy
+
+SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+
+
+def read_binary_copy(data: bytes):
+    """Split a COPY binary buffer into rows of raw field bytes (None for NULL)."""
+    assert data[:11] == SIGNATURE
+    flags, extension = struct.unpack_from("!ii", data, 11)
+    assert (flags, extension) == (0, 0)
+    offset = 19
+    rows = []
+    while True:
+        (fields,) = struct.unpack_from("!h", data, offset)
+        offset += 2
+        if fields == -1:
+            break
+        row = []
+        for _ in range(fields):
+            (length,) = struct.unpack_from("!i", data, offset)
+            offset += 4
+            if length == -1:
+                row.append(None)
+                continue
+            row.append(data[offset:offset + length])
+            offset += length
+        rows.append(row)
+    assert offset == len(data), "bytes after the trailer"
+    return rows
+
+
+def test_binary_framing_and_values():
+    column_types = {
+        "id": "UUID",
+        "quantity": "INTEGER",
+        "total": "FLOAT",
+        "is_gift": "boolean",
+        "note": "VARCHAR(20)",
+        "at": "TIMESTAMP WITHOUT TIME ZONE",
+    }
+    row_id = uuid.uuid4()
+    rows = [
+        [str(row_id), 7, 1.5, True, "héllo", datetime(2000, 1, 2, 0, 0, 1)],
+        [str(row_id), -1, None, False, None, datetime(1999, 12, 31)],
+    ]
+    decoded = read_binary_copy(encode_binary_copy(rows, binary_encoders_for(column_types)).getvalue())
+
+    assert len(decoded) == 2
+    first, second = decoded
+    assert first[0] == row_id.bytes
+    assert struct.unpack("!i", first[1]) == (7,)
+    assert struct.unpack("!d", first[2]) == (1.5,)
+    assert first[3] == b"\x01"
+    assert first[4] == "héllo".encode("utf-8")
+    # Microseconds since 2000-01-01
+    assert struct.unpack("!q", first[5]) == (86_401_000_000,)
+
+    assert struct.unpack("!i", second[1]) == (-1,)
+    assert second[2] is None and second[4] is None
+    assert struct.unpack("!q", second[5]) == (-86_400_000_000,)
+
+
+def test_binary_int_array_and_jsonb():
+    encoders = binary_encoders_for({"ints": "integer[]", "doc": "jsonb"})
+    (row,) = read_binary_copy(encode_binary_copy([[[1, -2, 3], '{"a":1}']], encoders).getvalue())
+
+    ndim, has_nulls, element_oid, length, lower = struct.unpack_from("!iiiii", row[0])
+    assert (ndim, has_nulls, element_oid, length, lower) == (1, 0, 23, 3, 1)
+    assert struct.unpack_from("!" + "ii" * 3, row[0], 20) == (4, 1, 4, -2, 4, 3)
+    assert row[1] == b'\x01{"a":1}'
+
+
+def test_binary_empty_buffer_is_header_and_trailer():
+    data = encode_binary_copy([], binary_encoders_for({"id": "uuid"})).getvalue()
+    assert data == SIGNATURE + struct.pack("!ii", 0, 0) + struct.pack("!h", -1)
+
+
+def test_binary_unknown_type_is_rejected():
+    with pytest.raises(ValueError, match="copy_text"):
+        binary_encoders_for({"spot": "point"})
+
+
+def test_text_escapes_and_nulls():
+    data = encode_text_copy([["a\tb\\c\nd", None, True, b"\x01\xff"]]).getvalue()
+    assert data == b"a\\tb\\\\c\\nd\t\\N\tt\t\\\\x01ff\n"